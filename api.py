@@ -0,0 +1,323 @@
+import base64
+import functools
+import json
+
+from flask import Blueprint, Response, current_app, jsonify, request
+
+from booking import BookingError
+from caching import conditional_render
+from holds import holds_version, spots_left
+from metrics import bookings_total
+from provider import club_bookings, find_competition_by_name, get_catalogue, get_leaderboard
+from records import DATE_FORMAT, parse_date
+from sessions import current_club
+
+MAX_BATCH_SIZE = 100
+# Rows per page of the listings, ?limit= is capped at MAX_PAGE_SIZE
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows fetched at a time while streaming a whole listing as NDJSON
+STREAM_CHUNK = 500
+NDJSON = "application/x-ndjson"
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+
+def _error(status, reason, message):
+    return jsonify({"ok": False, "reason": reason, "message": message}), status
+
+
+def _parse_items(payload):
+    """Return the list of booking items in 'payload', or None when malformed
+
+    Accepts {"bookings": [...]} or a bare list of {"competition", "spots"}.
+    """
+    if isinstance(payload, dict):
+        payload = payload.get("bookings")
+    if not isinstance(payload, list) or not payload:
+        return None
+    if not all(isinstance(item, dict) for item in payload):
+        return None
+    return payload
+
+
+def _spots(value):
+    """Number of spots in 'value', or None if it is not a whole number"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _count_outcomes(results):
+    """Count booked and rejected items (skipped ones were never attempted)"""
+    for result in results:
+        if result["status"] == "booked":
+            bookings_total.inc("booked")
+        elif result["status"] == "rejected":
+            bookings_total.inc(result["reason"])
+
+
+@api.route("/bookings", methods=["POST"])
+def bookings():
+    """Book several competitions for the logged-in club, all or nothing
+
+    Every item is checked with the same rules as the booking form; the
+    response lists one result per item in request order.
+    """
+    club = current_club()
+    if club is None:
+        return _error(401, "not_logged_in", "Please log in first.")
+
+    items = _parse_items(request.get_json(silent=True))
+    if items is None:
+        return _error(
+            400, "invalid_request",
+            'Expected a JSON list of {"competition": ..., "spots": ...} items.',
+        )
+    if len(items) > MAX_BATCH_SIZE:
+        return _error(
+            400, "too_many_items", f"At most {MAX_BATCH_SIZE} bookings per request."
+        )
+
+    results = []
+    resolved = []
+    for item in items:
+        name = item.get("competition")
+        spots = _spots(item.get("spots"))
+        competition = find_competition_by_name(name) if isinstance(name, str) else None
+        result = {"competition": name, "spots": spots}
+        if competition is None:
+            result.update(
+                status="rejected",
+                reason="unknown_competition",
+                message="Error: Competition not found.",
+            )
+        elif spots is None:
+            result.update(
+                status="rejected",
+                reason="invalid_spots",
+                message="Error: Please enter a valid number of spots.",
+            )
+        else:
+            resolved.append((len(results), competition, spots))
+        results.append(result)
+
+    if len(resolved) < len(items):
+        for index, _, _ in resolved:
+            results[index]["status"] = "skipped"
+        _count_outcomes(results)
+        return jsonify({"ok": False, "results": results}), 422
+
+    engine = current_app.extensions["booking_engine"]
+    bookings = [(competition, spots) for _, competition, spots in resolved]
+    try:
+        errors = engine.book_many(club, bookings)
+    except BookingError as error:
+        bookings_total.inc(error.reason)
+        return _error(409, error.reason, error.message)
+
+    if any(errors):
+        for (index, _, _), error in zip(resolved, errors):
+            if error is None:
+                results[index]["status"] = "skipped"
+            else:
+                results[index].update(
+                    status="rejected", reason=error.reason, message=error.message
+                )
+        _count_outcomes(results)
+        return jsonify({"ok": False, "results": results}), 422
+
+    for index, competition, _ in resolved:
+        results[index].update(
+            status="booked",
+            spotsAvailable=spots_left(competition, current_app.extensions["spot_holds"]),
+        )
+    _count_outcomes(results)
+    return jsonify({"ok": True, "points": club.points, "results": results})
+
+
+@api.route("/bookings")
+def booking_history():
+    """Bookings made by the logged-in club, oldest first, with totals per competition"""
+    club = current_club()
+    if club is None:
+        return _error(401, "not_logged_in", "Please log in first.")
+    items = []
+    totals = {}
+    for booking in club_bookings(club):
+        items.append({
+            "competition": booking.competition,
+            "spots": booking.spots,
+            "at": booking.at.isoformat(timespec="seconds"),
+        })
+        totals[booking.competition] = totals.get(booking.competition, 0) + booking.spots
+    return jsonify({"items": items, "totals": totals})
+
+
+def _encode_cursor(*values):
+    text = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor, types):
+    """Values of 'cursor', checked against 'types'; ValueError if it is not valid"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        values = None
+    if (not isinstance(values, list) or len(values) != len(types)
+            or not all(isinstance(value, kind) for value, kind in zip(values, types))):
+        raise ValueError("Invalid cursor.")
+    return values
+
+
+def _int_arg(name, default=0):
+    value = request.args.get(name, "")
+    if value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a whole number.") from None
+
+
+def _page_size():
+    """?limit= within 1..MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE when not given"""
+    return min(max(_int_arg("limit", DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+
+
+def _wants_ndjson():
+    if request.args.get("format") == "ndjson":
+        return True
+    accept = request.accept_mimetypes
+    return accept[NDJSON] > accept["application/json"]
+
+
+def _competition_rows(position, limit, min_spots, holds=None):
+    """Up to 'limit' public competition records from catalogue 'position' on
+
+    Spots held by clubs about to book do not count as left. Returns the
+    rows and the position following the last one scanned, or None once
+    the catalogue is exhausted.
+    """
+    catalogue = get_catalogue()
+    rows = []
+    while len(rows) < limit:
+        names = catalogue.names_from(position, limit - len(rows))
+        if not names:
+            return rows, None
+        for name in names:
+            position += 1
+            competition = find_competition_by_name(name)
+            if competition is None:
+                continue
+            left = spots_left(competition, holds)
+            if left < min_spots:
+                continue
+            rows.append({
+                "name": competition.name,
+                "date": competition.date.strftime(DATE_FORMAT),
+                "spotsAvailable": left,
+            })
+    return rows, position if position < len(catalogue) else None
+
+
+def _club_rows(position, limit, min_points):
+    """Up to 'limit' public club records from leaderboard 'position' on
+
+    Returns the rows and the position following the last one, or None
+    once no club has 'min_points' left.
+    """
+    leaderboard = get_leaderboard()
+    end = len(leaderboard) if min_points is None else leaderboard.count_at_least(min_points)
+    rows = leaderboard.top(position, max(min(limit, end - position), 0))
+    position += len(rows)
+    return rows, position if position < end else None
+
+
+def _listing(rows_from, start, minimum, limit, cursor_of, *parts):
+    """A JSON page of 'limit' rows_from(start, ...), or the whole listing as NDJSON
+
+    Pages end with the cursor that cursor_of(last row, next position)
+    makes, or None on the last page; their ETag also depends on 'parts'.
+    Streams fetch STREAM_CHUNK rows at a time, so their memory use does
+    not depend on the size of the listing.
+    """
+    if _wants_ndjson():
+        def generate():
+            position = start
+            while position is not None:
+                rows, position = rows_from(position, STREAM_CHUNK, minimum)
+                yield "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+
+        return Response(generate(), mimetype=NDJSON)
+
+    def render():
+        rows, position = rows_from(start, limit, minimum)
+        cursor = cursor_of(rows[-1], position) if rows and position is not None else None
+        return jsonify({"items": rows, "next": cursor})
+
+    return conditional_render(render, request.full_path, *parts, public=True)
+
+
+@api.route("/competitions")
+def competitions():
+    """Competitions in date order: name, date and spots left
+
+    ?upcoming=1 skips past competitions, ?min_spots=N those with fewer
+    spots left; ?cursor= resumes after the previous page.
+    """
+    try:
+        catalogue = get_catalogue()
+        start = 0
+        if request.args.get("cursor"):
+            date, name = _decode_cursor(request.args["cursor"], (str, str))
+            start = catalogue.seek(parse_date(date), name)
+        if request.args.get("upcoming", "").lower() in ("1", "true", "yes"):
+            start = max(start, catalogue.first_upcoming())
+        min_spots = _int_arg("min_spots")
+        limit = _page_size()
+    except ValueError as error:
+        return _error(400, "invalid_request", str(error))
+
+    holds = current_app.extensions["spot_holds"]
+    return _listing(
+        # Streams run outside the app context, so the holds are bound here
+        functools.partial(_competition_rows, holds=holds),
+        start, min_spots, limit,
+        lambda row, position: _encode_cursor(row["date"], row["name"]),
+        holds_version(holds),
+    )
+
+
+@api.route("/clubs")
+def clubs():
+    """Clubs by points, highest first: name, points and rank (no emails)
+
+    ?min_points=N stops at clubs with fewer points; ?cursor= resumes after
+    the previous page.
+    """
+    try:
+        leaderboard = get_leaderboard()
+        start = 0
+        if request.args.get("cursor"):
+            points, name, skip = _decode_cursor(request.args["cursor"], (int, str, int))
+            start = leaderboard.seek(points, name, skip)
+        min_points = _int_arg("min_points", None)
+        limit = _page_size()
+    except ValueError as error:
+        return _error(400, "invalid_request", str(error))
+
+    def cursor_of(row, position):
+        # Clubs tied on points and name are told apart by how many were listed
+        seen = position - leaderboard.seek(row["points"], row["name"], 0)
+        return _encode_cursor(row["points"], row["name"], seen)
+
+    return _listing(_club_rows, start, min_points, limit, cursor_of)
@@ -0,0 +1,369 @@
+import dataclasses
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from provider import (
+    Backend,
+    JsonBackend,
+    _data_path,
+    _json_from_file,
+    bump_data_version,
+    normalize_email,
+)
+from records import DATE_FORMAT, Booking, Club, Competition, parse_date
+
+DEFAULT_SQLITE_FILE = "gudlft.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clubs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    email_key TEXT NOT NULL,
+    points INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS clubs_email_key ON clubs (email_key);
+CREATE TABLE IF NOT EXISTS competitions (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    date TEXT NOT NULL,
+    spots_available INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS competitions_name ON competitions (name);
+CREATE TABLE IF NOT EXISTS bookings (
+    id TEXT PRIMARY KEY,
+    club_key TEXT NOT NULL,
+    competition TEXT NOT NULL,
+    spots INTEGER NOT NULL,
+    at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bookings_club ON bookings (club_key);
+-- Running totals of the bookings table, one row per club and competition
+CREATE TABLE IF NOT EXISTS booked_spots (
+    club_key TEXT NOT NULL,
+    competition TEXT NOT NULL,
+    spots INTEGER NOT NULL,
+    PRIMARY KEY (club_key, competition)
+) WITHOUT ROWID;
+-- Number of imports of each dataset, so that other workers notice them
+CREATE TABLE IF NOT EXISTS imports (
+    dataset TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Statements are kept as constants: sqlite3 caches the prepared form per
+# connection, keyed by the SQL text
+SELECT_CLUBS = "SELECT name, email, points FROM clubs ORDER BY id"
+SELECT_CLUB = "SELECT name, email, points FROM clubs WHERE email_key = ?"
+SELECT_COMPETITIONS = "SELECT name, date, spots_available FROM competitions ORDER BY id"
+SELECT_COMPETITION = "SELECT name, date, spots_available FROM competitions WHERE name = ?"
+INSERT_CLUB = "INSERT OR IGNORE INTO clubs (name, email, email_key, points) VALUES (?, ?, ?, ?)"
+INSERT_COMPETITION = (
+    "INSERT OR IGNORE INTO competitions (name, date, spots_available) VALUES (?, ?, ?)"
+)
+DEBIT_POINTS = "UPDATE clubs SET points = points - ? WHERE email_key = ? AND points >= ?"
+RESERVE_SPOTS = (
+    "UPDATE competitions SET spots_available = spots_available - ? "
+    "WHERE name = ? AND spots_available >= ?"
+)
+COUNT_CLUBS = "SELECT COUNT(*) FROM clubs"
+INSERT_BOOKING = (
+    "INSERT INTO bookings (id, club_key, competition, spots, at) VALUES (?, ?, ?, ?, ?)"
+)
+ADD_BOOKED_SPOTS = (
+    "INSERT INTO booked_spots (club_key, competition, spots) VALUES (?, ?, ?) "
+    "ON CONFLICT (club_key, competition) DO UPDATE SET spots = spots + excluded.spots"
+)
+SELECT_BOOKED_SPOTS = "SELECT spots FROM booked_spots WHERE club_key = ? AND competition = ?"
+SELECT_CLUB_BOOKINGS = (
+    "SELECT club_key, competition, spots, at, id FROM bookings WHERE club_key = ? ORDER BY rowid"
+)
+# Bookings are never deleted, so the last rowid versions the points and spots;
+# imports replace records wholesale and are counted apart
+LAST_BOOKING = "SELECT MAX(rowid) FROM bookings"
+LAST_CHANGE = (
+    "SELECT (SELECT IFNULL(MAX(rowid), 0) FROM bookings), "
+    "(SELECT IFNULL(SUM(count), 0) FROM imports)"
+)
+DELETE_DATASET = {"clubs": "DELETE FROM clubs", "competitions": "DELETE FROM competitions"}
+COUNT_IMPORT = (
+    "INSERT INTO imports (dataset, count) VALUES (?, 1) "
+    "ON CONFLICT (dataset) DO UPDATE SET count = count + 1"
+)
+SELECT_BOOKED_CLUBS = "SELECT DISTINCT club_key FROM bookings WHERE rowid > ? AND rowid <= ?"
+
+
+class _Conflict(Exception):
+    """Raised inside a transaction to roll back a booking that no longer fits"""
+
+
+def _club_params(club):
+    return club.name, club.email, normalize_email(club.email), club.points
+
+
+def _competition_params(competition):
+    return (
+        competition.name, competition.date.strftime(DATE_FORMAT), competition.spots_available
+    )
+
+
+def _club_from_row(row):
+    return Club(row[0], row[1], row[2])
+
+
+def _competition_from_row(row):
+    return Competition(row[0], parse_date(row[1]), row[2])
+
+
+def _booking_from_row(row):
+    return Booking(row[0], row[1], row[2], parse_date(row[3]), row[4])
+
+
+class MemoryBackend(Backend):
+    """Records held in process memory only; bookings are not persisted"""
+
+    def __init__(self, clubs=(), competitions=()):
+        self._lock = threading.Lock()
+        self._clubs = [dataclasses.replace(club) for club in clubs]
+        self._competitions = [dataclasses.replace(competition) for competition in competitions]
+        self._clubs_by_email = {}
+        for club in self._clubs:
+            self._clubs_by_email.setdefault(normalize_email(club.email), club)
+        self._competitions_by_name = {}
+        for competition in self._competitions:
+            self._competitions_by_name.setdefault(competition.name, competition)
+
+    def get_clubs(self):
+        return self._clubs
+
+    def get_competitions(self):
+        return self._competitions
+
+    def find_club_by_email(self, email):
+        return self._clubs_by_email.get(normalize_email(email))
+
+    def find_competition_by_name(self, name):
+        return self._competitions_by_name.get(name)
+
+    def book_many(self, club, items):
+        email_key = normalize_email(club.email)
+        ledger = self.get_ledger()
+        with self._lock:
+            for competition, spots in items:
+                club.points -= spots
+                competition.spots_available -= spots
+                ledger.add(Booking.new(email_key, competition.name, spots))
+        return True
+
+
+class SqliteBackend(Backend):
+    """Records stored in a SQLite database in WAL mode
+
+    Each thread gets its own connection from a small pool, so readers never
+    block each other and a booking is one short write transaction. Other
+    worker processes may book or import in the same database: sync() catches
+    up with their bookings, through the last booking rowid seen, and with
+    their imports, through the count of imports.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+        self._sync_lock = threading.Lock()
+        self._last_booking, self._imports = self._connection().execute(LAST_CHANGE).fetchone()
+
+    def _connection(self):
+        """The calling thread's connection, opened on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT, rolled back on any exception"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def is_empty(self):
+        return self._connection().execute(COUNT_CLUBS).fetchone()[0] == 0
+
+    def load(self, clubs, competitions):
+        """Insert records in one transaction, skipping ones already stored"""
+        with self._transaction() as conn:
+            conn.executemany(INSERT_CLUB, map(_club_params, clubs))
+            conn.executemany(INSERT_COMPETITION, map(_competition_params, competitions))
+
+    def replace_dataset(self, key, records):
+        """Delete the records of 'key' and insert 'records', in one transaction
+
+        Bookings and their totals are kept. Other workers notice the import
+        in sync() and rebuild what they derived from the records.
+        """
+        insert, params = (
+            (INSERT_CLUB, _club_params) if key == "clubs"
+            else (INSERT_COMPETITION, _competition_params)
+        )
+        count = 0
+
+        def rows():
+            nonlocal count
+            for record in records:
+                count += 1
+                yield params(record)
+
+        with self._transaction() as conn:
+            conn.execute(DELETE_DATASET[key])
+            conn.executemany(insert, rows())
+            conn.execute(COUNT_IMPORT, (key,))
+        self._forget_records()
+        bump_data_version()
+        return count
+
+    def _forget_records(self):
+        """Drop the catalogue and leaderboard, rebuilt from the records on next use"""
+        self.invalidate_catalogue()
+        self._leaderboard = None
+
+    def get_clubs(self):
+        return [_club_from_row(row) for row in self._connection().execute(SELECT_CLUBS)]
+
+    def get_competitions(self):
+        return [
+            _competition_from_row(row)
+            for row in self._connection().execute(SELECT_COMPETITIONS)
+        ]
+
+    def iter_clubs(self):
+        for row in self._connection().execute(SELECT_CLUBS):
+            yield _club_from_row(row)
+
+    def iter_competitions(self):
+        for row in self._connection().execute(SELECT_COMPETITIONS):
+            yield _competition_from_row(row)
+
+    def find_club_by_email(self, email):
+        row = self._connection().execute(SELECT_CLUB, (normalize_email(email),)).fetchone()
+        return _club_from_row(row) if row else None
+
+    def find_competition_by_name(self, name):
+        row = self._connection().execute(SELECT_COMPETITION, (name,)).fetchone()
+        return _competition_from_row(row) if row else None
+
+    def booked_spots(self, club, competition):
+        row = self._connection().execute(
+            SELECT_BOOKED_SPOTS, (normalize_email(club.email), competition.name)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def club_bookings(self, club):
+        rows = self._connection().execute(SELECT_CLUB_BOOKINGS, (normalize_email(club.email),))
+        return [_booking_from_row(row) for row in rows]
+
+    def sync(self):
+        last, imports = self._connection().execute(LAST_CHANGE).fetchone()
+        if last == self._last_booking and imports == self._imports:
+            return False
+        with self._sync_lock:
+            seen = self._last_booking
+            if imports != self._imports:
+                # Records were replaced: the leaderboard is rebuilt, not caught up
+                self._imports = imports
+                self._forget_records()
+            elif last <= seen:
+                return False
+            leaderboard = getattr(self, "_leaderboard", None)
+            if leaderboard is not None:
+                conn = self._connection()
+                for (club_key,) in conn.execute(SELECT_BOOKED_CLUBS, (seen, last)).fetchall():
+                    row = conn.execute(SELECT_CLUB, (club_key,)).fetchone()
+                    if row is not None:
+                        leaderboard.update(_club_from_row(row))
+            self._last_booking = max(last, seen)
+        bump_data_version()
+        return True
+
+    def stored_version(self):
+        return self._connection().execute(LAST_CHANGE).fetchone()
+
+    def book_many(self, club, items):
+        email_key = normalize_email(club.email)
+        try:
+            with self._transaction() as conn:
+                before = conn.execute(LAST_BOOKING).fetchone()[0] or 0
+                for competition, spots in items:
+                    if conn.execute(DEBIT_POINTS, (spots, email_key, spots)).rowcount != 1:
+                        raise _Conflict
+                    reserved = conn.execute(RESERVE_SPOTS, (spots, competition.name, spots))
+                    if reserved.rowcount != 1:
+                        raise _Conflict
+                    booking = Booking.new(email_key, competition.name, spots)
+                    last = conn.execute(INSERT_BOOKING, (
+                        booking.id, email_key, competition.name, spots,
+                        booking.at.strftime(DATE_FORMAT),
+                    )).lastrowid
+                    conn.execute(ADD_BOOKED_SPOTS, (email_key, competition.name, spots))
+                points = conn.execute(SELECT_CLUB, (email_key,)).fetchone()[2]
+                spots_left = {
+                    competition.name: conn.execute(
+                        SELECT_COMPETITION, (competition.name,)
+                    ).fetchone()[2]
+                    for competition, _ in items
+                }
+        except _Conflict:
+            return False
+        club.points = points
+        for competition, _ in items:
+            competition.spots_available = spots_left[competition.name]
+        with self._sync_lock:
+            # Nothing to catch up with when no other process booked before
+            if self._last_booking == before:
+                self._last_booking = last
+        return True
+
+    def close(self):
+        """Close the calling thread's connection; the next call opens a new one
+
+        Other threads' connections are closed when those threads exit.
+        """
+        conn = self._local.__dict__.pop("conn", None)
+        if conn is not None:
+            conn.close()
+
+
+def create_backend(config):
+    """Build the backend named by config["PROVIDER_BACKEND"]
+
+    "json" (default) serves the data files, "memory" and "sqlite" start from
+    the JSON snapshot; a SQLite database is only seeded while it is empty.
+    """
+    name = config.get("PROVIDER_BACKEND") or "json"
+    if name == "json":
+        return JsonBackend()
+    if name == "memory":
+        return MemoryBackend(
+            _json_from_file("clubs.json", "clubs"),
+            _json_from_file("competitions.json", "competitions"),
+        )
+    if name == "sqlite":
+        backend = SqliteBackend(config.get("SQLITE_DATABASE") or _data_path(DEFAULT_SQLITE_FILE))
+        if backend.is_empty():
+            backend.load(
+                _json_from_file("clubs.json", "clubs"),
+                _json_from_file("competitions.json", "competitions"),
+            )
+        return backend
+    raise ValueError(f"Unknown provider backend: {name!r}")
@@ -0,0 +1,221 @@
+import dataclasses
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from provider import booked_spots, normalize_email, record_booking, record_bookings
+
+MAX_SPOTS_PER_BOOKING = 12
+# Lock stripes per kind of record; competitions use slots [0, N), clubs [N, 2N)
+LOCK_STRIPES = 1024
+
+
+class BookingError(Exception):
+    """A booking was rejected; 'reason' is a short machine-readable code"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+
+
+def _slot(key, offset):
+    """Stable lock stripe of 'key' (crc32, identical in every worker)"""
+    return offset + zlib.crc32(key.encode()) % LOCK_STRIPES
+
+
+class BookingEngine:
+    """Reserve competition spots and debit club points atomically
+
+    Each competition and each club maps to one of LOCK_STRIPES in-process
+    locks, so bookings for unrelated competitions never wait on each other.
+    When 'lock_path' is set, the same stripes are also locked as byte ranges
+    of that file with lockf(), which extends the guarantee to several
+    worker processes. With 'holds' (a SpotHolds), spots held by other
+    clubs are not available, and a booking consumes the club's own hold.
+    'on_change' is called with the names of the competitions booked, while
+    their locks are still held.
+    """
+
+    def __init__(self, lock_path=None, holds=None, on_change=None):
+        self.lock_path = lock_path
+        self.holds = holds
+        self.on_change = on_change
+        self._locks = [threading.Lock() for _ in range(2 * LOCK_STRIPES)]
+        self._lock_fd = None
+        self._lock_fd_pid = None
+
+    def _file_lock_fd(self):
+        """Descriptor of the cross-process lock file, reopened after a fork"""
+        if self._lock_fd is None or self._lock_fd_pid != os.getpid():
+            self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._lock_fd_pid = os.getpid()
+        return self._lock_fd
+
+    @contextmanager
+    def _hold(self, slots):
+        """Acquire the given lock stripes in ascending order (no deadlocks)"""
+        slots = sorted(set(slots))
+        use_file = self.lock_path is not None and fcntl is not None
+        acquired = []
+        try:
+            for slot in slots:
+                self._locks[slot].acquire()
+                acquired.append(slot)
+                if use_file:
+                    fcntl.lockf(self._file_lock_fd(), fcntl.LOCK_EX, 1, slot)
+            yield
+        finally:
+            for slot in reversed(acquired):
+                if use_file:
+                    fcntl.lockf(self._file_lock_fd(), fcntl.LOCK_UN, 1, slot)
+                self._locks[slot].release()
+
+    def locked(self, club, competitions):
+        """Context manager holding the locks of 'club' and every competition"""
+        slots = [_slot(competition.name, 0) for competition in competitions]
+        slots.append(_slot(normalize_email(club.email), LOCK_STRIPES))
+        return self._hold(slots)
+
+    def validate(self, club, competition, spots, now=None, already_booked=0):
+        """Raise BookingError if 'club' may not book 'spots' in 'competition'
+
+        'already_booked' spots of the same competition (from the ledger and
+        earlier items of a batch) count towards the per-competition limit.
+        """
+        if spots < 1:
+            raise BookingError("invalid_spots", "Error: Please enter a valid number of spots.")
+        if competition.date < (now or datetime.now()):
+            raise BookingError(
+                "past_competition", "Error: You cannot book spots in a past competition."
+            )
+        if already_booked + spots > MAX_SPOTS_PER_BOOKING:
+            raise BookingError(
+                "too_many_spots", "Error: You cannot book more than 12 spots per competition."
+            )
+        if spots > club.points:
+            raise BookingError(
+                "not_enough_points",
+                "Error: You do not have enough points to book this many spots.",
+            )
+        if spots > competition.spots_available:
+            raise BookingError(
+                "not_enough_spots", "Error: Not enough spots left in this competition."
+            )
+
+    def _held_by_others(self, club, competition):
+        if self.holds is None:
+            return 0
+        return self.holds.held_by_others(normalize_email(club.email), competition.name)
+
+    def _release_holds(self, club, competitions):
+        if self.holds is not None:
+            for competition in competitions:
+                self.holds.release(normalize_email(club.email), competition.name)
+
+    def book(self, club, competition, spots):
+        """Validate and record a booking while holding its locks"""
+        with self.locked(club, [competition]):
+            others = self._held_by_others(club, competition)
+            self.validate(
+                club,
+                dataclasses.replace(
+                    competition, spots_available=competition.spots_available - others
+                ),
+                spots,
+                already_booked=booked_spots(club, competition),
+            )
+            if not record_booking(club, competition, spots):
+                raise BookingError(
+                    "conflict", "Error: This booking could not be completed, please try again."
+                )
+            self._release_holds(club, [competition])
+            if self.on_change is not None:
+                self.on_change({competition.name})
+
+    def hold(self, club, competition, spots, now=None):
+        """Hold up to 'spots' of 'competition' for 'club'; return the number held
+
+        The hold is cut down to what the club could book right now (its
+        points not already held for other competitions, the per-competition
+        limit and the spots nobody else holds).
+        When that is nothing, any previous hold of the club is dropped and
+        0 is returned.
+        """
+        if self.holds is None:
+            return 0
+        key = normalize_email(club.email)
+        with self.locked(club, [competition]):
+            held_elsewhere = (
+                self.holds.held_by_club(key) - self.holds.held_by(key, competition.name)[0]
+            )
+            spots = min(
+                spots,
+                club.points - held_elsewhere,
+                MAX_SPOTS_PER_BOOKING - booked_spots(club, competition),
+                competition.spots_available - self._held_by_others(club, competition),
+            )
+            if spots < 1 or competition.date < (now or datetime.now()):
+                self.holds.release(key, competition.name)
+                return 0
+            self.holds.hold(key, competition.name, spots)
+            return spots
+
+    def check_many(self, club, items, now=None):
+        """Validate (competition, spots) 'items' as if booked one after another
+
+        Returns one BookingError or None per item. Points, spots left and the
+        per-competition limit carry over from earlier items of the batch; the
+        limit also counts the spots the club booked before, and spots held by
+        other clubs are not available.
+        """
+        points = club.points
+        booked = {}
+        errors = []
+        for competition, spots in items:
+            name = competition.name
+            already = booked.get(name, 0)
+            club_view = dataclasses.replace(club, points=points)
+            competition_view = dataclasses.replace(
+                competition,
+                spots_available=(
+                    competition.spots_available - already
+                    - self._held_by_others(club, competition)
+                ),
+            )
+            held = booked_spots(club, competition)
+            try:
+                self.validate(club_view, competition_view, spots, now, held + already)
+            except BookingError as error:
+                errors.append(error)
+                continue
+            errors.append(None)
+            points -= spots
+            booked[name] = already + spots
+        return errors
+
+    def book_many(self, club, items):
+        """Validate and record several bookings of 'club', all or nothing
+
+        Returns the list of per-item errors; nothing is booked unless all
+        of them are None.
+        """
+        with self.locked(club, [competition for competition, _ in items]):
+            errors = self.check_many(club, items)
+            if any(errors):
+                return errors
+            if not record_bookings(club, items):
+                raise BookingError(
+                    "conflict", "Error: This booking could not be completed, please try again."
+                )
+            self._release_holds(club, [competition for competition, _ in items])
+            if self.on_change is not None:
+                self.on_change({competition.name for competition, _ in items})
+            return errors
@@ -0,0 +1,293 @@
+"""Bulk import and export of clubs and competitions, as CSV or NDJSON
+
+Rows are read, validated and written in chunks of CHUNK_SIZE, so files
+of any size are handled in bounded memory (apart from the keys seen so
+far, kept to reject duplicates). Every row is validated on its own and
+invalid ones are reported with their line number. The commands are
+registered on the app by create_app():
+
+    flask import-data clubs clubs.csv --errors rejected.csv
+    flask export-data competitions competitions.ndjson
+"""
+
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+import click
+
+import provider
+from provider import normalize_email
+from records import Club, Competition, parse_date
+
+CHUNK_SIZE = 10_000
+FORMATS = ("csv", "ndjson")
+# Fields of each dataset, named as in the JSON files (and CSV headers)
+FIELDS = {
+    "clubs": ("name", "email", "points"),
+    "competitions": ("name", "date", "spotsAvailable"),
+}
+# Invalid rows echoed to the terminal; --errors gets all of them
+SHOWN_ERRORS = 20
+
+
+class ImportCancelled(Exception):
+    """Nothing was imported; the message says why"""
+
+
+def _text(row, field):
+    value = row.get(field)
+    if value is None or not str(value).strip():
+        raise ValueError(f"{field} is missing")
+    return str(value).strip()
+
+
+def _count(row, field):
+    text = _text(row, field)
+    try:
+        value = int(text)
+    except ValueError:
+        raise ValueError(f"{field} is not a whole number: {text!r}") from None
+    if value < 0:
+        raise ValueError(f"{field} is negative: {value}")
+    return value
+
+
+def _club(row):
+    """(Club, key) of a valid club row, else ValueError"""
+    email = _text(row, "email")
+    if "@" not in email:
+        raise ValueError(f"email is not an email address: {email!r}")
+    return Club(_text(row, "name"), email, _count(row, "points")), normalize_email(email)
+
+
+def _competition(row):
+    """(Competition, key) of a valid competition row, else ValueError"""
+    name = _text(row, "name")
+    date = _text(row, "date")
+    try:
+        parsed = parse_date(date)
+    except ValueError:
+        raise ValueError(f"date is not YYYY-MM-DD HH:MM:SS: {date!r}") from None
+    return Competition(name, parsed, _count(row, "spotsAvailable")), name
+
+
+_VALIDATORS = {"clubs": _club, "competitions": _competition}
+
+
+def read_rows(fp, fmt):
+    """Yield (line number, row) from CSV or NDJSON 'fp'
+
+    Rows are dicts, or None for an NDJSON line that is not valid JSON.
+    CSV files need a header row with the field names.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(fp)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(fp, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row
+
+
+def import_rows(key, rows, on_error, skip_invalid=False, chunk_size=CHUNK_SIZE):
+    """Make the valid (line number, row) 'rows' the records of dataset 'key'
+
+    They replace the records of the active backend, which must be one
+    that stores them for every worker: the JSON files or SQLite.
+
+    on_error(line number, message) is called for every invalid row,
+    duplicates of an earlier key included. Unless 'skip_invalid', one
+    invalid row cancels the import; so does having no valid row at all.
+    Cancelled imports raise ImportCancelled and change nothing. Returns
+    (rows imported, rows rejected).
+    """
+    validate = _VALIDATORS[key]
+    # key -> line number of its first row
+    seen = {}
+    rejected = 0
+
+    def records():
+        nonlocal rejected
+        rows_left = iter(rows)
+        while chunk := list(itertools.islice(rows_left, chunk_size)):
+            valid = []
+            for line, row in chunk:
+                try:
+                    if not isinstance(row, dict):
+                        raise ValueError("not a JSON object")
+                    record, record_key = validate(row)
+                    first = seen.setdefault(record_key, line)
+                    if first != line:
+                        raise ValueError(f"duplicate of line {first}")
+                except ValueError as error:
+                    rejected += 1
+                    on_error(line, str(error))
+                    continue
+                valid.append(record)
+            yield from valid
+        # Raised inside the write, so the new file is thrown away
+        if rejected and not skip_invalid:
+            raise ImportCancelled(
+                f"{rejected} invalid rows (pass --skip-invalid to import the others)"
+            )
+        if not seen:
+            raise ImportCancelled("no rows to import")
+
+    try:
+        imported = provider.replace_dataset(key, records())
+    except NotImplementedError as error:
+        raise ImportCancelled(str(error)) from None
+    return imported, rejected
+
+
+def export_records(key, fp, fmt, chunk_size=CHUNK_SIZE):
+    """Write every record of dataset 'key' of the active backend to 'fp'
+
+    Records are streamed from the backend; each chunk is written at
+    once. Returns the number of records written.
+    """
+    records = provider.iter_clubs() if key == "clubs" else provider.iter_competitions()
+    if fmt == "csv":
+        writer = csv.DictWriter(fp, FIELDS[key])
+        writer.writeheader()
+
+        def write(chunk):
+            writer.writerows(record.to_dict() for record in chunk)
+    else:
+        def write(chunk):
+            fp.write("".join(
+                json.dumps(record.to_dict(), separators=(",", ":")) + "\n" for record in chunk
+            ))
+
+    count = 0
+    while chunk := list(itertools.islice(records, chunk_size)):
+        write(chunk)
+        count += len(chunk)
+    return count
+
+
+def _format_of(path, fmt):
+    """'fmt', or the format told by the name of 'path' (NDJSON for stdin/stdout)"""
+    if fmt:
+        return fmt
+    if path == "-":
+        return "ndjson"
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    raise click.UsageError(f"Cannot tell the format of {path!r}, pass --format")
+
+
+def _open(path, mode):
+    """Text file at 'path', or stdin/stdout for '-' (which _close() leaves open)"""
+    if path == "-":
+        return sys.stdin if mode == "r" else sys.stdout
+    # The csv module does its own newline handling
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _close(fp, path):
+    if path != "-":
+        fp.close()
+
+
+def _throughput(count, seconds):
+    return f"{count:,} in {seconds:.2f}s ({count / max(seconds, 1e-9):,.0f} rows/s)"
+
+
+_dataset_argument = click.argument("dataset", type=click.Choice(sorted(FIELDS)))
+_format_option = click.option(
+    "--format", "fmt", type=click.Choice(FORMATS), help="Default: from the file name."
+)
+_chunk_size_option = click.option(
+    "--chunk-size", type=click.IntRange(min=1), default=CHUNK_SIZE, show_default=True,
+    help="Rows handled at a time.",
+)
+
+
+@click.command("import-data")
+@_dataset_argument
+@click.argument("path", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@_format_option
+@click.option("--skip-invalid", is_flag=True, help="Import the valid rows anyway.")
+@click.option(
+    "--errors", "errors_path", type=click.Path(dir_okay=False),
+    help="Write every invalid row (line, error) to this CSV file.",
+)
+@_chunk_size_option
+def import_data_command(dataset, path, fmt, skip_invalid, errors_path, chunk_size):
+    """Replace the clubs or competitions by the rows of a CSV or NDJSON file.
+
+    The fields are those of the JSON files: name, email, points for
+    clubs, name, date, spotsAvailable for competitions. The records of
+    the active backend (PROVIDER_BACKEND) are replaced at once, and
+    running workers reload them; the memory backend cannot import. With
+    JSON files, pending bookings are folded into them first: import
+    while nobody is booking.
+    """
+    fmt = _format_of(path, fmt)
+    errors_file = _open(errors_path, "w") if errors_path else None
+    errors_writer = csv.writer(errors_file) if errors_file else None
+    if errors_writer:
+        errors_writer.writerow(("line", "error"))
+    shown = 0
+
+    def on_error(line, message):
+        nonlocal shown
+        if errors_writer:
+            errors_writer.writerow((line, message))
+        if shown < SHOWN_ERRORS:
+            click.echo(f"line {line}: {message}", err=True)
+            shown += 1
+
+    start = time.perf_counter()
+    fp = _open(path, "r")
+    try:
+        imported, rejected = import_rows(
+            dataset, read_rows(fp, fmt), on_error, skip_invalid, chunk_size
+        )
+    except ImportCancelled as error:
+        raise SystemExit(f"Nothing imported: {error}")
+    finally:
+        _close(fp, path)
+        if errors_file:
+            errors_file.close()
+    summary = f"Imported {dataset} {_throughput(imported, time.perf_counter() - start)}"
+    if rejected:
+        summary += f", {rejected:,} invalid rows skipped"
+    click.echo(summary, err=True)
+
+
+@click.command("export-data")
+@_dataset_argument
+@click.argument("path", default="-", type=click.Path(dir_okay=False, allow_dash=True))
+@_format_option
+@_chunk_size_option
+def export_data_command(dataset, path, fmt, chunk_size):
+    """Write the current clubs or competitions as CSV or NDJSON.
+
+    The values include every booking made so far. PATH defaults to the
+    standard output, in NDJSON unless --format csv is given.
+    """
+    fmt = _format_of(path, fmt)
+    start = time.perf_counter()
+    fp = _open(path, "w")
+    try:
+        count = export_records(dataset, fp, fmt, chunk_size)
+    finally:
+        _close(fp, path)
+    click.echo(
+        f"Exported {dataset} {_throughput(count, time.perf_counter() - start)}", err=True
+    )
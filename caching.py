@@ -0,0 +1,114 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import make_response, request
+from markupsafe import Markup
+from werkzeug.http import is_resource_modified
+
+from provider import data_version, get_backend
+
+
+def make_etag(*parts):
+    """Strong ETag value for the stored data version and 'parts'
+
+    The version is that of the stored data, not this process's counter,
+    so a tag means the same data in every worker and after a restart.
+    """
+    backend = get_backend()
+    version = (type(backend).__name__, backend.stored_version())
+    key = "\x1f".join(str(part) for part in (version, *parts))
+    return hashlib.blake2s(key.encode(), digest_size=12).hexdigest()
+
+
+def last_modified():
+    """Last-Modified date of the data, or None until the second it changed in is over
+
+    HTTP dates have a one second resolution, so the change time is rounded
+    up, and only given once that second is over: a later change can then
+    never fall in the second a client was told about.
+    """
+    _, changed_at = data_version()
+    modified = math.ceil(changed_at)
+    if time.time() < modified:
+        return None
+    return datetime.fromtimestamp(modified, tz=timezone.utc)
+
+
+def conditional_render(render, *parts, public=False, dated=False):
+    """Answer 304 when the client's copy is current, otherwise call 'render'
+
+    The ETag validator is derived from the data version and 'parts'
+    (whatever else the page depends on), so a matching If-None-Match
+    costs no template rendering at all. Only 'dated' pages, which depend
+    on the data and their URL alone, also get a Last-Modified date.
+    Responses must be revalidated before reuse: shared caches may keep
+    'public' pages, the others are private to the browser.
+    """
+    etag = make_etag(*parts)
+    modified = last_modified() if dated else None
+    if is_resource_modified(request.environ, etag=etag, last_modified=modified):
+        response = make_response(render())
+    else:
+        response = make_response("", 304)
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    if public:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+class FragmentCache:
+    """Size-bounded LRU cache of rendered HTML fragments
+
+    Entries belong to the data version they were rendered from: the first
+    access after a booking or reload empties the cache. A fragment that
+    also depends on something else passes its 'version', and is rendered
+    again in place when that changed.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, render, version=None):
+        """Return the fragment cached under 'key' at 'version', rendering it on a miss"""
+        data, _ = data_version()
+        with self._lock:
+            if data != self._version:
+                self._entries.clear()
+                self._version = data
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        fragment = Markup(render())
+        with self._lock:
+            # Dropped if a newer version already reset the cache meanwhile
+            if self._version == data:
+                self._entries[key] = (version, fragment)
+                self._entries.move_to_end(key)
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
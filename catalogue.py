@@ -0,0 +1,76 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+
+class Catalogue:
+    """Competition names sorted by date
+
+    Upcoming/past partitions and date ranges are found by bisection, so a
+    query costs O(log n) plus the size of the slice it returns. Only names
+    and dates are kept; records are looked up by name when needed.
+    """
+
+    def __init__(self, competitions):
+        pairs = sorted((competition.date, competition.name) for competition in competitions)
+        self._dates = [date for date, _ in pairs]
+        self._names = [name for _, name in pairs]
+        self._date_by_name = {}
+        for date, name in pairs:
+            self._date_by_name.setdefault(name, date)
+
+    def __len__(self):
+        return len(self._names)
+
+    def date_of(self, name):
+        """Parsed date of the competition called 'name', or None"""
+        return self._date_by_name.get(name)
+
+    def _split(self, now):
+        """Index of the first upcoming competition (date >= now)"""
+        return bisect_left(self._dates, now or datetime.now())
+
+    def count_upcoming(self, now=None):
+        return len(self._names) - self._split(now)
+
+    def upcoming(self, now=None):
+        """Names of upcoming competitions, soonest first"""
+        return self._names[self._split(now):]
+
+    def past(self, now=None):
+        """Names of past competitions, most recent first"""
+        return self._names[:self._split(now)][::-1]
+
+    def seek(self, date, name):
+        """Position of the first competition after (date, name) in date order"""
+        low = bisect_left(self._dates, date)
+        high = bisect_right(self._dates, date, low)
+        return bisect_right(self._names, name, low, high)
+
+    def first_upcoming(self, now=None):
+        """Position of the soonest upcoming competition in date order"""
+        return self._split(now)
+
+    def names_from(self, position, limit):
+        """Up to 'limit' names from 'position' on, in date order"""
+        return self._names[position:position + limit]
+
+    def between(self, start, end):
+        """Names of competitions with start <= date < end, in date order"""
+        return self._names[bisect_left(self._dates, start):bisect_left(self._dates, end)]
+
+    def page(self, number, size, now=None):
+        """Names on 1-based page 'number': upcoming competitions first, then past ones"""
+        split = self._split(now)
+        upcoming_count = len(self._names) - split
+        start = (number - 1) * size
+        stop = start + size
+        names = self._names[split + start:split + min(stop, upcoming_count)]
+        if stop > upcoming_count:
+            # Past competitions follow, most recent first: position k maps to split - 1 - k
+            first = max(start - upcoming_count, 0)
+            last = min(stop - upcoming_count, split)
+            names += [self._names[split - 1 - k] for k in range(first, last)]
+        return names
+
+    def page_count(self, size):
+        return max(1, -(-len(self._names) // size))
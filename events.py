@@ -0,0 +1,127 @@
+"""Server-sent events: live spots left, pushed to open summary pages
+
+One Broadcaster per process fans each event out to every subscriber's
+bounded queue without ever waiting; a subscriber whose queue is full is
+too slow to keep up and is dropped (its browser reconnects and reloads
+the page's figures from there). AvailabilityFeed turns spot counts into
+deltas, publishing only the competitions whose count changed.
+"""
+
+import json
+import queue
+import threading
+
+# Tells the browser how long to wait before reconnecting, in milliseconds
+RETRY_MS = 5000
+
+
+def format_event(event, data):
+    """'data' (JSON-encoded) as a server-sent event named 'event'"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """The queue of events waiting to be sent to one client"""
+
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, size):
+        self.queue = queue.Queue(size)
+        self.dropped = False
+
+
+class Broadcaster:
+    """In-process fan-out of events to subscribers with bounded queues"""
+
+    def __init__(self, queue_size=64):
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, message):
+        """Queue 'message' for every subscriber; return how many got it
+
+        Subscribers whose queue is full are dropped: their stream ends
+        instead of falling further behind or blocking the publisher.
+        """
+        delivered = 0
+        with self._lock:
+            for subscription in list(self._subscribers):
+                try:
+                    subscription.queue.put_nowait(message)
+                    delivered += 1
+                except queue.Full:
+                    self._drop(subscription)
+        return delivered
+
+    def _drop(self, subscription):
+        """Remove 'subscription' and end its stream (called with the lock held)"""
+        self._subscribers.discard(subscription)
+        subscription.dropped = True
+        self.dropped += 1
+        # Only publishers put, under the lock, so freeing one slot is enough
+        try:
+            subscription.queue.get_nowait()
+        except queue.Empty:
+            pass
+        subscription.queue.put_nowait(None)
+
+    def stream(self, subscription, heartbeat=15, timeout=None):
+        """Yield the events of 'subscription' as text, until dropped or closed
+
+        A comment line is sent after 'heartbeat' idle seconds so proxies keep
+        the connection open and dead clients are noticed. With 'timeout', the
+        stream ends after that many idle seconds in total; the browser then
+        reconnects, which frees the worker thread in between.
+        """
+        idle = 0
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            while timeout is None or idle < timeout:
+                try:
+                    message = subscription.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    idle += heartbeat
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscription)
+
+
+class AvailabilityFeed:
+    """Publish the spots left of competitions, only those that changed"""
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+        self._lock = threading.Lock()
+        # competition -> spots left last published
+        self._last = {}
+
+    def publish(self, spots):
+        """Publish {competition: spots left}; return the changed part, if any"""
+        with self._lock:
+            changed = {
+                name: left for name, left in spots.items() if self._last.get(name) != left
+            }
+            if not changed:
+                return {}
+            self._last.update(changed)
+            self.broadcaster.publish(format_event("spots", changed))
+        return changed
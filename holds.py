@@ -0,0 +1,146 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+def spots_left(competition, holds):
+    """Spots of 'competition' neither booked nor held ('holds' may be None)"""
+    if holds is None:
+        return competition.spots_available
+    return max(competition.spots_available - holds.held(competition.name), 0)
+
+
+def holds_version(holds):
+    """Version of the held totals of 'holds' ('holds' may be None)
+
+    Pages and validators showing spots left depend on it on top of the
+    data version; holds never change points.
+    """
+    return 0 if holds is None else holds.version
+
+
+class SpotHolds:
+    """Short-lived holds on competition spots, one per (club, competition)
+
+    Expiry times sit in a min-heap, so expiring is a peek at its top plus
+    O(log n) per hold that is due; nothing ever scans every hold. Holds
+    replaced or released early leave their heap entry behind, and it is
+    skipped when it comes up. 'on_change' is called with the names of the
+    competitions whenever their held totals change (e.g. to refresh pages
+    showing spots left), and 'version' is incremented.
+    """
+
+    def __init__(self, ttl=120, on_change=None):
+        self.ttl = ttl
+        self._on_change = on_change
+        self._lock = threading.Lock()
+        # (club, competition) -> (spots, expires, seq)
+        self._holds = {}
+        # competition -> spots held by all clubs
+        self._held = {}
+        # club -> spots it holds over every competition
+        self._held_by_club = {}
+        # (expires, seq, (club, competition))
+        self._heap = []
+        self._seq = itertools.count()
+        self.version = 0
+
+    def __len__(self):
+        return len(self._holds)
+
+    def _drop(self, key):
+        """Remove the hold of 'key' (called with the lock held)"""
+        spots = self._holds.pop(key)[0]
+        self.version += 1
+        for totals, name in ((self._held, key[1]), (self._held_by_club, key[0])):
+            left = totals[name] - spots
+            if left:
+                totals[name] = left
+            else:
+                del totals[name]
+        return spots
+
+    def _expire(self, now):
+        """Drop the holds due at 'now', return their competitions (lock held)"""
+        expired = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, seq, key = heapq.heappop(heap)
+            hold = self._holds.get(key)
+            if hold is not None and hold[2] == seq:
+                self._drop(key)
+                expired.append(key[1])
+        return expired
+
+    def _changed(self, competitions):
+        if competitions and self._on_change is not None:
+            self._on_change(set(competitions))
+
+    def expire(self, now=None):
+        """Drop every hold whose time is up; return how many went"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self._heap or self._heap[0][0] > now:
+                return 0
+            expired = self._expire(now)
+        self._changed(expired)
+        return len(expired)
+
+    def hold(self, club, competition, spots, now=None):
+        """Hold 'spots' of 'competition' for 'club' for ttl seconds
+
+        Replaces the club's previous hold on the competition. Returns the
+        monotonic time at which the hold expires.
+        """
+        now = time.monotonic() if now is None else now
+        expires = now + self.ttl
+        key = (club, competition)
+        with self._lock:
+            changed = self._expire(now)
+            if key in self._holds:
+                self._drop(key)
+            seq = next(self._seq)
+            self._holds[key] = (spots, expires, seq)
+            self._held[competition] = self._held.get(competition, 0) + spots
+            self._held_by_club[club] = self._held_by_club.get(club, 0) + spots
+            self.version += 1
+            heapq.heappush(self._heap, (expires, seq, key))
+        self._changed(changed + [competition])
+        return expires
+
+    def release(self, club, competition):
+        """Drop the club's hold on 'competition'; return the spots it held"""
+        with self._lock:
+            if (club, competition) not in self._holds:
+                return 0
+            spots = self._drop((club, competition))
+        self._changed([competition])
+        return spots
+
+    def clear(self):
+        with self._lock:
+            self._holds.clear()
+            self._held.clear()
+            self._held_by_club.clear()
+            self._heap.clear()
+            self.version += 1
+
+    def held(self, competition):
+        """Spots of 'competition' held by every club"""
+        return self._held.get(competition, 0)
+
+    def held_by(self, club, competition):
+        """(spots, seconds left) of the club's hold on 'competition', or (0, 0)"""
+        hold = self._holds.get((club, competition))
+        if hold is None:
+            return 0, 0
+        return hold[0], max(hold[1] - time.monotonic(), 0)
+
+    def held_by_club(self, club):
+        """Spots held by 'club' over every competition"""
+        return self._held_by_club.get(club, 0)
+
+    def held_by_others(self, club, competition):
+        """Spots of 'competition' held by clubs other than 'club'"""
+        return self.held(competition) - self.held_by(club, competition)[0]
@@ -0,0 +1,65 @@
+import threading
+from bisect import bisect_left, insort
+
+
+class Leaderboard:
+    """Clubs ordered by points (highest first), updated one club at a time
+
+    Entries are kept in a list sorted by (-points, name, key), so a rank
+    is a bisection and a page is a slice. A booking moves a single entry
+    instead of re-sorting every club. 'key' maps a club to its unique key.
+    """
+
+    def __init__(self, clubs, key=lambda club: club.email):
+        self._lock = threading.Lock()
+        self._key = key
+        self._entries = {}
+        for club in clubs:
+            key = self._key(club)
+            self._entries.setdefault(key, (-club.points, club.name, key))
+        self._order = sorted(self._entries.values())
+
+    def __len__(self):
+        return len(self._order)
+
+    def update(self, club):
+        """Move 'club' to the position matching its current points"""
+        key = self._key(club)
+        entry = (-club.points, club.name, key)
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous == entry:
+                return
+            if previous is not None:
+                del self._order[bisect_left(self._order, previous)]
+            insort(self._order, entry)
+            self._entries[key] = entry
+
+    def rank(self, key):
+        """1-based rank of the club with 'key' (ties share a rank), or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return bisect_left(self._order, (entry[0],)) + 1
+
+    def seek(self, points, name, skip=1):
+        """Offset following the first 'skip' clubs with exactly 'points' and 'name'
+
+        Used to resume a listing after its last row without exposing the
+        club keys that break such ties.
+        """
+        return bisect_left(self._order, (-points, name)) + skip
+
+    def count_at_least(self, points):
+        """Number of clubs with 'points' or more"""
+        return bisect_left(self._order, (-points + 1,))
+
+    def top(self, offset=0, limit=10):
+        """Clubs ranked offset+1 .. offset+limit as {"name", "points", "rank"} dicts"""
+        with self._lock:
+            window = self._order[offset:offset + limit]
+            rows = []
+            for negative_points, name, _ in window:
+                rank = bisect_left(self._order, (negative_points,)) + 1
+                rows.append({"name": name, "points": -negative_points, "rank": rank})
+        return rows
@@ -0,0 +1,58 @@
+import threading
+
+
+class Ledger:
+    """Bookings made by each club, with running totals per (club, competition)
+
+    Totals are kept up to date as bookings are added, so the spots a club
+    already holds in a competition are one dict lookup away, and a club's
+    history is its own list instead of a scan of every booking. Clubs are
+    identified by their key (normalized email), competitions by name.
+    """
+
+    def __init__(self, bookings=()):
+        self._lock = threading.Lock()
+        self._bookings = []
+        self._totals = {}
+        self._history = {}
+        self._ids = set()
+        for booking in bookings:
+            self.add(booking)
+
+    def __len__(self):
+        return len(self._bookings)
+
+    def add(self, booking):
+        """Record 'booking'; returns False if a booking with its id is already in"""
+        with self._lock:
+            if booking.id is not None:
+                if booking.id in self._ids:
+                    return False
+                self._ids.add(booking.id)
+            key = (booking.club, booking.competition)
+            self._totals[key] = self._totals.get(key, 0) + booking.spots
+            self._history.setdefault(booking.club, []).append(booking)
+            self._bookings.append(booking)
+            return True
+
+    def remove(self, booking):
+        """Take back a booking added earlier (its write failed)"""
+        with self._lock:
+            self._bookings.remove(booking)
+            self._history[booking.club].remove(booking)
+            self._totals[booking.club, booking.competition] -= booking.spots
+            self._ids.discard(booking.id)
+
+    def booked(self, club, competition):
+        """Spots booked so far by club key 'club' in competition 'competition'"""
+        return self._totals.get((club, competition), 0)
+
+    def history(self, club):
+        """Bookings of club key 'club', oldest first"""
+        with self._lock:
+            return list(self._history.get(club, ()))
+
+    def bookings(self):
+        """Every booking, in the order they were added"""
+        with self._lock:
+            return list(self._bookings)
@@ -0,0 +1,332 @@
+"""Synthetic data generator and local load driver
+
+Generate a large dataset, then replay a mix of requests against it:
+
+    python loadtest.py generate --clubs 100000 --competitions 10000 --out /tmp/gudlft-data
+    python loadtest.py run --data /tmp/gudlft-data --workers 8 --duration 30
+
+'run' drives the app in-process through Flask test clients (default) or
+over HTTP through a local threaded WSGI server (--wsgi), and writes
+per-route throughput and p50/p95/p99 latencies to outputs/.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from records import DATE_FORMAT
+
+OUTPUT_FOLDER = Path(__file__).parent / "outputs"
+# Relative weight of each scenario in the request mix
+DEFAULT_MIX = {"login": 1, "summary": 5, "book": 2, "points": 3}
+
+_SYLLABLES = ["iron", "lift", "strong", "bar", "plate", "power", "steel", "peak", "north",
+              "river", "oak", "stone", "titan", "atlas", "forge", "summit"]
+_KINDS = ["Club", "Gym", "Barbell", "Athletics", "Lifters", "Temple"]
+_EVENTS = ["Open", "Classic", "Cup", "Festival", "Challenge", "Invitational", "Trophy"]
+
+
+def _write_array(path, key, records):
+    """Write {key: [records...]} to 'path' one record at a time"""
+    with open(path, "w") as fp:
+        fp.write('{\n    "%s": [' % key)
+        for number, record in enumerate(records):
+            fp.write(",\n        " if number else "\n        ")
+            fp.write(json.dumps(record))
+        fp.write("\n    ]\n}\n")
+
+
+def _clubs(count, rng):
+    for number in range(count):
+        words = rng.sample(_SYLLABLES, 2)
+        name = f"{words[0].title()} {words[1].title()} {rng.choice(_KINDS)} {number}"
+        yield {
+            "name": name,
+            "email": f"{words[0]}.{words[1]}.{number}@clubs.test",
+            "points": str(rng.randint(0, 60)),
+        }
+
+
+def _competitions(count, rng, now):
+    for number in range(count):
+        # A third of the competitions are in the past
+        date = now + timedelta(days=rng.randint(-365, 730), minutes=rng.randrange(0, 1440, 30))
+        yield {
+            "name": f"{rng.choice(_SYLLABLES).title()} {rng.choice(_EVENTS)} {number}",
+            "date": date.strftime(DATE_FORMAT),
+            "spotsAvailable": str(rng.randint(5, 120)),
+        }
+
+
+def generate(folder, clubs=100_000, competitions=10_000, seed=0):
+    """Write clubs.json and competitions.json with the given sizes into 'folder'
+
+    Records are streamed to disk, so memory use does not depend on the sizes.
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    now = datetime.now().replace(second=0, microsecond=0)
+    _write_array(folder / "clubs.json", "clubs", _clubs(clubs, rng))
+    _write_array(
+        folder / "competitions.json", "competitions", _competitions(competitions, rng, now)
+    )
+    return folder
+
+
+def _percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(samples, elapsed):
+    """Per-route {count, errors, rps, p50/p95/p99 in ms} from (route, seconds, ok) samples"""
+    routes = {}
+    for route, seconds, ok in samples:
+        entry = routes.setdefault(route, {"latencies": [], "errors": 0})
+        entry["latencies"].append(seconds)
+        if not ok:
+            entry["errors"] += 1
+    report = {}
+    for route, entry in sorted(routes.items()):
+        ordered = sorted(entry["latencies"])
+        report[route] = {
+            "count": len(ordered),
+            "errors": entry["errors"],
+            "rps": round(len(ordered) / elapsed, 1) if elapsed else None,
+            **{
+                name: round(_percentile(ordered, fraction) * 1000, 2)
+                for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+            },
+        }
+    return report
+
+
+class _ClientSession:
+    """One simulated user of the in-process app, through a Flask test client"""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def get(self, path):
+        return self._client.get(path).status_code
+
+    def post(self, path, data):
+        return self._client.post(path, data=data).status_code
+
+
+class _HttpSession:
+    """One simulated user talking HTTP to a running server, with its own cookies"""
+
+    def __init__(self, base_url):
+        self._base_url = base_url
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(),
+            _NoRedirect(),
+        )
+
+    def _open(self, request):
+        try:
+            with self._opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self._base_url + path))
+
+    def post(self, path, data):
+        body = urllib.parse.urlencode(data).encode()
+        return self._open(urllib.request.Request(self._base_url + path, data=body))
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report redirects as they are, like the test client does"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _scenarios(session, emails, competitions, rng):
+    """Map scenario names to callables returning the HTTP status they got"""
+
+    def login():
+        return session.post("/login", {"email": rng.choice(emails)})
+
+    def summary():
+        return session.get(f"/summary?page={rng.randint(1, 3)}")
+
+    def book():
+        return session.post("/book", {"competition": rng.choice(competitions), "spots": "1"})
+
+    def points():
+        return session.get(f"/points?page={rng.randint(1, 20)}")
+
+    return {"login": login, "summary": summary, "book": book, "points": points}
+
+
+def _worker(make_session, emails, competitions, mix, deadline, max_requests, seed, samples):
+    rng = random.Random(seed)
+    session = make_session()
+    scenarios = _scenarios(session, emails, competitions, rng)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    # Every simulated user starts logged in, as real users would
+    scenarios["login"]()
+    count = 0
+    while time.monotonic() < deadline and (max_requests is None or count < max_requests):
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        status = scenarios[name]()
+        samples.append((name, time.perf_counter() - start, status < 500))
+        count += 1
+
+
+def run(data_folder, workers=8, duration=10.0, max_requests=None, mix=None, wsgi=False,
+        seed=0):
+    """Replay the request mix against the app serving 'data_folder'
+
+    Returns the report (see summarize) plus the run settings.
+    """
+    import provider
+
+    provider.DATA_FOLDER = str(Path(data_folder).resolve())
+    provider.invalidate_cache()
+    from server import create_app
+
+    # Every simulated user shares one IP, which the login throttle would block
+    app = create_app({"LOGIN_THROTTLE": "off"})
+    mix = mix or DEFAULT_MIX
+    emails = [club.email for club in provider.iter_clubs()]
+    competitions = [competition.name for competition in provider.iter_competitions()]
+    # Warm the caches so the first requests do not measure the load
+    provider.get_clubs()
+    provider.get_competitions()
+
+    server = None
+    if wsgi:
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class _QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        make_session = lambda: _HttpSession(base_url)  # noqa: E731
+    else:
+        make_session = lambda: _ClientSession(app)  # noqa: E731
+
+    samples = []
+    start = time.monotonic()
+    deadline = start + duration
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(make_session, emails, competitions, mix, deadline, max_requests,
+                  seed + number, samples),
+        )
+        for number in range(workers)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if server is not None:
+            server.shutdown()
+    elapsed = time.monotonic() - start
+    return {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "mode": "wsgi" if wsgi else "test-client",
+        "workers": workers,
+        "elapsed": round(elapsed, 2),
+        "clubs": len(emails),
+        "competitions": len(competitions),
+        "routes": summarize(samples, elapsed),
+    }
+
+
+def write_report(report, folder=OUTPUT_FOLDER):
+    """Write 'report' as JSON and as a text table into 'folder'; return both paths"""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    stem = "loadtest-" + datetime.now().strftime("%Y%m%d-%H%M%S")
+    json_path = folder / f"{stem}.json"
+    text_path = folder / f"{stem}.txt"
+    json_path.write_text(json.dumps(report, indent=4) + "\n")
+    lines = [
+        f"{report['mode']}, {report['workers']} workers, {report['elapsed']}s, "
+        f"{report['clubs']} clubs, {report['competitions']} competitions",
+        "",
+        f"{'route':<10}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}",
+    ]
+    for route, row in report["routes"].items():
+        lines.append(
+            f"{route:<10}{row['count']:>8}{row['errors']:>8}{row['rps']:>10}{row['p50']:>10}"
+            f"{row['p95']:>10}{row['p99']:>10}"
+        )
+    text_path.write_text("\n".join(lines) + "\n")
+    return json_path, text_path
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser("generate", help="write a synthetic dataset")
+    generate_parser.add_argument("--clubs", type=int, default=100_000)
+    generate_parser.add_argument("--competitions", type=int, default=10_000)
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.add_argument("--out", required=True, help="folder for the JSON files")
+
+    run_parser = commands.add_parser("run", help="replay a request mix and report latencies")
+    run_parser.add_argument("--data", required=True, help="folder with the JSON files")
+    run_parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    run_parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    run_parser.add_argument("--requests", type=int, help="stop each worker after N requests")
+    run_parser.add_argument("--mix", type=_parse_mix, help="e.g. login=1,summary=5,book=2")
+    run_parser.add_argument("--wsgi", action="store_true", help="go through a local server")
+    run_parser.add_argument("--output", default=str(OUTPUT_FOLDER))
+    run_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        folder = generate(args.out, args.clubs, args.competitions, args.seed)
+        print(f"Wrote {args.clubs} clubs and {args.competitions} competitions to {folder}")
+        return
+    report = run(args.data, args.workers, args.duration, args.requests, args.mix, args.wsgi,
+                 args.seed)
+    json_path, text_path = write_report(report, args.output)
+    print(text_path.read_text(), end="")
+    print(f"\nReport written to {json_path}")
+
+
+if __name__ == "__main__":
+    main()
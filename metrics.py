@@ -0,0 +1,251 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the latency histogram buckets (+Inf is implied)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Per-thread {stage: seconds} of the request being tracked, see track_stages()
+_stages = threading.local()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield self.name + _labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Bucketed distribution of observed values, per label set
+
+    Observing is a bisection and two additions under a lock; buckets are
+    only made cumulative when the metrics are scraped. Observations of a
+    histogram with a 'stage' also add up in the current thread's
+    track_stages() totals.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS,
+                 stage=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.stage = stage
+        self._lock = threading.Lock()
+        # labels -> [count per bucket (last one is +Inf), sum]
+        self._values = {}
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+        if self.stage is not None:
+            totals = getattr(_stages, "totals", None)
+            if totals is not None:
+                totals[self.stage] = totals.get(self.stage, 0.0) + value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the time spent in the 'with' block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels):
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, (list(counts), total))
+                            for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = (("le", _number(bound)),)
+                yield self.name + "_bucket" + _labels(self.labelnames, labels, le), cumulative
+            yield self.name + "_sum" + _labels(self.labelnames, labels), total
+            yield self.name + "_count" + _labels(self.labelnames, labels), cumulative
+
+
+class Registry:
+    """Metrics of this process, rendered in the Prometheus text format
+
+    'collectors' are called at scrape time and return (name, kind,
+    documentation, [(labels dict, value)]) tuples for values that are kept
+    elsewhere, such as cache counters.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS,
+                  stage=None):
+        metric = Histogram(name, documentation, labelnames, buckets, stage)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, collect):
+        self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {_number(value)}" for name, value in metric.samples())
+        for collect in self._collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = _labels(labels.keys(), labels.values())
+                    lines.append(f"{name}{label_text} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "gudlft_request_duration_seconds", "Time spent handling requests", ("endpoint",)
+)
+requests_total = registry.counter(
+    "gudlft_requests_total", "Requests handled", ("endpoint", "method", "status")
+)
+data_load_duration = registry.histogram(
+    "gudlft_data_load_seconds", "Time spent loading a dataset from disk", ("dataset",),
+    stage="load",
+)
+lookup_duration = registry.histogram(
+    "gudlft_lookup_seconds", "Time spent in club and competition lookups", ("kind",),
+    stage="lookup",
+)
+render_duration = registry.histogram(
+    "gudlft_template_render_seconds", "Time spent rendering templates", ("template",),
+    stage="render",
+)
+login_throttled_total = registry.counter(
+    "gudlft_login_throttled_total", "Login attempts rejected by the rate limiter", ("bucket",)
+)
+bookings_total = registry.counter(
+    "gudlft_bookings_total", "Booking attempts by outcome (booked or the rejection reason)",
+    ("outcome",)
+)
+
+_render_starts = threading.local()
+
+
+@contextmanager
+def track_stages():
+    """Collect {stage: seconds} spent in this thread during the 'with' block
+
+    Yields the dict, which is filled in as load, lookup and render timers
+    are observed.
+    """
+    previous = getattr(_stages, "totals", None)
+    totals = _stages.totals = {}
+    try:
+        yield totals
+    finally:
+        _stages.totals = previous
+
+
+def _before_render(sender, template, context, **extra):
+    stack = getattr(_render_starts, "stack", None)
+    if stack is None:
+        stack = _render_starts.stack = []
+    stack.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    stack = getattr(_render_starts, "stack", None)
+    if stack:
+        render_duration.observe(time.perf_counter() - stack.pop(), template.name or "<string>")
+
+
+def instrument(app):
+    """Record request latencies, counts by status and template render times of 'app'"""
+    # Imported here so the provider can record its timings without Flask
+    from flask import before_render_template, g, request, template_rendered
+
+    def observe(status):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return
+        endpoint = request.endpoint or "unmatched"
+        request_duration.observe(time.perf_counter() - start, endpoint)
+        requests_total.inc(endpoint, request.method, str(status))
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        observe(response.status_code)
+        return response
+
+    @app.teardown_request
+    def _record_failure(error):
+        # after_request is skipped for unhandled exceptions
+        if error is not None:
+            observe(500)
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
@@ -0,0 +1,167 @@
+"""Opt-in request profiling and slow-request log
+
+Requests are sampled into cProfile with config["PROFILE_SAMPLE_RATE"]
+(0 to 1). With config["PROFILE_SLOW_REQUESTS"] every request runs under
+the profiler, but only the profiles of requests slower than
+config["SLOW_REQUEST_SECONDS"] are kept. Requests slower than that
+threshold are also appended to slow_requests.log as JSON lines, with
+the time spent loading data, in lookups and rendering.
+
+Everything goes to config["PROFILE_FOLDER"]; only the newest
+config["PROFILE_MAX_FILES"] profiles are kept and the log is rotated at
+config["SLOW_LOG_MAX_BYTES"]. Open a profile with
+'python -m pstats <file>.prof' or snakeviz.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from urllib.parse import parse_qsl
+
+from werkzeug.exceptions import HTTPException
+
+from metrics import track_stages
+
+PROFILE_SUFFIX = ".prof"
+SLOW_LOG_NAME = "slow_requests.log"
+SLOW_LOG_BACKUPS = 3
+
+
+def _slug(value):
+    return "".join(char if char.isalnum() else "_" for char in value).strip("_") or "root"
+
+
+def prune_profiles(folder, keep):
+    """Delete all but the newest 'keep' profiles in 'folder'; return how many went"""
+    try:
+        # Names start with a timestamp, so they sort oldest first
+        names = sorted(entry.name for entry in os.scandir(folder)
+                       if entry.name.endswith(PROFILE_SUFFIX))
+    except FileNotFoundError:
+        return 0
+    stale = names[:max(len(names) - keep, 0)]
+    for name in stale:
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
+    return len(stale)
+
+
+class ProfilingMiddleware:
+    """WSGI middleware profiling sampled requests and logging slow ones
+
+    Timings cover the call of the wrapped app, not the iteration of a
+    streamed response body. Only one request is profiled at a time, the
+    others run as usual.
+    """
+
+    def __init__(self, wsgi_app, app):
+        self.wsgi_app = wsgi_app
+        self.app = app
+        self._profiling = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._logger = None
+        self._log_path = None
+
+    def __call__(self, environ, start_response):
+        config = self.app.config
+        rate = config["PROFILE_SAMPLE_RATE"]
+        threshold = config["SLOW_REQUEST_SECONDS"]
+        if not rate and threshold is None:
+            return self.wsgi_app(environ, start_response)
+
+        sampled = bool(rate) and random.random() < rate
+        profile_slow = threshold is not None and config["PROFILE_SLOW_REQUESTS"]
+        profiler = None
+        if (sampled or profile_slow) and self._profiling.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        status = []
+
+        def _start_response(status_line, headers, exc_info=None):
+            status[:] = [status_line]
+            return start_response(status_line, headers, exc_info)
+
+        start = time.perf_counter()
+        with track_stages() as stages:
+            try:
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    return self.wsgi_app(environ, _start_response)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+            finally:
+                if profiler is not None:
+                    self._profiling.release()
+                elapsed = time.perf_counter() - start
+                slow = threshold is not None and elapsed >= threshold
+                self._finish(environ, status, elapsed, stages, slow,
+                             profiler if sampled or slow else None)
+
+    def _finish(self, environ, status, elapsed, stages, slow, profiler):
+        if not slow and profiler is None:
+            return
+        folder = self.app.config["PROFILE_FOLDER"]
+        endpoint, view_args = self._route(environ)
+        profile = None
+        if profiler is not None:
+            os.makedirs(folder, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            profile = f"{stamp}-{_slug(endpoint)}-{round(elapsed * 1000)}ms{PROFILE_SUFFIX}"
+            profiler.dump_stats(os.path.join(folder, profile))
+            prune_profiles(folder, self.app.config["PROFILE_MAX_FILES"])
+        if slow:
+            record = {
+                "time": datetime.now().isoformat(timespec="milliseconds"),
+                "method": environ.get("REQUEST_METHOD"),
+                "path": environ.get("PATH_INFO"),
+                "endpoint": endpoint,
+                "args": {**view_args, **dict(parse_qsl(environ.get("QUERY_STRING", "")))},
+                "status": int(status[0].split(" ", 1)[0]) if status else 500,
+                "seconds": round(elapsed, 6),
+                "stages": {stage: round(seconds, 6) for stage, seconds in sorted(stages.items())},
+                "profile": profile,
+            }
+            self._slow_logger(folder).info(json.dumps(record, default=str))
+
+    def _route(self, environ):
+        """Endpoint name and view arguments of the request, as Flask matched them"""
+        try:
+            endpoint, view_args = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return "unmatched", {}
+        return endpoint, view_args
+
+    def _slow_logger(self, folder):
+        path = os.path.join(folder, SLOW_LOG_NAME)
+        with self._log_lock:
+            if self._log_path != path:
+                os.makedirs(folder, exist_ok=True)
+                logger = logging.getLogger(f"{__name__}.{id(self)}")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                for handler in logger.handlers[:]:
+                    logger.removeHandler(handler)
+                    handler.close()
+                handler = RotatingFileHandler(
+                    path, maxBytes=self.app.config["SLOW_LOG_MAX_BYTES"],
+                    backupCount=SLOW_LOG_BACKUPS, delay=True,
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                self._logger, self._log_path = logger, path
+            return self._logger
+
+
+def install_profiling(app):
+    """Wrap 'app' in the profiling middleware; it stays idle until configured"""
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, app)
+    return app.wsgi_app
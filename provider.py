@@ -1,22 +1,1155 @@
+import dataclasses
 import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from catalogue import Catalogue
+from jsonstream import iter_array
+from leaderboard import Leaderboard
+from ledger import Ledger
+from metrics import data_load_duration, lookup_duration
+from records import Booking, Club, Competition
+from versions import DATASETS, SharedVersions
+
 DATA_FOLDER = "data"
+# Seconds during which a cached dataset is served without even a stat() call
+CACHE_REVALIDATE_SECONDS = 1.0
+# Append-only log of bookings, replayed on top of the JSON snapshots
+JOURNAL_FILE = "bookings.journal"
+# Number of journal entries after which snapshots are rewritten in the background
+COMPACT_AFTER_ENTRIES = 1000
+# Every booking ever made, written by compactions (newer ones are in the journal)
+LEDGER_FILE = "bookings.json"
+# Version counters of the datasets, memory-mapped by every worker (see versions.py)
+VERSIONS_FILE = "versions.bin"
+# Locked with lockf() by every worker: byte 0 guards the journal file (shared while
+# appending, exclusive while reopening or rotating it), byte 1 compactions
+LOCK_FILE = JOURNAL_FILE + ".lock"
+_JOURNAL_LOCK = 0
+_COMPACTION_LOCK = 1
+
+_cache = {}
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "refreshes": 0}
+# Lookup indexes, keyed by field name: (indexed records, {key: record})
+_indexes = {}
+# [shared version, Ledger, journal position] of each data folder, keyed by the
+# path of its LEDGER_FILE
+_ledgers = {}
+# Shared version counters of each data folder, keyed by the path of its VERSIONS_FILE
+_shared = {}
+_shared_lock = threading.Lock()
+# (pid, descriptor) of the LOCK_FILE of each data folder, reopened after a fork
+_lock_fds = {}
+# Bumped whenever data seen by the routes may have changed: (number, unix time).
+# It lives in this process and restarts at 0: see Backend.stored_version()
+_data_version = (0, time.time())
+# Tells this process's data versions apart from those of earlier or other processes
+_BOOT_ID = os.urandom(8).hex()
+_data_version_lock = threading.Lock()
+
+
+def bump_data_version():
+    """Record that the data changed (a booking, a reload or a new backend)"""
+    global _data_version
+    with _data_version_lock:
+        _data_version = (_data_version[0] + 1, time.time())
+
+
+def data_version():
+    """Return (version number, unix time of the last change) of the data"""
+    return _data_version
+
+
+def _data_path(filename):
+    """Absolute path of 'filename' inside the data folder"""
+    return Path(__file__).parent / DATA_FOLDER / filename
+
+
+def _shared_versions():
+    """Version counters of the data folder, shared with the other workers"""
+    path = str(_data_path(VERSIONS_FILE))
+    versions = _shared.get(path)
+    if versions is None:
+        with _shared_lock:
+            versions = _shared.get(path)
+            if versions is None:
+                versions = _shared[path] = SharedVersions(path)
+    return versions
+
+
+def _lock_fd():
+    """Descriptor of the data folder's LOCK_FILE, reopened after a fork"""
+    path = str(_data_path(LOCK_FILE))
+    with _shared_lock:
+        pid, fd = _lock_fds.get(path, (None, None))
+        if pid != os.getpid():
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            _lock_fds[path] = (os.getpid(), fd)
+        return fd
+
+
+@contextmanager
+def _locked(offset, shared=False, blocking=True):
+    """Hold lockf() on byte 'offset' of LOCK_FILE, shared by every worker process
+
+    Yields False, holding nothing, when not 'blocking' and another process
+    holds the lock. Locks belong to the process: threads of the same
+    process must exclude each other by other means.
+    """
+    if fcntl is None:
+        yield True
+        return
+    fd = _lock_fd()
+    operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    try:
+        fcntl.lockf(fd, operation if blocking else operation | fcntl.LOCK_NB, 1, offset)
+    except OSError:
+        if blocking:
+            raise
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        fcntl.lockf(fd, fcntl.LOCK_UN, 1, offset)
+
+
+def _file_stamp(filepath):
+    """Cheap version stamp of a file: (mtime in ns, size)"""
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
 
 
 def _json_from_file(filename, key):
-    """Helper method - loads JSON from 'filename' and return whatever is at the 'key'"""
-    filepath = Path(__file__).parent / DATA_FOLDER / filename
-    with open(filepath) as fp:
-        data = json.load(fp)
-        return data[key]
+    """Helper method - loads the records at 'key' of the JSON in 'filename'
+
+    Records are built once, as Club/Competition objects. The parsed data is
+    kept in a process-level cache. When another worker booked (the
+    dataset's shared version moved, checked on every call at the cost of a
+    memory read), the journal entries appended since the data was loaded
+    are applied to it. It is re-read in full when the journal was rotated
+    meanwhile, or when the file's mtime/size stamp changes (a compaction,
+    an import or an edit by hand), the stamp being checked at most once
+    every CACHE_REVALIDATE_SECONDS.
+    """
+    filepath = _data_path(filename)
+    cache_key = (str(filepath), key)
+    now = time.monotonic()
+    versions = _shared_versions()
+
+    with _cache_lock:
+        # Read under the lock, where this worker's own bookings move it too
+        version = versions.get(key)
+        entry = _cache.get(cache_key)
+        if entry is not None and entry["version"] == version:
+            if now - entry["checked"] < CACHE_REVALIDATE_SECONDS:
+                _cache_stats["hits"] += 1
+                return entry["data"]
+            if _file_stamp(filepath) == entry["stamp"]:
+                entry["checked"] = now
+                _cache_stats["hits"] += 1
+                return entry["data"]
+        elif entry is not None and _file_stamp(filepath) == entry["stamp"]:
+            if _refresh(entry, key, version):
+                entry["checked"] = now
+                _cache_stats["refreshes"] += 1
+                bump_data_version()
+                return entry["data"]
+
+        _cache_stats["misses"] += 1
+        stamp = _file_stamp(filepath)
+        updates, position = _journal_updates(key)
+        data = []
+        field, normalize = _INDEXED_FIELDS[key]
+        index = {}
+        positions = {}
+        # Records are streamed in and indexed in the same pass
+        with data_load_duration.time(key):
+            for record in _iter_json_records(filename, key, updates):
+                value = getattr(record, field)
+                value = normalize(value) if normalize else value
+                index.setdefault(value, record)
+                positions.setdefault(_record_key(key, record), len(data))
+                data.append(record)
+        _indexes[field] = (data, index)
+        _cache[cache_key] = {
+            "data": data,
+            "stamp": stamp,
+            "checked": now,
+            "version": version,
+            # Where the journal was read up to, and the list position of each record key
+            "journal": position,
+            "positions": positions,
+        }
+        bump_data_version()
+        return data
+
+
+def _refresh(entry, key, version):
+    """Apply the journal entries appended since cache 'entry' was loaded
+
+    Called with the cache lock held. Records whose journaled value differs
+    are replaced by updated copies, so callers still holding the previous
+    ones are refused as a conflict when they book. Returns False, changing
+    nothing, when the journal was rotated meanwhile (reload in full then).
+    """
+    entries, position = _journal_tail(entry["journal"])
+    if position is None:
+        return False
+    entry_key, journaled, attribute = _JOURNALED_FIELDS[key]
+    updates = {
+        item[entry_key]: int(item[journaled])
+        for item in entries if item.get(entry_key) is not None
+    }
+    data = entry["data"]
+    field, normalize = _INDEXED_FIELDS[key]
+    index = _index_for(data, field, normalize)
+    replaced = []
+    for record_key, value in updates.items():
+        i = entry["positions"].get(record_key)
+        # This worker's own bookings are already applied
+        if i is None or getattr(data[i], attribute) == value:
+            continue
+        record = data[i] = dataclasses.replace(data[i], **{attribute: value})
+        index[record_key] = record
+        replaced.append(record)
+    entry["version"] = version
+    entry["journal"] = position
+    if key == "clubs" and isinstance(_backend, JsonBackend):
+        for club in replaced:
+            _backend.club_changed(club)
+    return True
+
+
+def _cached_records(filename, key):
+    """The cached list for 'filename' if it is loaded and still fresh, else None"""
+    filepath = _data_path(filename)
+    versions = _shared_versions()
+    with _cache_lock:
+        entry = _cache.get((str(filepath), key))
+        current = entry is not None and entry["version"] == versions.get(key)
+    if not current or _file_stamp(filepath) != entry["stamp"]:
+        return None
+    return entry["data"]
+
+
+def _iter_json_records(filename, key, updates=None):
+    """Yield the records at 'key' of 'filename' one by one, journal applied
+
+    Only one record is decoded at a time, so memory use does not grow with
+    the size of the file. 'updates' are those of _journal_updates(), read
+    before the file is opened when not given.
+    """
+    record_type = _RECORD_TYPES[key]
+    if updates is None:
+        updates, _ = _journal_updates(key)
+    _, _, field = _JOURNALED_FIELDS[key]
+    with open(_data_path(filename)) as fp:
+        for data in iter_array(fp, key):
+            record = record_type.from_dict(data)
+            if updates:
+                value = updates.get(_record_key(key, record))
+                if value is not None:
+                    setattr(record, field, value)
+            yield record
+
+
+def invalidate_cache(filename=None):
+    """Drop cached data for 'filename', or for every file when not given"""
+    with _cache_lock:
+        if filename is None:
+            _cache.clear()
+            _ledgers.clear()
+            with _shared_lock:
+                for versions in _shared.values():
+                    versions.close()
+                _shared.clear()
+                for pid, fd in _lock_fds.values():
+                    if pid == os.getpid():
+                        os.close(fd)
+                _lock_fds.clear()
+            return
+        filepath = str(_data_path(filename))
+        for cache_key in [k for k in _cache if k[0] == filepath]:
+            del _cache[cache_key]
+
+
+def cache_info():
+    """Return cache hit/miss counters and the number of cached datasets"""
+    with _cache_lock:
+        return {**_cache_stats, "size": len(_cache)}
+
+
+def reset_cache_stats():
+    """Set the cache counters of cache_info() back to zero"""
+    with _cache_lock:
+        for name in _cache_stats:
+            _cache_stats[name] = 0
+
+
+def normalize_email(email):
+    """Canonical form of an email address used as lookup key"""
+    return email.strip().casefold()
+
+
+# Record type and snapshot file of each dataset
+_RECORD_TYPES = {"clubs": Club, "competitions": Competition}
+_DATASET_FILES = {"clubs": "clubs.json", "competitions": "competitions.json"}
+# Field each dataset is looked up by, and how its values are normalized
+_INDEXED_FIELDS = {"clubs": ("email", normalize_email), "competitions": ("name", None)}
+
+
+def _index_for(records, field, normalize=None):
+    """Return a {key: record} map over 'records', rebuilt only when the list changes
+
+    The provider hands out the same cached list until the underlying file
+    changes, so in steady state this is a single identity check.
+    """
+    indexed = _indexes.get(field)
+    if indexed is not None and indexed[0] is records:
+        return indexed[1]
+    index = {}
+    for record in records:
+        key = getattr(record, field)
+        if normalize is not None:
+            key = normalize(key)
+        # Keep the first record on duplicates, like the former linear scans
+        index.setdefault(key, record)
+    _indexes[field] = (records, index)
+    return index
+
+
+class _Journal:
+    """Append-only, fsync'd booking journal with group commit
+
+    Writers queue their line and wait; whichever thread finds no flush in
+    progress writes and fsyncs everything queued so far, so concurrent
+    bookings share a single fsync. Every worker process appends to the
+    same file; when one of them rotates it away (see compact_journal),
+    the others notice the new file by its inode and reopen it.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = []
+        self._queued_seq = 0
+        self._synced_seq = 0
+        self._failed_seq = 0
+        self._flushing = False
+        self._fp = None
+        self._path = None
+        self.entries = 0
+
+    def _is_current(self):
+        """Whether the open file is still the data folder's journal"""
+        if self._fp is None or self._path != _data_path(JOURNAL_FILE):
+            return False
+        try:
+            return os.stat(self._path).st_ino == os.fstat(self._fp.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _open(self):
+        """Open the journal unless already open (called with the exclusive file lock)"""
+        if self._is_current():
+            return
+        self.close()
+        path = _data_path(JOURNAL_FILE)
+        fp = open(path, "a+b")
+        fp.seek(0)
+        complete = entries = 0
+        for line in fp:
+            if not line.endswith(b"\n"):
+                break
+            complete += len(line)
+            entries += 1
+        # A torn last line (a crash mid-write) is cut off: the next entry
+        # would otherwise be appended to it and be unreadable as well
+        if complete < os.fstat(fp.fileno()).st_size:
+            fp.truncate(complete)
+        self._fp = fp
+        self._path = path
+        self.entries = entries
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+        self._fp = None
+        self._path = None
+
+    def append(self, entry):
+        """Append 'entry' and return once it is durably on disk"""
+        return self.wait(self.enqueue(entry))
+
+    def enqueue(self, entry):
+        """Queue 'entry' behind the lines queued so far; return its number for wait()"""
+        line = (json.dumps(entry) + "\n").encode()
+        with self._cond:
+            self._pending.append(line)
+            self._queued_seq += 1
+            return self._queued_seq
+
+    def wait(self, seq):
+        """Return the entry count once line 'seq' is durably on disk"""
+        with self._cond:
+            while self._synced_seq < seq:
+                if seq <= self._failed_seq:
+                    raise OSError("Booking journal write failed")
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                self._flush()
+            return self.entries
+
+    def _write(self, data):
+        """Append 'data' to the journal file and fsync it
+
+        Workers append under a shared lock; the file is (re)opened under
+        the exclusive one, so no other worker is mid-write when a torn
+        line is cut off, or when the file is rotated.
+        """
+        while True:
+            with _locked(_JOURNAL_LOCK, shared=True):
+                if self._is_current():
+                    self._fp.write(data)
+                    self._fp.flush()
+                    os.fsync(self._fp.fileno())
+                    return
+            with _locked(_JOURNAL_LOCK):
+                self._open()
+
+    def _flush(self):
+        """Write and fsync every queued line (called with the condition held)"""
+        batch, self._pending = self._pending, []
+        last_seq = self._queued_seq
+        self._flushing = True
+        try:
+            self._cond.release()
+            try:
+                self._write(b"".join(batch))
+            finally:
+                self._cond.acquire()
+        except OSError:
+            self._failed_seq = last_seq
+            raise
+        else:
+            self._synced_seq = last_seq
+            self.entries += len(batch)
+        finally:
+            self._flushing = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def idle(self):
+        """Hold the condition once no flush is in progress"""
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            yield
+
+    def rotate(self, target):
+        """Move the journal file to 'target' and start a fresh one
+
+        Returns False when there is nothing to rotate.
+        """
+        with self.idle(), _locked(_JOURNAL_LOCK):
+            path = _data_path(JOURNAL_FILE)
+            try:
+                if os.stat(path).st_size == 0:
+                    return False
+            except FileNotFoundError:
+                return False
+            self.close()
+            os.replace(path, target)
+            self._open()
+            return True
+
+
+_journal = _Journal()
+_compaction_lock = threading.Lock()
+
+
+def _read_journal(path, position=None, create=False):
+    """(entries, position) of the complete lines of journal file 'path'
+
+    Batches are flattened; a torn last line is left out. Reading resumes
+    at 'position', an (inode, offset) pair returned by an earlier call,
+    while the file still has that inode, and starts over otherwise. The
+    position returned follows the last complete line, or is None when
+    there is no such file (created empty first when 'create' is set).
+    """
+    try:
+        fp = open(path, "rb")
+    except FileNotFoundError:
+        if not create:
+            return [], None
+        try:
+            fp = os.fdopen(os.open(path, os.O_RDONLY | os.O_CREAT, 0o644), "rb")
+        except OSError:
+            # A read-only data folder: nothing can be journaled there anyway
+            return [], None
+    with fp:
+        inode = os.fstat(fp.fileno()).st_ino
+        offset = 0
+        if position is not None and position[0] == inode:
+            offset = position[1]
+            fp.seek(offset)
+        entries = []
+        for line in fp:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                parsed = json.loads(line)
+            except ValueError:
+                continue
+            entries.extend(parsed.get("batch", (parsed,)))
+    return entries, (inode, offset)
+
+
+# Journal entry fields per dataset: (entry key, journaled entry field, record attribute)
+_JOURNALED_FIELDS = {
+    "clubs": ("club", "points", "points"),
+    "competitions": ("competition", "spotsAvailable", "spots_available"),
+}
+
+
+def _record_key(key, record):
+    """Key of a record of dataset 'key' in journal entries"""
+    if key == "clubs":
+        return normalize_email(record.email)
+    return record.name
+
+
+def _journal_entries():
+    """(every journaled entry oldest first, position of the journal read)
+
+    The journal is read before the file compactions rotate it to, and both
+    before the caller opens a snapshot: an entry a concurrent compaction
+    moves away is then still read from the other file, or already part of
+    the snapshot. The journal is created if need be, so that later entries
+    can be read from the position returned.
+    """
+    current, position = _read_journal(_data_path(JOURNAL_FILE), create=True)
+    compacting, _ = _read_journal(_data_path(JOURNAL_FILE + ".compacting"))
+    return compacting + current, position
+
+
+def _journal_tail(position):
+    """(entries, position) of the journal appended after 'position'
+
+    Returns (None, None) when there is no position to resume from, or the
+    journal was rotated since (its entries may then be in a file not read).
+    """
+    if position is None:
+        return None, None
+    entries, current = _read_journal(_data_path(JOURNAL_FILE), position)
+    if current is None or current[0] != position[0]:
+        return None, None
+    return entries, current
+
+
+def _journal_updates(key):
+    """(latest journaled values of dataset 'key' as {record key: value}, journal position)
+
+    Entries carry absolute values, so applying one that is already part of
+    the snapshot is harmless.
+    """
+    entry_key, field, _ = _JOURNALED_FIELDS[key]
+    entries, position = _journal_entries()
+    updates = {}
+    for entry in entries:
+        if entry.get(entry_key) is not None:
+            updates[entry[entry_key]] = int(entry[field])
+    return updates, position
+
+
+def _load_ledger():
+    """(Ledger read from the LEDGER_FILE snapshot then the journal, journal position)
+
+    Journaled bookings that a compaction already copied to the snapshot
+    are skipped by id.
+    """
+    entries, position = _journal_entries()
+    ledger = Ledger()
+    try:
+        with open(_data_path(LEDGER_FILE)) as fp:
+            for data in iter_array(fp, "bookings"):
+                ledger.add(Booking.from_dict(data))
+    except FileNotFoundError:
+        pass
+    _add_bookings(ledger, entries)
+    return ledger, position
+
+
+def _add_bookings(ledger, entries):
+    for entry in entries:
+        if entry.get("spots") is not None:
+            ledger.add(Booking.from_dict(entry))
+
+
+def _json_ledger():
+    """Ledger of the data folder (see _load_ledger)
+
+    Built on first use and kept up to date by bookings; when another
+    worker booked, the journal entries appended since are added, or the
+    ledger is rebuilt if the journal was rotated meanwhile.
+    """
+    path = str(_data_path(LEDGER_FILE))
+    versions = _shared_versions()
+    with _cache_lock:
+        version = versions.get("bookings")
+        cached = _ledgers.get(path)
+        if cached is not None:
+            if cached[0] == version:
+                return cached[1]
+            entries, position = _journal_tail(cached[2])
+            if position is not None:
+                _add_bookings(cached[1], entries)
+                cached[0] = version
+                cached[2] = position
+                return cached[1]
+        ledger, position = _load_ledger()
+        _ledgers[path] = [version, ledger, position]
+        return ledger
+
+
+def _cache_keys():
+    """Cache keys of the clubs and competitions of the data folder"""
+    return (
+        (str(_data_path("clubs.json")), "clubs"),
+        (str(_data_path("competitions.json")), "competitions"),
+    )
+
+
+def _is_cached(entry, field, normalize, records):
+    """Whether 'records' are the ones in cache 'entry' (called with the cache lock held)"""
+    if entry is None:
+        return False
+    index = _index_for(entry["data"], field, normalize)
+    for record in records:
+        value = getattr(record, field)
+        if index.get(normalize(value) if normalize else value) is not record:
+            return False
+    return True
+
+
+def _journal_bookings(club, items):
+    """Apply (competition, spots) 'items' booked by 'club' and journal them
+
+    The new values are written to the journal (shared fsync with concurrent
+    bookings) before returning; several items share one journal line, so
+    they are replayed all together or not at all. Validation is up to the
+    caller. Returns False, applying nothing, when the records were replaced
+    since the caller looked them up (another worker booked meanwhile).
+    """
+    # Reloads whatever another worker changed
+    _json_from_file("clubs.json", "clubs")
+    _json_from_file("competitions.json", "competitions")
+    _json_ledger()
+    clubs_key, competitions_key = _cache_keys()
+    previous = []
+    booked = []
+    entries = []
+    # Apply first: a compaction snapshot then always contains every
+    # journaled booking it rotates away
+    with _cache_lock:
+        applied_to = (
+            _cache.get(clubs_key),
+            _cache.get(competitions_key),
+            _ledgers.get(str(_data_path(LEDGER_FILE))),
+        )
+        if (
+            applied_to[2] is None
+            or not _is_cached(applied_to[0], "email", normalize_email, [club])
+            or not _is_cached(applied_to[1], "name", None, [c for c, _ in items])
+        ):
+            return False
+        ledger = applied_to[2][1]
+        for competition, spots in items:
+            previous.append((club, "points", club.points))
+            previous.append((competition, "spots_available", competition.spots_available))
+            club.points -= spots
+            competition.spots_available -= spots
+            booking = Booking.new(normalize_email(club.email), competition.name, spots)
+            ledger.add(booking)
+            booked.append(booking)
+            # Values are journaled in the same string form as the snapshots
+            entries.append({
+                "club": booking.club,
+                "points": str(club.points),
+                "competition": competition.name,
+                "spotsAvailable": str(competition.spots_available),
+                "spots": spots,
+                "at": booking.at.isoformat(timespec="seconds"),
+                "id": booking.id,
+            })
+        # Entries carry absolute values, so they are queued in the order the
+        # values were applied; waiting for the fsync happens outside the lock
+        seq = _journal.enqueue(entries[0] if len(entries) == 1 else {"batch": entries})
+    try:
+        count = _journal.wait(seq)
+    except OSError:
+        with _cache_lock:
+            for record, field, value in reversed(previous):
+                setattr(record, field, value)
+            for booking in booked:
+                ledger.remove(booking)
+        raise
+    _bump_shared_versions(*applied_to)
+    if count >= COMPACT_AFTER_ENTRIES:
+        _start_compaction()
+    return True
+
+
+def _bump_shared_versions(clubs_entry, competitions_entry, ledger_entry):
+    """Tell the other workers a booking was journaled
+
+    The given cache entries and ledger already include the booking; they
+    take the new versions unless they were replaced or another worker
+    booked in between, in which case they are reloaded on next use.
+    """
+    clubs_key, competitions_key = _cache_keys()
+    ledger_path = str(_data_path(LEDGER_FILE))
+    with _cache_lock:
+        clubs, competitions, bookings = _shared_versions().bump(
+            "clubs", "competitions", "bookings"
+        )
+        for key, entry, version in (
+            (clubs_key, clubs_entry, clubs),
+            (competitions_key, competitions_entry, competitions),
+        ):
+            if _cache.get(key) is entry and entry["version"] == version - 1:
+                entry["version"] = version
+        if _ledgers.get(ledger_path) is ledger_entry and ledger_entry[0] == bookings - 1:
+            ledger_entry[0] = bookings
+
+
+def _atomic_write_json(filename, payload):
+    """Write 'payload' to 'filename' through a temporary file and a rename"""
+    _atomic_write(filename, lambda fp: json.dump(payload, fp, indent=4))
+
+
+def _write_json_array(fp, key, items):
+    """Write {key: [items]} to 'fp' as json.dump(..., indent=4) would, item by item
+
+    Returns the number of items written.
+    """
+    fp.write("{\n    %s: [" % json.dumps(key))
+    count = 0
+    for item in items:
+        fp.write(("\n" if count == 0 else ",\n") + "        ")
+        fp.write(json.dumps(item, indent=4).replace("\n", "\n        "))
+        count += 1
+    fp.write("\n    ]\n}" if count else "]\n}")
+    return count
+
+
+def _atomic_write(filename, write):
+    """Call write(fp) on a temporary file, then rename it to 'filename'
+
+    The file is only replaced once write() returned and the data is on
+    disk; if write() raises, the temporary file is removed. Returns what
+    write() returned.
+    """
+    filepath = _data_path(filename)
+    fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=filename, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as fp:
+            result = write(fp)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    dir_fd = os.open(filepath.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return result
+
+
+@contextmanager
+def _compaction(blocking):
+    """Hold the compaction lock of this process and of every worker
+
+    Yields False, holding nothing, when not 'blocking' and a compaction
+    is already running.
+    """
+    if not _compaction_lock.acquire(blocking=blocking):
+        yield False
+        return
+    try:
+        with _locked(_COMPACTION_LOCK, blocking=blocking) as acquired:
+            yield acquired
+    finally:
+        _compaction_lock.release()
+
+
+def compact_journal():
+    """Fold the journal into new clubs.json/competitions.json snapshots
+
+    Returns False when there was nothing to compact or another compaction,
+    in this worker or another one, is already running.
+    """
+    with _compaction(blocking=False) as acquired:
+        return acquired and _compact()
+
+
+def _compact():
+    """Body of compact_journal(), called with the compaction locks held"""
+    compacting = _data_path(JOURNAL_FILE + ".compacting")
+    # A leftover from an interrupted compaction is still replayed on load
+    if not compacting.exists() and not _journal.rotate(compacting):
+        return False
+    versions = _shared_versions()
+    for key, filename in _DATASET_FILES.items():
+        # Streamed from the files rather than copied from memory, where
+        # another worker's latest bookings may not have arrived yet
+        def write(fp, key=key, filename=filename):
+            records = _iter_json_records(filename, key)
+            return _write_json_array(fp, key, (record.to_dict() for record in records))
+
+        _atomic_write(filename, write)
+        with _cache_lock:
+            entry = _cache.get((str(_data_path(filename)), key))
+            # Unless another booking came in, the new file holds this worker's copy
+            if entry is not None and entry["version"] == versions.get(key):
+                entry["stamp"] = _file_stamp(_data_path(filename))
+    bookings = [booking.to_dict() for booking in _load_ledger()[0].bookings()]
+    _atomic_write_json(LEDGER_FILE, {"bookings": bookings})
+    os.unlink(compacting)
+    return True
+
+
+def _start_compaction():
+    """Run compact_journal() in a background thread unless one is running"""
+    if not _compaction_lock.locked():
+        threading.Thread(target=compact_journal, name="journal-compaction", daemon=True).start()
+
+
+def _replace_json_dataset(key, records):
+    """Replace the JSON snapshot of dataset 'key' by 'records'
+
+    Records are streamed into a new snapshot that takes the place of the
+    old one in a single rename; if iterating 'records' raises, nothing
+    changes. The journal is folded into the snapshots first, as replaying
+    it would otherwise override the new values; no worker compacts until
+    the new snapshot is in place, and they all carry on journaling into
+    the fresh journal. Every worker then reloads the dataset, and rebuilds
+    its index, once. Returns the number of records written.
+    """
+    filename = _DATASET_FILES[key]
+    with _compaction(blocking=True):
+        _compact()
+        count = _atomic_write(
+            filename, lambda fp: _write_json_array(fp, key, (r.to_dict() for r in records))
+        )
+    invalidate_cache(filename)
+    with _cache_lock:
+        _shared_versions().bump(key)
+    bump_data_version()
+    return count
+
+
+def close_journal():
+    """Close the journal file (it is reopened on the next booking)"""
+    with _journal.idle():
+        _journal.close()
+
+
+def _build_leaderboard(clubs):
+    return Leaderboard(clubs, key=lambda club: normalize_email(club.email))
+
+
+class Backend:
+    """Storage interface behind the provider functions
+
+    Records are Club and Competition objects. Lookups return None on a
+    miss. book() applies an already validated booking to the given records
+    and persists it (book_many() does the same for several bookings at
+    once); they return False when the stored values changed in a way that
+    makes the booking impossible.
+    """
+
+    def get_clubs(self):
+        raise NotImplementedError
+
+    def get_competitions(self):
+        raise NotImplementedError
+
+    def iter_clubs(self):
+        """Yield the clubs one by one; backends may avoid loading them all"""
+        return iter(self.get_clubs())
+
+    def iter_competitions(self):
+        """Yield the competitions one by one; backends may avoid loading them all"""
+        return iter(self.get_competitions())
+
+    def find_club_by_email(self, email):
+        raise NotImplementedError
+
+    def find_competition_by_name(self, name):
+        raise NotImplementedError
+
+    def book(self, club, competition, spots):
+        return self.book_many(club, [(competition, spots)])
+
+    def book_many(self, club, items):
+        """Apply several (competition, spots) bookings of 'club', all or nothing"""
+        raise NotImplementedError
+
+    def get_catalogue(self):
+        """Date index of the competitions, built on first use
+
+        Bookings do not change names or dates, so it stays valid until the
+        competitions themselves are replaced (see invalidate_catalogue).
+        """
+        catalogue = getattr(self, "_catalogue", None)
+        if catalogue is None:
+            catalogue = self._catalogue = Catalogue(self.get_competitions())
+        return catalogue
+
+    def invalidate_catalogue(self):
+        self._catalogue = None
+
+    def get_leaderboard(self):
+        """Clubs ordered by points, built on first use and then kept up to date"""
+        leaderboard = getattr(self, "_leaderboard", None)
+        if leaderboard is None:
+            leaderboard = self._leaderboard = _build_leaderboard(self.get_clubs())
+        return leaderboard
+
+    def get_ledger(self):
+        """Ledger of the bookings made through this backend, built on first use"""
+        ledger = getattr(self, "_ledger", None)
+        if ledger is None:
+            ledger = self._ledger = Ledger()
+        return ledger
+
+    def booked_spots(self, club, competition):
+        """Spots 'club' booked so far in 'competition', over all its bookings"""
+        return self.get_ledger().booked(normalize_email(club.email), competition.name)
+
+    def club_bookings(self, club):
+        """Bookings made by 'club', oldest first"""
+        return self.get_ledger().history(normalize_email(club.email))
+
+    def sync(self):
+        """Catch up with changes other processes made to the stored data
+
+        Returns whether there were any (the data version is then bumped).
+        Called before every request; backends that check on access, or
+        whose data no other process changes, have nothing to do.
+        """
+        return False
+
+    def replace_dataset(self, key, records):
+        """Replace dataset 'key' ("clubs" or "competitions") by 'records'
+
+        All or nothing: if iterating 'records' raises, nothing changes.
+        Returns the number of records stored. Backends whose data does not
+        outlive the process, or is not shared with the workers, refuse.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot replace its data")
+
+    def stored_version(self):
+        """Version of the stored data, the same in every worker and after a restart
+
+        Used in ETags. Backends whose data only lives in this process tell
+        it apart from any other process's by the boot id and pid.
+        """
+        return _BOOT_ID, os.getpid(), data_version()[0]
+
+    def club_changed(self, club):
+        """Propagate new points of 'club' to the structures derived from it"""
+        leaderboard = getattr(self, "_leaderboard", None)
+        if leaderboard is not None:
+            leaderboard.update(club)
+
+    def close(self):
+        """Release resources held by the backend"""
+
+
+class JsonBackend(Backend):
+    """The JSON files in DATA_FOLDER, cached in memory, plus the booking journal"""
+
+    def replace_dataset(self, key, records):
+        return _replace_json_dataset(key, records)
+
+    def stored_version(self):
+        # The shared counters move with every booking and import; the stamps
+        # of the files catch edits by hand and a lost VERSIONS_FILE
+        versions = _shared_versions()
+        stamps = []
+        for filename in ("clubs.json", "competitions.json", JOURNAL_FILE):
+            try:
+                stamps.append(_file_stamp(_data_path(filename)))
+            except FileNotFoundError:
+                stamps.append(None)
+        return (*(versions.get(dataset) for dataset in DATASETS), *stamps)
+
+    def get_clubs(self):
+        return _json_from_file("clubs.json", "clubs")
+
+    def get_competitions(self):
+        return _json_from_file("competitions.json", "competitions")
+
+    def iter_clubs(self):
+        # Stream from the file unless the records are already in memory
+        clubs = _cached_records("clubs.json", "clubs")
+        if clubs is not None:
+            return iter(clubs)
+        return _iter_json_records("clubs.json", "clubs")
+
+    def iter_competitions(self):
+        competitions = _cached_records("competitions.json", "competitions")
+        if competitions is not None:
+            return iter(competitions)
+        return _iter_json_records("competitions.json", "competitions")
+
+    def find_club_by_email(self, email):
+        index = _index_for(self.get_clubs(), "email", normalize_email)
+        return index.get(normalize_email(email))
+
+    def find_competition_by_name(self, name):
+        return _index_for(self.get_competitions(), "name").get(name)
+
+    def get_catalogue(self):
+        # Rebuilt whenever the cache hands out a reloaded list
+        competitions = self.get_competitions()
+        if getattr(self, "_catalogue_source", None) is not competitions:
+            self._catalogue = Catalogue(competitions)
+            self._catalogue_source = competitions
+        return self._catalogue
+
+    def get_leaderboard(self):
+        clubs = self.get_clubs()
+        if getattr(self, "_leaderboard_source", None) is not clubs:
+            self._leaderboard = _build_leaderboard(clubs)
+            self._leaderboard_source = clubs
+        return self._leaderboard
+
+    def get_ledger(self):
+        return _json_ledger()
+
+    def book_many(self, club, items):
+        return _journal_bookings(club, items)
+
+    def close(self):
+        close_journal()
+
+
+_backend = JsonBackend()
+
+
+def get_backend():
+    """Return the backend the provider functions delegate to"""
+    return _backend
+
+
+def use_backend(backend):
+    """Make 'backend' the active backend and return the previous one"""
+    global _backend
+    previous, _backend = _backend, backend
+    bump_data_version()
+    return previous
 
 
 def get_clubs():
-    """Load clubs from JSON"""
-    return _json_from_file("clubs.json", "clubs")
+    """Load clubs from the active backend"""
+    return _backend.get_clubs()
 
 
 def get_competitions():
-    """Load competitions from JSON"""
-    return _json_from_file("competitions.json", "competitions")
+    """Load competitions from the active backend"""
+    return _backend.get_competitions()
+
+
+def iter_clubs():
+    """Yield the active backend's clubs without loading them all at once"""
+    return _backend.iter_clubs()
+
+
+def iter_competitions():
+    """Yield the active backend's competitions without loading them all at once"""
+    return _backend.iter_competitions()
+
+
+def find_club_by_email(email):
+    """Return the club registered with 'email' (case-insensitive), or None"""
+    with lookup_duration.time("club"):
+        return _backend.find_club_by_email(email)
+
+
+def find_competition_by_name(name):
+    """Return the competition called 'name', or None"""
+    with lookup_duration.time("competition"):
+        return _backend.find_competition_by_name(name)
+
+
+def get_catalogue():
+    """Return the date index of the active backend's competitions"""
+    return _backend.get_catalogue()
+
+
+def get_leaderboard():
+    """Return the points leaderboard of the active backend's clubs"""
+    return _backend.get_leaderboard()
+
+
+def club_rank(email):
+    """Rank of the club registered with 'email' on the points board, or None"""
+    return _backend.get_leaderboard().rank(normalize_email(email))
+
+
+def booked_spots(club, competition):
+    """Spots 'club' already holds in 'competition', over all its bookings"""
+    return _backend.booked_spots(club, competition)
+
+
+def club_bookings(club):
+    """Bookings made by 'club', oldest first"""
+    return _backend.club_bookings(club)
+
+
+def replace_dataset(key, records):
+    """Replace dataset 'key' ("clubs" or "competitions") of the active backend
+
+    Nothing changes if iterating 'records' raises. Returns the number of
+    records stored; raises NotImplementedError when the backend cannot
+    store imported data.
+    """
+    return _backend.replace_dataset(key, records)
+
+
+def record_booking(club, competition, spots):
+    """Apply a validated booking and persist it through the active backend
+
+    Returns False if the backend could not apply it (concurrent change).
+    """
+    return record_bookings(club, [(competition, spots)])
+
+
+def record_bookings(club, items):
+    """Apply validated (competition, spots) bookings of 'club', all or nothing
+
+    Returns False if the backend could not apply them (concurrent change).
+    """
+    applied = _backend.book_many(club, items)
+    if applied:
+        _backend.club_changed(club)
+        bump_data_version()
+    return applied
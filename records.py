@@ -0,0 +1,107 @@
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_date(value):
+    """Parse a competition date as stored in the data files"""
+    return datetime.strptime(value, DATE_FORMAT)
+
+
+def _to_int(value):
+    """'value' as an int, 0 when the stored value is not a number"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass
+class Club:
+    """A club, with its points as an int
+
+    Slotted: large datasets hold millions of these, and a slotted record
+    is a fraction of the size of the equivalent dict.
+    """
+
+    __slots__ = ("name", "email", "points")
+    name: str
+    email: str
+    points: int
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a club from its JSON shape (points stored as a string)"""
+        return cls(data["name"], data["email"], _to_int(data["points"]))
+
+    def to_dict(self):
+        """JSON shape of the club, as stored in clubs.json"""
+        return {"name": self.name, "email": self.email, "points": str(self.points)}
+
+
+@dataclass
+class Competition:
+    """A competition, with its date parsed and its spots left as an int"""
+
+    __slots__ = ("name", "date", "spots_available")
+    name: str
+    date: datetime
+    spots_available: int
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a competition from its JSON shape"""
+        return cls(data["name"], parse_date(data["date"]), _to_int(data["spotsAvailable"]))
+
+    def to_dict(self):
+        """JSON shape of the competition, as stored in competitions.json"""
+        return {
+            "name": self.name,
+            "date": self.date.strftime(DATE_FORMAT),
+            "spotsAvailable": str(self.spots_available),
+        }
+
+
+@dataclass
+class Booking:
+    """Spots booked by a club (its normalized email) in a competition
+
+    'id' tells replayed journal entries apart from ones already in the
+    ledger snapshot; bookings journaled before ids existed have none.
+    """
+
+    __slots__ = ("club", "competition", "spots", "at", "id")
+    club: str
+    competition: str
+    spots: int
+    at: datetime
+    id: str
+
+    @classmethod
+    def new(cls, club, competition, spots):
+        """A booking made now, with a fresh id"""
+        return cls(club, competition, spots, datetime.now().replace(microsecond=0),
+                   uuid.uuid4().hex)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a booking from a journal entry or a ledger snapshot entry"""
+        return cls(
+            data["club"],
+            data["competition"],
+            int(data["spots"]),
+            datetime.fromisoformat(data["at"]),
+            data.get("id"),
+        )
+
+    def to_dict(self):
+        """JSON shape of the booking, as stored in bookings.json"""
+        return {
+            "id": self.id,
+            "club": self.club,
+            "competition": self.competition,
+            "spots": self.spots,
+            "at": self.at.isoformat(timespec="seconds"),
+        }
@@ -1,128 +1,534 @@
-from datetime import datetime
+import gc
+import math
+import os
+import time
+
+import click
+from flask import (
+    Flask,
+    Response,
+    abort,
+    current_app,
+    flash,
+    has_app_context,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    session,
+    url_for,
+)
+
+from jinja2 import FileSystemBytecodeCache
+
+from api import api
+from backends import create_backend
+from booking import MAX_SPOTS_PER_BOOKING, BookingEngine, BookingError
+from bulk import export_data_command, import_data_command
+from caching import FragmentCache, conditional_render
+from events import AvailabilityFeed, Broadcaster
+from holds import SpotHolds, holds_version, spots_left
+from metrics import CONTENT_TYPE, bookings_total, instrument, login_throttled_total, registry
+from profiling import install_profiling
+from provider import (
+    booked_spots,
+    cache_info,
+    club_rank,
+    data_version,
+    find_club_by_email,
+    find_competition_by_name,
+    get_backend,
+    get_catalogue,
+    get_leaderboard,
+    normalize_email,
+    use_backend,
+)
+from sessions import create_session_interface, current_club
+from throttle import create_login_throttle
+
+POINTS_MAX_LIMIT = 500
+
+# (rule, view, options) of the views below, registered by create_app()
+_routes = []
+
+
+def route(rule, **options):
+    """Like app.route(), for the app create_app() is about to build"""
+    def decorator(view):
+        _routes.append((rule, view, options))
+        return view
+    return decorator
+
+
+def _configure(app, config):
+    """Apply 'config', then the defaults (mostly from the environment) of the rest"""
+    app.config.update(config or {})
+    # Set SECRET_KEY in production! (Flask's own default is None)
+    if not app.config["SECRET_KEY"]:
+        app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "something_special")
+    # Set to a file path when running several worker processes
+    app.config.setdefault("BOOKING_LOCK_FILE", os.environ.get("BOOKING_LOCK_FILE"))
+    # "json" (default), "memory" or "sqlite"
+    app.config.setdefault("PROVIDER_BACKEND", os.environ.get("PROVIDER_BACKEND", "json"))
+    app.config.setdefault("SQLITE_DATABASE", os.environ.get("SQLITE_DATABASE"))
+    # Competitions listed per page of the summary
+    app.config.setdefault("SUMMARY_PAGE_SIZE", 20)
+    # Clubs listed per page of the points board, ?limit= is capped at POINTS_MAX_LIMIT
+    app.config.setdefault("POINTS_PAGE_SIZE", 50)
+    # Rendered competition lists and points tables kept in memory
+    app.config.setdefault("FRAGMENT_CACHE_SIZE", 256)
+    # Server-side sessions: "memory" (default) or "sqlite" to share them between workers
+    app.config.setdefault("SESSION_STORE", os.environ.get("SESSION_STORE", "memory"))
+    app.config.setdefault("SESSION_SQLITE_DATABASE", os.environ.get("SESSION_SQLITE_DATABASE"))
+    app.config.setdefault("SESSION_MAX_ENTRIES", 100_000)
+    # Seconds a booking page holds spots for the club (0 disables holds), and the
+    # spots it holds unless the page is opened with ?spots=N
+    app.config.setdefault("SPOT_HOLD_SECONDS", 120)
+    app.config.setdefault("SPOT_HOLD_SPOTS", 1)
+    # Live spots left at /events, off by default: each open stream ties up a worker
+    # thread, so only turn it on with threaded or async workers (e.g. gunicorn
+    # --threads or gevent), never with a few sync workers
+    app.config.setdefault("LIVE_SPOTS", os.environ.get("LIVE_SPOTS") == "1")
+    # Events queued per client before it is dropped as too slow, seconds between
+    # keepalives, and idle seconds before a stream is closed (browsers reconnect)
+    # so it does not tie a worker thread up for good
+    app.config.setdefault("EVENTS_QUEUE_SIZE", 64)
+    app.config.setdefault("EVENTS_HEARTBEAT_SECONDS", 15)
+    app.config.setdefault("EVENTS_STREAM_SECONDS", 300)
+    # Login rate limiting: "memory" (default), "sqlite" to share it between workers, or "off"
+    app.config.setdefault("LOGIN_THROTTLE", os.environ.get("LOGIN_THROTTLE", "memory"))
+    app.config.setdefault(
+        "LOGIN_THROTTLE_SQLITE_DATABASE", os.environ.get("LOGIN_THROTTLE_SQLITE_DATABASE")
+    )
+    app.config.setdefault("LOGIN_THROTTLE_MAX_KEYS", 100_000)
+    # Login attempts allowed in a burst, then per minute, per client IP and per email
+    app.config.setdefault("LOGIN_IP_BURST", 20)
+    app.config.setdefault("LOGIN_IP_PER_MINUTE", 20)
+    app.config.setdefault("LOGIN_EMAIL_BURST", 5)
+    app.config.setdefault("LOGIN_EMAIL_PER_MINUTE", 5)
+    # Request profiling and slow-request log, both off by default (see profiling.py)
+    app.config.setdefault("PROFILE_SAMPLE_RATE", float(os.environ.get("PROFILE_SAMPLE_RATE") or 0))
+    slow = os.environ.get("SLOW_REQUEST_SECONDS")
+    app.config.setdefault("SLOW_REQUEST_SECONDS", float(slow) if slow else None)
+    app.config.setdefault("PROFILE_SLOW_REQUESTS", os.environ.get("PROFILE_SLOW_REQUESTS") == "1")
+    app.config.setdefault("PROFILE_FOLDER", os.environ.get(
+        "PROFILE_FOLDER", os.path.join(os.path.dirname(__file__), "outputs", "profiling")
+    ))
+    app.config.setdefault("PROFILE_MAX_FILES", 100)
+    app.config.setdefault("SLOW_LOG_MAX_BYTES", 5 * 1024 * 1024)
+    # Compiled templates shared by every worker and restart ("" to disable); templates
+    # are only reloaded from disk in debug mode unless TEMPLATES_AUTO_RELOAD is set
+    app.config.setdefault("TEMPLATE_CACHE_FOLDER", os.environ.get(
+        "TEMPLATE_CACHE_FOLDER", os.path.join(os.path.dirname(__file__), ".jinja_cache")
+    ))
+    # Warm up and freeze the heap in create_app(), for servers forking workers after import
+    app.config.setdefault("PRELOAD", os.environ.get("PRELOAD") == "1")
+
+
+def create_app(config=None):
+    """Build the app, configured by 'config' on top of the defaults
+
+    The data backend is process-wide, so the last app built is the one
+    whose backend the provider serves. With config["PRELOAD"], the data is
+    loaded and indexed and the templates compiled right away, then the
+    heap is frozen so that workers forked from this process share it
+    copy-on-write (e.g. 'PRELOAD=1 gunicorn --preload server:app').
+    """
+    app = Flask(__name__)
+    _configure(app, config)
+    if app.config["TEMPLATE_CACHE_FOLDER"]:
+        os.makedirs(app.config["TEMPLATE_CACHE_FOLDER"], exist_ok=True)
+        # Read when the Jinja environment is first created
+        app.jinja_options = {
+            **app.jinja_options,
+            "bytecode_cache": FileSystemBytecodeCache(app.config["TEMPLATE_CACHE_FOLDER"]),
+        }
+
+    app.session_interface = create_session_interface(
+        app.config, app.permanent_session_lifetime.total_seconds()
+    )
+    use_backend(create_backend(app.config))
+    feed = app.extensions["availability_feed"] = AvailabilityFeed(
+        Broadcaster(app.config["EVENTS_QUEUE_SIZE"])
+    )
+
+    def _spots_changed(names):
+        competitions = (find_competition_by_name(name) for name in names)
+        feed.publish({c.name: spots_left(c, holds) for c in competitions if c is not None})
+
+    holds = app.extensions["spot_holds"] = (
+        SpotHolds(app.config["SPOT_HOLD_SECONDS"], on_change=_spots_changed)
+        if app.config["SPOT_HOLD_SECONDS"] else None
+    )
+    app.extensions["booking_engine"] = BookingEngine(
+        lock_path=app.config["BOOKING_LOCK_FILE"], holds=holds, on_change=_spots_changed
+    )
+    app.extensions["fragment_cache"] = FragmentCache(app.config["FRAGMENT_CACHE_SIZE"])
+    app.extensions["login_throttle"] = create_login_throttle(app.config)
+    app.extensions["ready"] = False
+
+    for rule, view, options in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+
+    @app.before_request
+    def _sync_backend():
+        # Bookings of other workers, before any page or validator is built from the data
+        get_backend().sync()
+
+    if holds is not None:
+        @app.before_request
+        def _expire_holds():
+            # A peek at the heap unless a hold is due
+            holds.expire()
+
+    app.register_blueprint(api)
+    app.cli.command("precompile-templates")(_precompile_templates_command)
+    app.cli.add_command(import_data_command)
+    app.cli.add_command(export_data_command)
+    instrument(app)
+    install_profiling(app)
+
+    if app.config["PRELOAD"]:
+        warm_up(app)
+        # Connections and open files must not be shared with forked workers,
+        # they are reopened on first use
+        get_backend().close()
+        app.session_interface.store.close()
+        if app.extensions["login_throttle"] is not None:
+            app.extensions["login_throttle"].store.close()
+        # Objects created so far are never collected, so the collector does
+        # not write to (and thereby copy) their pages in every worker
+        gc.collect()
+        gc.freeze()
+    return app
+
+
+def warm_up(app):
+    """Load and index the data and compile every template of 'app'
+
+    Returns the seconds it took; afterwards the readiness check answers 200.
+    """
+    start = time.perf_counter()
+    with app.app_context():
+        get_catalogue()
+        get_leaderboard()
+        # Lookups build their indexes on first use
+        find_club_by_email("")
+        find_competition_by_name("")
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+    app.extensions["ready"] = True
+    return time.perf_counter() - start
+
+
+def precompile_templates(app):
+    """Write the bytecode of every template of 'app' to its bytecode cache
+
+    Templates whose cached bytecode is up to date are skipped. Returns the
+    number of templates compiled.
+    """
+    env = app.jinja_env
+    cache = env.bytecode_cache
+    if cache is None:
+        return 0
+    compiled = 0
+    for name in env.list_templates():
+        source, filename, _ = env.loader.get_source(env, name)
+        bucket = cache.get_bucket(env, name, filename, source)
+        if bucket.code is None:
+            bucket.code = env.compile(source, name, filename)
+            cache.set_bucket(bucket)
+            compiled += 1
+    return compiled
+
+
+def _precompile_templates_command():
+    """Compile every template into the bytecode cache, ahead of a deploy."""
+    folder = current_app.config["TEMPLATE_CACHE_FOLDER"]
+    if not folder:
+        raise SystemExit("TEMPLATE_CACHE_FOLDER is not set")
+    compiled = precompile_templates(current_app)
+    click.echo(f"Compiled {compiled} templates into {folder}")
+
+
+@registry.collector
+def _cache_metrics():
+    data = cache_info()
+    metrics = [
+        ("gudlft_data_cache_requests_total", "counter", "Dataset cache lookups by result",
+         [({"result": "hit"}, data["hits"]), ({"result": "miss"}, data["misses"]),
+          ({"result": "refresh"}, data["refreshes"])]),
+    ]
+    if has_app_context():
+        fragments = current_app.extensions["fragment_cache"].info()
+        metrics += [
+            ("gudlft_fragment_cache_requests_total", "counter", "Fragment cache lookups by result",
+             [({"result": "hit"}, fragments["hits"]), ({"result": "miss"}, fragments["misses"])]),
+            ("gudlft_fragment_cache_entries", "gauge", "Rendered fragments currently cached",
+             [({}, fragments["size"])]),
+        ]
+    return metrics
+
+
+@registry.collector
+def _event_metrics():
+    if not has_app_context():
+        return []
+    broadcaster = current_app.extensions["availability_feed"].broadcaster
+    return [
+        ("gudlft_event_subscribers", "gauge", "Clients connected to /events",
+         [({}, len(broadcaster))]),
+        ("gudlft_event_subscribers_dropped_total", "counter",
+         "Clients dropped from /events for falling behind", [({}, broadcaster.dropped)]),
+    ]
 
-from flask import Flask, flash, redirect, render_template, request, session, url_for
 
-from provider import get_clubs, get_competitions
+def _summary_page(page):
+    """Clamped summary page number, page count and upcoming count for 'page'"""
+    catalogue = get_catalogue()
+    pages = catalogue.page_count(current_app.config["SUMMARY_PAGE_SIZE"])
+    # The upcoming count moves when a competition starts, reordering pages
+    return min(max(page, 1), pages), pages, catalogue.count_upcoming()
 
-app = Flask(__name__)
-# You should change the secret key in production!
-app.secret_key = "something_special"
 
+def _render_welcome(club, page=1):
+    """Render the summary page of 'club', upcoming competitions first
 
-@app.route("/")
+    The competition list is shared by every club and comes from the
+    fragment cache; only the club header is rendered per request.
+    """
+    page, pages, upcoming = _summary_page(page)
+    size = current_app.config["SUMMARY_PAGE_SIZE"]
+    holds = current_app.extensions["spot_holds"]
+
+    def _render_list():
+        names = get_catalogue().page(page, size)
+        competitions = [find_competition_by_name(name) for name in names]
+        return render_template(
+            "competition_list.html",
+            competitions=[(c, spots_left(c, holds)) for c in competitions],
+            page=page,
+            pages=pages,
+        )
+
+    competition_list = current_app.extensions["fragment_cache"].get_or_render(
+        ("competitions", page, size, upcoming), _render_list, holds_version(holds)
+    )
+    return render_template(
+        "welcome.html",
+        club=club,
+        competition_list=competition_list,
+        rank=club_rank(club.email),
+        live_spots=current_app.config["LIVE_SPOTS"],
+    )
+
+
+@route("/")
 def index():
     """Homepage"""
     return render_template("index.html")
 
 
-@app.route("/login", methods=["POST"])
+@route("/login", methods=["POST"])
 def login():
     """Use the session object to store the club information across requests"""
 
-    clubs = get_clubs()
     email = request.form.get("email", "").strip()
 
+    # Checked before any lookup or rendering, so floods stay cheap
+    throttle = current_app.extensions["login_throttle"]
+    if throttle is not None:
+        throttled = throttle.check(request.remote_addr, email)
+        if throttled is not None:
+            bucket, wait = throttled
+            login_throttled_total.inc(bucket)
+            return Response(
+                "Too many login attempts, please try again later.\n",
+                status=429,
+                mimetype="text/plain",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
     if not email:
         flash("Error: Please enter an email address.")
         return render_template("index.html"), 401
 
-    matching_clubs = [item for item in clubs if item["email"] == email]
+    club = find_club_by_email(email)
 
-    if not matching_clubs:
+    if club is None:
         flash("Error: Email not found. Please check your email address.")
         return render_template("index.html"), 401
 
-    club = matching_clubs[0]
-    session["club"] = club
+    session.regenerate()
+    session["club"] = normalize_email(club.email)
 
     return redirect(url_for("summary"))
 
 
-@app.route("/summary")
+@route("/summary")
 def summary():
     """Custom "homepage" for logged in users"""
 
-    club = session["club"]
-    competitions = get_competitions()
+    club = current_club()
+    if club is None:
+        return redirect(url_for("index"))
+    page = request.args.get("page", 1, type=int)
 
-    return render_template("welcome.html", club=club, competitions=competitions)
+    # Pending flash messages must be shown, so never answer 304 then
+    if session.get("_flashes"):
+        return _render_welcome(club, page)
+    return conditional_render(
+        lambda: _render_welcome(club, page),
+        normalize_email(club.email),
+        holds_version(current_app.extensions["spot_holds"]),
+        *_summary_page(page),
+    )
 
 
-@app.route("/book/<competition>")
+@route("/book/<competition>")
 def book(competition):
-    """Book spots in a competition page"""
-    club = session["club"]
+    """Book spots in a competition page
 
-    competitions = get_competitions()
-    matching_comps = [comp for comp in competitions if comp["name"] == competition]
+    Opening it holds spots for the club (?spots=N, by default
+    SPOT_HOLD_SPOTS) until it books or the hold expires.
+    """
+    club = current_club()
+    if club is None:
+        return redirect(url_for("index"))
 
-    found_competition = matching_comps[0]
+    found_competition = find_competition_by_name(competition)
 
     if found_competition:
-        return render_template("booking.html", club=club, competition=found_competition)
+        engine = current_app.extensions["booking_engine"]
+        wanted = request.args.get("spots", current_app.config["SPOT_HOLD_SPOTS"], type=int)
+        held = engine.hold(club, found_competition, wanted) if wanted > 0 else 0
+        holds = current_app.extensions["spot_holds"]
+        if held:
+            hold_seconds = holds.held_by(normalize_email(club.email), found_competition.name)[1]
+        else:
+            hold_seconds = 0
+        return render_template(
+            "booking.html",
+            club=club,
+            competition=found_competition,
+            # Spots this club can get: its own hold plus those nobody holds
+            spots_available=spots_left(found_competition, holds) + held,
+            held=held,
+            hold_minutes=math.ceil(hold_seconds / 60),
+            booked=booked_spots(club, found_competition),
+            max_spots=MAX_SPOTS_PER_BOOKING,
+        )
     else:
         flash("Something went wrong-please try again")
         return redirect(url_for("summary"))
 
 
-@app.route("/book", methods=["POST"])
+@route("/book", methods=["POST"])
 def book_spots():
     """This page is only accessible through a POST request (form validation)"""
-    club = session["club"]
-    competitions = get_competitions()
-
-    matching_comps = [
-        comp for comp in competitions if comp["name"] == request.form["competition"]
-    ]
-
-    competition = matching_comps[0]
+    club = current_club()
+    if club is None:
+        return redirect(url_for("index"))
+    competition = find_competition_by_name(request.form["competition"])
 
-    competition_date = datetime.strptime(competition["date"], "%Y-%m-%d %H:%M:%S")
-    if competition_date < datetime.now():
-        flash("Error: You cannot book spots in a past competition.")
-        return render_template("welcome.html", club=club, competitions=competitions)
+    if competition is None:
+        bookings_total.inc("unknown_competition")
+        flash("Error: Competition not found.")
+        return _render_welcome(club), 404
 
-    spots_required = int(request.form["spots"])
-    club_points = int(club["points"])
-    max_spots_per_booking = 12
-
-    if spots_required > max_spots_per_booking:
-        flash("Error: You cannot book more than 12 spots per competition.")
-        return render_template("welcome.html", club=club, competitions=competitions)
-
-    if spots_required > club_points:
-        flash("Error: You do not have enough points to book this many spots.")
-        return render_template("welcome.html", club=club, competitions=competitions)
+    try:
+        spots_required = int(request.form["spots"])
+    except ValueError:
+        spots_required = 0
 
-    competition["spotsAvailable"] = int(competition["spotsAvailable"]) - spots_required
-    club["points"] = str(club_points - spots_required)
-    session["club"] = club
+    try:
+        current_app.extensions["booking_engine"].book(club, competition, spots_required)
+    except BookingError as error:
+        bookings_total.inc(error.reason)
+        flash(error.message)
+        return _render_welcome(club)
 
+    bookings_total.inc("booked")
     flash("Great-booking complete!")
-    return render_template("welcome.html", club=club, competitions=competitions)
+    return _render_welcome(club)
+
 
+@route("/events")
+def events():
+    """Server-sent events with the spots left of competitions as they change
 
-@app.route("/points")
+    Each "spots" event carries {competition: spots left} for the
+    competitions that changed; the summary page applies them in place.
+    Not found unless config["LIVE_SPOTS"] is set.
+    """
+    if not current_app.config["LIVE_SPOTS"]:
+        abort(404)
+    if current_club() is None:
+        return Response("Please log in.\n", status=401, mimetype="text/plain")
+    broadcaster = current_app.extensions["availability_feed"].broadcaster
+    stream = broadcaster.stream(
+        broadcaster.subscribe(),
+        current_app.config["EVENTS_HEARTBEAT_SECONDS"],
+        current_app.config["EVENTS_STREAM_SECONDS"],
+    )
+    return Response(
+        stream,
+        mimetype="text/event-stream",
+        # Proxies must pass events on as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@route("/points")
 def points_board():
     """Public points board: list clubs and their points (sorted desc).
     
     This page is publicly accessible without login (Issue #6).
     """
-    clubs = get_clubs()
-    # Sort by integer points descending when possible
-    try:
-        clubs_sorted = sorted(clubs, key=lambda c: int(c.get("points", 0)), reverse=True)
-    except Exception:
-        clubs_sorted = clubs
-    return render_template("points.html", clubs=clubs_sorted)
+    leaderboard = get_leaderboard()
+    limit = request.args.get("limit", current_app.config["POINTS_PAGE_SIZE"], type=int)
+    limit = min(max(limit, 1), POINTS_MAX_LIMIT)
+    pages = max(1, -(-len(leaderboard) // limit))
+    page = min(max(request.args.get("page", 1, type=int), 1), pages)
+
+    def _render_table():
+        clubs = leaderboard.top((page - 1) * limit, limit)
+        return render_template(
+            "points_table.html", clubs=clubs, page=page, pages=pages, limit=limit
+        )
+
+    def _render():
+        points_table = current_app.extensions["fragment_cache"].get_or_render(
+            ("points", page, limit), _render_table
+        )
+        return render_template("points.html", points_table=points_table)
+
+    return conditional_render(_render, page, limit, public=True, dated=True)
 
 
-@app.route("/logout")
+@route("/metrics")
+def metrics():
+    """Request, data, rendering and booking metrics in the Prometheus text format"""
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+@route("/ready")
+def ready():
+    """Readiness check: warms the worker up on its first call, then answers 200"""
+    if not current_app.extensions["ready"]:
+        warm_up(current_app._get_current_object())
+    return jsonify(ready=True, dataVersion=data_version()[0])
+
+
+@route("/logout")
 def logout():
     """We delete session data in order to log the user out"""
-    del session["club"]
+    session.pop("club", None)
     return redirect(url_for("index"))
 
 
+app = create_app()
+
+
 if __name__ == "__main__":
     app.run(debug=True)
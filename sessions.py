@@ -0,0 +1,246 @@
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from provider import _data_path, find_club_by_email
+
+DEFAULT_SQLITE_FILE = "sessions.sqlite3"
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session data kept on the server; the cookie only carries 'sid'"""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        # Id given up by regenerate(), deleted from the store on save
+        self.replaced_sid = None
+
+    def regenerate(self):
+        """Move the data to a fresh session id, sent in a new cookie
+
+        Called at login, so that an id planted before (session fixation)
+        does not carry the logged-in session.
+        """
+        if not self.new:
+            self.replaced_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+
+class MemorySessionStore:
+    """Sessions in process memory with a sliding TTL and LRU eviction
+
+    Every access pushes a session to the end of the order and extends it by
+    the same TTL, so the oldest entries are also the first to expire and
+    both expiry and eviction only ever look at the front.
+    """
+
+    def __init__(self, ttl, max_entries=100_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _purge(self, now):
+        """Drop expired sessions from the front (called with the lock held)"""
+        while self._entries:
+            expires, _ = next(iter(self._entries.values()))
+            if expires > now:
+                break
+            self._entries.popitem(last=False)
+
+    def get(self, sid):
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            self._entries[sid] = (now + self.ttl, entry[1])
+            self._entries.move_to_end(sid)
+            return dict(entry[1])
+
+    def set(self, sid, data):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[sid] = (now + self.ttl, dict(data))
+            self._entries.move_to_end(sid)
+            self._purge(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        """Nothing to release, sessions stay in memory"""
+
+
+class SqliteSessionStore:
+    """Sessions in a SQLite database shared by several worker processes"""
+
+    # Expired rows are deleted once every PURGE_EVERY writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, path, ttl):
+        self.path = str(path)
+        self.ttl = ttl
+        self._serializer = TaggedJSONSerializer()
+        self._local = threading.local()
+        self._writes = 0
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires);
+        """)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?", (sid, now)
+        ).fetchone()
+        if row is None:
+            return None
+        # Slide the expiry, but only write once half of the TTL has passed
+        if row[1] - now < self.ttl / 2:
+            self._connection().execute(
+                "UPDATE sessions SET expires = ? WHERE sid = ?", (now + self.ttl, sid)
+            )
+        return self._serializer.loads(row[0])
+
+    def set(self, sid, data):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+            (sid, self._serializer.dumps(dict(data)), now + self.ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+
+    def delete(self, sid):
+        self._connection().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def close(self):
+        """Close the calling thread's connection; the next call opens a new one"""
+        conn = self._local.__dict__.pop("conn", None)
+        if conn is not None:
+            conn.close()
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface storing session data in 'store'
+
+    The cookie holds a signed, random session id and is only sent when a
+    new session is created, instead of re-signing the whole session on
+    every response.
+    """
+
+    salt = "server-side-session"
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid is not None:
+                data = self.store.get(sid)
+                if data is not None:
+                    return ServerSideSession(data, sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.replaced_sid is not None:
+            self.store.delete(session.replaced_sid)
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.modified:
+            self.store.set(session.sid, session)
+        if session.new:
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode(),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+
+def current_club():
+    """Live record of the logged-in club, resolved through the provider index
+
+    The session only stores the club's key (its normalized email), so the
+    points shown are always current. Returns None when nobody is logged in.
+    """
+    key = session.get("club")
+    if not key:
+        return None
+    return find_club_by_email(key)
+
+
+def create_session_interface(config, ttl):
+    """Session interface for config["SESSION_STORE"]: "memory" (default) or "sqlite"
+
+    'ttl' is the idle lifetime of a session in seconds.
+    """
+    name = config.get("SESSION_STORE") or "memory"
+    if name == "memory":
+        store = MemorySessionStore(ttl, config.get("SESSION_MAX_ENTRIES") or 100_000)
+    elif name == "sqlite":
+        path = config.get("SESSION_SQLITE_DATABASE") or _data_path(DEFAULT_SQLITE_FILE)
+        store = SqliteSessionStore(path, ttl)
+    else:
+        raise ValueError(f"Unknown session store: {name!r}")
+    return ServerSideSessionInterface(store)
@@ -1,5 +1,13 @@
+import json
+import shutil
+from pathlib import Path
+
 import pytest
 
+import provider
+from backends import MemoryBackend
+from records import Club, Competition
+
 
 def mock_clubs():
     """Static data to mock clubs"""
@@ -26,13 +34,104 @@ def mock_competitions():
     ]
 
 
+@pytest.fixture
+def use_data(monkeypatch):
+    """
+    Return a function serving the given clubs/competitions for the current test.
+
+    Records may be given in their JSON shape. The data is loaded into an
+    in-memory backend; whatever is not given is kept from the backend
+    currently in use.
+    """
+    def _use_data(clubs=None, competitions=None):
+        current = provider.get_backend()
+        backend = MemoryBackend(
+            current.get_clubs() if clubs is None else [
+                Club.from_dict(club) if isinstance(club, dict) else club for club in clubs
+            ],
+            current.get_competitions() if competitions is None else [
+                Competition.from_dict(competition) if isinstance(competition, dict)
+                else competition
+                for competition in competitions
+            ],
+        )
+        monkeypatch.setattr(provider, "_backend", backend)
+        provider.bump_data_version()
+        return backend
+
+    return _use_data
+
+
 @pytest.fixture(autouse=True)
-def mock_data_provider(monkeypatch):
+def mock_data_provider(use_data):
     """
     This fixture will be automatically used in test functions.
 
-    We patch `server.get_clubs`, because that's where the get_clubs function is used.
+    We install an in-memory backend with static data, so routes never read the JSON files.
     """
+    use_data(clubs=mock_clubs(), competitions=mock_competitions())
+
+
+@pytest.fixture(autouse=True)
+def fresh_app_state():
+    """
+    Start every test with full login rate-limit buckets (all tests share one IP)
+    and no spot holds left by earlier tests.
+    """
+    from server import app
+
+    throttle = app.extensions["login_throttle"]
+    if throttle is not None:
+        throttle.store.clear()
+    holds = app.extensions["spot_holds"]
+    if holds is not None:
+        holds.clear()
+
 
-    monkeypatch.setattr("server.get_clubs", mock_clubs)
-    monkeypatch.setattr("server.get_competitions", mock_competitions)
+@pytest.fixture(autouse=True)
+def isolated_data_folder(tmp_path, monkeypatch):
+    """
+    Point the provider at a temporary copy of the data folder.
+
+    Bookings made by tests are journaled there and never touch `data/`.
+    """
+    source = Path(provider.__file__).parent / provider.DATA_FOLDER
+    for filename in ("clubs.json", "competitions.json"):
+        shutil.copy(source / filename, tmp_path / filename)
+    monkeypatch.setattr(provider, "DATA_FOLDER", str(tmp_path))
+    provider.invalidate_cache()
+    yield tmp_path
+    provider.close_journal()
+    provider.invalidate_cache()
+
+
+@pytest.fixture
+def folder_data():
+    """
+    Return the (clubs, competitions) that `data_folder` writes.
+
+    Modules override this fixture to choose their own records.
+    """
+    return (
+        [{"name": "Folder Club", "email": "folder@club.com", "points": "30"}],
+        [{"name": "Folder Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": "20"}],
+    )
+
+
+@pytest.fixture
+def data_folder(isolated_data_folder, folder_data, monkeypatch):
+    """
+    Serve the JSON files of the temporary data folder, holding `folder_data`.
+
+    Bookings go through the JSON backend: its journal, ledger and caches,
+    which start empty with their counters at zero.
+    """
+    clubs, competitions = folder_data
+    monkeypatch.setattr(provider, "_backend", provider.JsonBackend())
+    (isolated_data_folder / "clubs.json").write_text(json.dumps({"clubs": clubs}))
+    (isolated_data_folder / "competitions.json").write_text(
+        json.dumps({"competitions": competitions})
+    )
+    provider.invalidate_cache()
+    provider.reset_cache_stats()
+    return isolated_data_folder
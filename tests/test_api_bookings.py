@@ -0,0 +1,143 @@
+"""
+Tests for the bulk booking JSON endpoint
+
+POST /api/bookings books several competitions for the logged-in club in
+one request, all or nothing, with the same rules as the booking form.
+
+These tests verify:
+- A valid batch books every item and returns JSON without rendering
+- The 12-spot cap and the points balance apply across the whole batch
+- One rejected item leaves every competition and the club untouched
+- Unknown competitions, bad spots and malformed bodies are reported
+- Requests without a logged-in club are refused
+"""
+
+import pytest
+
+import provider
+import server
+from server import app
+
+CLUB = {"name": "Simply Lift", "email": "john@simplylift.co", "points": "20"}
+
+
+@pytest.fixture
+def client(use_data):
+    """Create a logged-in test client with three future and one past competition."""
+    use_data(
+        clubs=[dict(CLUB)],
+        competitions=[
+            {"name": "Spring Cup", "date": "2030-03-01 10:00:00", "spotsAvailable": "20"},
+            {"name": "Summer Cup", "date": "2030-06-01 10:00:00", "spotsAvailable": "5"},
+            {"name": "Autumn Cup", "date": "2030-09-01 10:00:00", "spotsAvailable": "20"},
+            {"name": "Old Cup", "date": "2020-03-01 10:00:00", "spotsAvailable": "20"},
+        ],
+    )
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["club"] = CLUB["email"]
+        yield client
+
+
+def _book(client, *items):
+    return client.post(
+        "/api/bookings",
+        json={"bookings": [{"competition": name, "spots": spots} for name, spots in items]},
+    )
+
+
+def _state():
+    return (
+        provider.find_club_by_email(CLUB["email"]).points,
+        provider.find_competition_by_name("Spring Cup").spots_available,
+        provider.find_competition_by_name("Summer Cup").spots_available,
+    )
+
+
+class TestBulkBooking:
+    """Tests for successful batches."""
+
+    def test_books_every_item(self, client, monkeypatch):
+        monkeypatch.setattr(server, "render_template", None)
+
+        response = _book(client, ("Spring Cup", 3), ("Summer Cup", 2))
+
+        assert response.status_code == 200
+        assert response.json == {
+            "ok": True,
+            "points": 15,
+            "results": [
+                {"competition": "Spring Cup", "spots": 3, "status": "booked", "spotsAvailable": 17},
+                {"competition": "Summer Cup", "spots": 2, "status": "booked", "spotsAvailable": 3},
+            ],
+        }
+        assert _state() == (15, 17, 3)
+
+    def test_bare_list_accepted(self, client):
+        response = client.post("/api/bookings", json=[{"competition": "Spring Cup", "spots": "1"}])
+
+        assert response.status_code == 200
+        assert _state() == (19, 19, 5)
+
+
+class TestAllOrNothing:
+    """Tests for batches with a rejected item."""
+
+    def test_spot_cap_across_items(self, client):
+        response = _book(client, ("Spring Cup", 8), ("Spring Cup", 5))
+
+        assert response.status_code == 422
+        statuses = [result["status"] for result in response.json["results"]]
+        assert statuses == ["skipped", "rejected"]
+        assert response.json["results"][1]["reason"] == "too_many_spots"
+        assert _state() == (20, 20, 5)
+
+    def test_points_across_items(self, client):
+        response = _book(client, ("Spring Cup", 12), ("Autumn Cup", 9), ("Summer Cup", 0))
+
+        results = response.json["results"]
+        assert response.status_code == 422
+        assert results[1]["reason"] == "not_enough_points"
+        assert results[2]["reason"] == "invalid_spots"
+        assert _state() == (20, 20, 5)
+
+    def test_past_competition(self, client):
+        response = _book(client, ("Spring Cup", 1), ("Old Cup", 1))
+
+        assert response.json["results"][1]["reason"] == "past_competition"
+        assert _state() == (20, 20, 5)
+
+    def test_unknown_competition_and_bad_spots(self, client):
+        response = _book(client, ("Spring Cup", 1), ("Nowhere", 1), ("Summer Cup", "two"))
+
+        results = response.json["results"]
+        assert response.status_code == 422
+        assert [result["status"] for result in results] == ["skipped", "rejected", "rejected"]
+        assert results[1]["reason"] == "unknown_competition"
+        assert results[2]["reason"] == "invalid_spots"
+        assert _state() == (20, 20, 5)
+
+
+class TestRequestErrors:
+    """Tests for refused requests."""
+
+    def test_not_logged_in(self, client):
+        client.get("/logout")
+
+        response = _book(client, ("Spring Cup", 1))
+
+        assert response.status_code == 401
+        assert _state() == (20, 20, 5)
+
+    @pytest.mark.parametrize("body", [{}, [], {"bookings": "Spring Cup"}, ["Spring Cup"]])
+    def test_malformed_body(self, client, body):
+        assert client.post("/api/bookings", json=body).status_code == 400
+
+    def test_batch_size_limit(self, client, monkeypatch):
+        monkeypatch.setattr("api.MAX_BATCH_SIZE", 2)
+
+        response = _book(client, ("Spring Cup", 1), ("Spring Cup", 1), ("Spring Cup", 1))
+
+        assert response.status_code == 400
+        assert response.json["reason"] == "too_many_items"
@@ -0,0 +1,146 @@
+"""
+Tests for the read-only JSON listings
+
+GET /api/competitions and GET /api/clubs return public fields as JSON
+pages linked by opaque cursors, or the whole listing as NDJSON.
+
+These tests verify:
+- Following the cursors visits every record exactly once, ties included
+- Filters: upcoming competitions, minimum spots, minimum points
+- Club emails are never exposed
+- NDJSON streams the same records without rendering templates
+- Bad cursors and numbers are rejected, pages answer conditional GETs
+"""
+
+import json
+
+import pytest
+
+import server
+from server import app
+
+CLUBS = [
+    {"name": "Alpha", "email": "a@alpha.com", "points": "5"},
+    {"name": "Beta", "email": "b@beta.com", "points": "12"},
+    {"name": "Twin", "email": "t1@twin.com", "points": "9"},
+    {"name": "Twin", "email": "t2@twin.com", "points": "9"},
+    {"name": "Twin", "email": "t3@twin.com", "points": "9"},
+    {"name": "Omega", "email": "o@omega.com", "points": "1"},
+]
+
+COMPETITIONS = [
+    {"name": "Old Cup", "date": "2020-03-01 10:00:00", "spotsAvailable": "20"},
+    {"name": "B Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": "2"},
+    {"name": "A Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": "8"},
+    {"name": "Late Cup", "date": "2031-01-01 10:00:00", "spotsAvailable": "30"},
+]
+
+
+@pytest.fixture
+def client(use_data):
+    """Create a test client for the Flask app with the listing data."""
+    use_data(clubs=CLUBS, competitions=COMPETITIONS)
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+
+def _walk(client, url):
+    """Every item of a listing, following the cursors page by page."""
+    items = []
+    cursor = None
+    while True:
+        separator = "&" if "?" in url else "?"
+        page = client.get(url + (f"{separator}cursor={cursor}" if cursor else "")).json
+        items += page["items"]
+        cursor = page["next"]
+        if cursor is None:
+            return items
+
+
+class TestCompetitionListing:
+    """Tests for /api/competitions."""
+
+    def test_date_order_across_pages(self, client):
+        items = _walk(client, "/api/competitions?limit=1")
+
+        assert [item["name"] for item in items] == ["Old Cup", "A Cup", "B Cup", "Late Cup"]
+        assert items[1] == {"name": "A Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": 8}
+
+    def test_upcoming_and_min_spots(self, client):
+        items = _walk(client, "/api/competitions?upcoming=1&min_spots=5&limit=1")
+
+        assert [item["name"] for item in items] == ["A Cup", "Late Cup"]
+
+    def test_last_page_has_no_cursor(self, client):
+        assert client.get("/api/competitions").json["next"] is None
+
+
+class TestClubListing:
+    """Tests for /api/clubs."""
+
+    def test_ties_are_not_skipped(self, client):
+        items = _walk(client, "/api/clubs?limit=2")
+
+        assert [item["name"] for item in items] == [
+            "Beta", "Twin", "Twin", "Twin", "Alpha", "Omega"
+        ]
+        assert [item["rank"] for item in items] == [1, 2, 2, 2, 5, 6]
+
+    def test_min_points(self, client):
+        items = _walk(client, "/api/clubs?min_points=9&limit=3")
+
+        assert [item["name"] for item in items] == ["Beta", "Twin", "Twin", "Twin"]
+
+    def test_no_emails(self, client):
+        response = client.get("/api/clubs?limit=2")
+
+        assert b"@" not in response.data
+        assert b"@" not in json.dumps(_walk(client, "/api/clubs?limit=2")).encode()
+
+
+class TestStreaming:
+    """Tests for NDJSON exports."""
+
+    def test_ndjson_matches_pages(self, client, monkeypatch):
+        monkeypatch.setattr("api.STREAM_CHUNK", 2)
+        monkeypatch.setattr(server, "render_template", None)
+
+        response = client.get("/api/clubs?format=ndjson")
+
+        assert response.mimetype == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert lines == _walk(client, "/api/clubs")
+
+    def test_accept_header_selects_ndjson(self, client):
+        response = client.get(
+            "/api/competitions?upcoming=1", headers={"Accept": "application/x-ndjson"}
+        )
+
+        assert [json.loads(line)["name"] for line in response.data.decode().splitlines()] == [
+            "A Cup", "B Cup", "Late Cup"
+        ]
+
+
+class TestRequestErrors:
+    """Tests for invalid parameters and caching."""
+
+    @pytest.mark.parametrize("url", [
+        "/api/competitions?cursor=not-a-cursor",
+        "/api/clubs?cursor=WyJhIiwiYiJd",
+        "/api/clubs?min_points=many",
+        "/api/competitions?limit=abc",
+        "/api/clubs?limit=x",
+    ])
+    def test_bad_parameters(self, client, url):
+        response = client.get(url)
+
+        assert response.status_code == 400
+        assert response.json["reason"] == "invalid_request"
+
+    def test_matching_etag_returns_304(self, client):
+        etag = client.get("/api/clubs").headers["ETag"]
+
+        response = client.get("/api/clubs", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
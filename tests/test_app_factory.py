@@ -0,0 +1,132 @@
+"""
+Tests for the application factory, preloading and the readiness check
+
+These tests verify:
+- create_app() builds independent apps with the given configuration
+- The readiness check warms a lazily started worker up
+- Preloading loads the data and templates up front, freezes the heap and
+  releases database connections before workers are forked
+- Templates are precompiled into a bytecode cache that later workers reuse
+"""
+
+import gc
+
+import pytest
+
+import provider
+from server import create_app, precompile_templates
+
+
+@pytest.fixture
+def unfreeze():
+    """Undo gc.freeze() after preloading tests."""
+    yield
+    gc.unfreeze()
+
+
+class TestFactory:
+    """Tests for create_app()."""
+
+    def test_config_overrides_defaults(self):
+        app = create_app({"TESTING": True, "SUMMARY_PAGE_SIZE": 5, "SECRET_KEY": "s3cret"})
+
+        assert app.config["SUMMARY_PAGE_SIZE"] == 5
+        assert app.secret_key == "s3cret"
+        assert app.config["POINTS_PAGE_SIZE"] == 50
+        assert not app.config["PRELOAD"]
+
+    def test_apps_are_independent(self):
+        first = create_app({"TESTING": True})
+        second = create_app({"TESTING": True})
+
+        assert first.extensions["fragment_cache"] is not second.extensions["fragment_cache"]
+        assert {rule.endpoint for rule in first.url_map.iter_rules()} == {
+            rule.endpoint for rule in second.url_map.iter_rules()
+        }
+        with second.test_client() as client:
+            response = client.post("/login", data={"email": "john@simplylift.co"},
+                                   follow_redirects=True)
+        assert response.status_code == 200
+
+
+class TestReadiness:
+    """Tests for the /ready check."""
+
+    def test_ready_warms_up(self, isolated_data_folder, monkeypatch):
+        monkeypatch.setattr(provider, "_backend", provider.JsonBackend())
+        app = create_app({"TESTING": True, "PROVIDER_BACKEND": "json"})
+        assert app.extensions["ready"] is False
+
+        with app.test_client() as client:
+            response = client.get("/ready")
+
+        assert response.status_code == 200
+        assert response.get_json()["ready"] is True
+        assert app.extensions["ready"] is True
+        assert provider._cached_records("clubs.json", "clubs") is not None
+
+
+class TestPreload:
+    """Tests for PRELOAD."""
+
+    def test_preload_warms_and_freezes(self, isolated_data_folder, unfreeze):
+        app = create_app({"TESTING": True, "PROVIDER_BACKEND": "json", "PRELOAD": True})
+
+        assert app.extensions["ready"] is True
+        assert gc.get_freeze_count() > 0
+        assert provider._cached_records("competitions.json", "competitions") is not None
+        assert len(app.jinja_env.cache) == len(app.jinja_env.list_templates())
+
+        misses = provider.cache_info()["misses"]
+        with app.test_client() as client:
+            client.post("/login", data={"email": "john@simplylift.co"})
+            assert client.get("/summary").status_code == 200
+        assert provider.cache_info()["misses"] == misses
+
+    def test_preload_releases_connections(self, tmp_path, unfreeze):
+        app = create_app({
+            "TESTING": True,
+            "PRELOAD": True,
+            "PROVIDER_BACKEND": "sqlite",
+            "SQLITE_DATABASE": str(tmp_path / "gudlft.sqlite3"),
+        })
+        backend = provider.get_backend()
+
+        assert getattr(backend._local, "conn", None) is None
+        with app.test_client() as client:
+            assert client.post("/login", data={"email": "john@simplylift.co"}).status_code == 302
+        backend.close()
+
+
+class TestTemplateCache:
+    """Tests for the Jinja bytecode cache."""
+
+    def test_precompile_once(self, tmp_path):
+        app = create_app({"TESTING": True, "TEMPLATE_CACHE_FOLDER": str(tmp_path / "jinja")})
+        templates = app.jinja_env.list_templates()
+
+        assert precompile_templates(app) == len(templates)
+        assert precompile_templates(app) == 0
+        assert len(list((tmp_path / "jinja").iterdir())) == len(templates)
+
+    def test_new_worker_skips_compilation(self, tmp_path, monkeypatch):
+        precompile_templates(create_app({"TEMPLATE_CACHE_FOLDER": str(tmp_path / "jinja")}))
+        app = create_app({"TESTING": True, "TEMPLATE_CACHE_FOLDER": str(tmp_path / "jinja")})
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("template compiled despite the bytecode cache")
+
+        monkeypatch.setattr(app.jinja_env, "compile", _fail)
+        with app.test_client() as client:
+            assert client.get("/").status_code == 200
+
+    def test_cli_command(self, tmp_path):
+        app = create_app({"TEMPLATE_CACHE_FOLDER": str(tmp_path / "jinja")})
+
+        result = app.test_cli_runner().invoke(args=["precompile-templates"])
+
+        assert result.exit_code == 0
+        assert f"Compiled {len(app.jinja_env.list_templates())} templates" in result.output
+
+    def test_no_auto_reload_outside_debug(self):
+        assert create_app().jinja_env.auto_reload is False
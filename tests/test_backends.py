@@ -0,0 +1,304 @@
+"""
+Tests for the pluggable provider backends
+
+The provider functions delegate to a backend: the JSON files, an in-memory
+store or a SQLite database.
+
+These tests verify:
+- Every backend serves the same records and lookups
+- Every backend applies a booking to the records it returns
+- Every backend applies a batch of bookings together, and survives a reload
+- Every backend keeps a ledger of bookings with totals per competition
+- SQLite bookings are persisted and rejected when they no longer fit
+- SQLite runs in WAL mode with one connection per thread, released
+  when the thread exits
+- SQLite bookings made by another worker reach the points board and the
+  data version
+- The backend is selected through the Flask config
+"""
+
+import gc
+import sqlite3
+import threading
+import weakref
+
+import pytest
+
+import backends
+import provider
+from backends import MemoryBackend, SqliteBackend, create_backend
+from records import Club, Competition
+from server import app
+
+CLUBS = [
+    {"name": "Simply Lift", "email": "john@simplylift.co", "points": "13"},
+    {"name": "Iron Temple", "email": "admin@irontemple.com", "points": "4"},
+]
+
+COMPETITIONS = [
+    {"name": "Spring Festival", "date": "2030-03-27 10:00:00", "spotsAvailable": "25"},
+    {"name": "Fall Classic", "date": "2030-10-22 13:30:00", "spotsAvailable": "13"},
+]
+
+
+@pytest.fixture
+def folder_data():
+    """The backend fixtures, written as JSON snapshots."""
+    return CLUBS, COMPETITIONS
+
+
+@pytest.fixture(params=["json", "memory", "sqlite"])
+def backend(request, data_folder):
+    """Each backend, seeded with the same data."""
+    backend = create_backend({
+        "PROVIDER_BACKEND": request.param,
+        "SQLITE_DATABASE": str(data_folder / "test.sqlite3"),
+    })
+    yield backend
+    backend.close()
+
+
+class TestBackendContract:
+    """Tests run against every backend."""
+
+    def test_get_clubs_and_competitions(self, backend):
+        """All records should be returned in file order."""
+        assert [club.name for club in backend.get_clubs()] == ["Simply Lift", "Iron Temple"]
+        assert backend.get_competitions()[1].to_dict() == COMPETITIONS[1]
+
+    def test_iterators_match_lists(self, backend):
+        """Streamed records should match the loaded lists."""
+        assert list(backend.iter_clubs()) == backend.get_clubs()
+        assert list(backend.iter_competitions()) == backend.get_competitions()
+
+    def test_lookups(self, backend):
+        """Lookups should be normalized for emails and return None on a miss."""
+        assert backend.find_club_by_email(" ADMIN@irontemple.com").points == 4
+        assert backend.find_club_by_email("nobody@test.com") is None
+        assert backend.find_competition_by_name("Fall Classic").spots_available == 13
+        assert backend.find_competition_by_name("Winter Cup") is None
+
+    def test_book_updates_records(self, backend):
+        """A booking should update the given records and later lookups."""
+        club = backend.find_club_by_email("john@simplylift.co")
+        competition = backend.find_competition_by_name("Spring Festival")
+
+        assert backend.book(club, competition, 3) is True
+
+        assert club.points == 10
+        assert competition.spots_available == 22
+        assert backend.find_club_by_email("john@simplylift.co").points == 10
+        assert backend.find_competition_by_name("Spring Festival").spots_available == 22
+
+    def test_book_many_applies_every_item(self, backend):
+        """A batch should debit the club once per item and fill each competition."""
+        club = backend.find_club_by_email("john@simplylift.co")
+        spring = backend.find_competition_by_name("Spring Festival")
+        fall = backend.find_competition_by_name("Fall Classic")
+
+        assert backend.book_many(club, [(spring, 2), (fall, 3), (spring, 1)]) is True
+
+        assert club.points == 7
+        assert backend.find_competition_by_name("Spring Festival").spots_available == 22
+        assert backend.find_competition_by_name("Fall Classic").spots_available == 10
+
+    def test_ledger(self, backend):
+        """Bookings should be listed per club and totalled per competition."""
+        club = backend.find_club_by_email("john@simplylift.co")
+        other = backend.find_club_by_email("admin@irontemple.com")
+        spring = backend.find_competition_by_name("Spring Festival")
+        fall = backend.find_competition_by_name("Fall Classic")
+
+        backend.book_many(club, [(spring, 2), (fall, 3)])
+        backend.book(club, spring, 1)
+        backend.book(other, spring, 4)
+
+        assert backend.booked_spots(club, spring) == 3
+        assert backend.booked_spots(club, fall) == 3
+        assert backend.booked_spots(other, fall) == 0
+        assert [(b.competition, b.spots) for b in backend.club_bookings(club)] == [
+            ("Spring Festival", 2), ("Fall Classic", 3), ("Spring Festival", 1),
+        ]
+        assert all(b.club == "john@simplylift.co" for b in backend.club_bookings(club))
+
+
+class TestSqliteBackend:
+    """Tests specific to the SQLite backend."""
+
+    @pytest.fixture
+    def sqlite_backend(self, tmp_path):
+        backend = SqliteBackend(tmp_path / "gudlft.sqlite3")
+        backend.load(
+            [Club.from_dict(club) for club in CLUBS],
+            [Competition.from_dict(competition) for competition in COMPETITIONS],
+        )
+        yield backend
+        backend.close()
+
+    def test_booking_is_persisted(self, sqlite_backend):
+        """A new backend on the same database should see the booking."""
+        club = sqlite_backend.find_club_by_email("john@simplylift.co")
+        competition = sqlite_backend.find_competition_by_name("Fall Classic")
+        sqlite_backend.book(club, competition, 2)
+
+        reopened = SqliteBackend(sqlite_backend.path)
+        try:
+            assert reopened.find_club_by_email("john@simplylift.co").points == 11
+            assert reopened.find_competition_by_name("Fall Classic").spots_available == 11
+        finally:
+            reopened.close()
+
+    def test_stale_booking_is_rolled_back(self, sqlite_backend):
+        """A booking based on stale points should be refused as a whole."""
+        club = sqlite_backend.find_club_by_email("admin@irontemple.com")
+        competition = sqlite_backend.find_competition_by_name("Spring Festival")
+        club.points = 40
+
+        assert sqlite_backend.book(club, competition, 10) is False
+
+        assert sqlite_backend.find_club_by_email("admin@irontemple.com").points == 4
+        assert sqlite_backend.find_competition_by_name("Spring Festival").spots_available == 25
+
+    def test_stale_batch_is_rolled_back(self, sqlite_backend):
+        """A batch whose last item no longer fits should book nothing."""
+        club = sqlite_backend.find_club_by_email("john@simplylift.co")
+        spring = sqlite_backend.find_competition_by_name("Spring Festival")
+        fall = sqlite_backend.find_competition_by_name("Fall Classic")
+        fall.spots_available = 40
+
+        assert sqlite_backend.book_many(club, [(spring, 2), (fall, 20)]) is False
+
+        assert sqlite_backend.find_club_by_email("john@simplylift.co").points == 13
+        assert sqlite_backend.find_competition_by_name("Spring Festival").spots_available == 25
+
+    def test_wal_mode(self, sqlite_backend):
+        """The database should use write-ahead logging."""
+        mode = sqlite_backend._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_one_connection_per_thread(self, sqlite_backend):
+        """Each thread should get its own pooled connection."""
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(sqlite_backend._connection()))
+        thread.start()
+        thread.join()
+
+        assert connections[0] is not sqlite_backend._connection()
+        assert sqlite_backend._connection() is sqlite_backend._connection()
+
+    def test_thread_connections_released(self, sqlite_backend, monkeypatch):
+        """Connections of threads that have exited should not be kept."""
+        opened = []
+        real_connect = backends.sqlite3.connect
+
+        class _Connection(sqlite3.Connection):
+            pass
+
+        def _connect(*args, **kwargs):
+            conn = real_connect(*args, factory=_Connection, **kwargs)
+            opened.append(weakref.ref(conn))
+            return conn
+
+        monkeypatch.setattr(backends.sqlite3, "connect", _connect)
+        for _ in range(10):
+            thread = threading.Thread(target=sqlite_backend.is_empty)
+            thread.start()
+            thread.join()
+        gc.collect()
+
+        assert len(opened) == 10
+        assert all(ref() is None for ref in opened)
+
+    def test_other_worker_bookings_synced(self, sqlite_backend):
+        """Bookings made through another connection should reach the points board."""
+        other = SqliteBackend(sqlite_backend.path)
+        try:
+            assert sqlite_backend.get_leaderboard().top(0, 1)[0]["points"] == 13
+            version, _ = provider.data_version()
+            stored = sqlite_backend.stored_version()
+            club = other.find_club_by_email("john@simplylift.co")
+            other.book(club, other.find_competition_by_name("Fall Classic"), 11)
+
+            assert sqlite_backend.sync() is True
+            assert sqlite_backend.get_leaderboard().top(0, 2) == [
+                {"name": "Iron Temple", "points": 4, "rank": 1},
+                {"name": "Simply Lift", "points": 2, "rank": 2},
+            ]
+            assert provider.data_version()[0] > version
+            assert sqlite_backend.sync() is False
+            assert sqlite_backend.stored_version() == other.stored_version() != stored
+        finally:
+            other.close()
+
+    def test_own_bookings_need_no_sync(self, sqlite_backend):
+        """A worker's own bookings should not count as another worker's."""
+        club = sqlite_backend.find_club_by_email("john@simplylift.co")
+        sqlite_backend.book(club, sqlite_backend.find_competition_by_name("Fall Classic"), 1)
+
+        assert sqlite_backend.sync() is False
+
+    def test_seeding_only_when_empty(self, sqlite_backend, data_folder):
+        """create_backend() should not overwrite an existing database."""
+        club = sqlite_backend.find_club_by_email("john@simplylift.co")
+        competition = sqlite_backend.find_competition_by_name("Fall Classic")
+        sqlite_backend.book(club, competition, 1)
+
+        backend = create_backend({
+            "PROVIDER_BACKEND": "sqlite", "SQLITE_DATABASE": sqlite_backend.path,
+        })
+        try:
+            assert backend.find_club_by_email("john@simplylift.co").points == 12
+        finally:
+            backend.close()
+
+
+class TestBackendSelection:
+    """Tests for selecting the backend through the config."""
+
+    def test_unknown_backend_rejected(self):
+        """An unknown backend name should raise ValueError."""
+        with pytest.raises(ValueError):
+            create_backend({"PROVIDER_BACKEND": "csv"})
+
+    def test_memory_backend_from_config(self, data_folder):
+        """The memory backend should be seeded from the JSON snapshot."""
+        backend = create_backend({"PROVIDER_BACKEND": "memory"})
+        assert isinstance(backend, MemoryBackend)
+        assert len(backend.get_clubs()) == 2
+
+    def test_routes_use_sqlite_backend(self, data_folder, monkeypatch):
+        """Routes should book through whichever backend is installed."""
+        backend = create_backend({
+            "PROVIDER_BACKEND": "sqlite",
+            "SQLITE_DATABASE": str(data_folder / "routes.sqlite3"),
+        })
+        monkeypatch.setattr(provider, "_backend", backend)
+        app.config["TESTING"] = True
+        with app.test_client() as client:
+            client.post("/login", data={"email": "john@simplylift.co"})
+            response = client.post(
+                "/book", data={"competition": "Spring Festival", "spots": "2"}
+            )
+
+        assert b"Points available: 11" in response.data
+        assert backend.find_competition_by_name("Spring Festival").spots_available == 23
+        backend.close()
+
+    def test_points_follow_other_sqlite_worker(self, data_folder, monkeypatch):
+        """/points should not answer 304 with the points before another worker booked."""
+        path = str(data_folder / "workers.sqlite3")
+        backend = create_backend({"PROVIDER_BACKEND": "sqlite", "SQLITE_DATABASE": path})
+        other = SqliteBackend(path)
+        monkeypatch.setattr(provider, "_backend", backend)
+        try:
+            with app.test_client() as client:
+                etag = client.get("/points").headers["ETag"]
+                club = other.find_club_by_email("john@simplylift.co")
+                other.book(club, other.find_competition_by_name("Fall Classic"), 8)
+                response = client.get("/points", headers={"If-None-Match": etag})
+
+            assert response.status_code == 200
+            assert b"<td>5</td>" in response.data
+        finally:
+            other.close()
+            backend.close()
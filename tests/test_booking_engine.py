@@ -0,0 +1,149 @@
+"""
+Tests for the contention-safe booking engine
+
+Spots are reserved and points debited while holding per-competition and
+per-club locks, optionally mirrored in a cross-process lock file.
+
+These tests verify:
+- Many threads racing for the last spots never oversell (stress test)
+- Club points are never debited below zero under contention
+- Unrelated competitions do not serialize on each other's locks
+- Every rejection rule is enforced by the engine
+- The 12-spot limit counts every booking of the club in the competition
+"""
+
+import threading
+import time
+
+import pytest
+
+from booking import BookingEngine, BookingError
+from records import Club, Competition, parse_date
+
+FUTURE = "2030-01-01 10:00:00"
+
+
+def _clubs(count, points):
+    return [Club(f"Club {i}", f"club{i}@test.com", points) for i in range(count)]
+
+
+def _competition(name, spots, date=FUTURE):
+    return Competition(name, parse_date(date), spots)
+
+
+def _hammer(engine, clubs, competition, attempts, spots=1):
+    """Let every club try to book 'attempts' times concurrently.
+
+    Returns (successful bookings, elapsed seconds).
+    """
+    booked = []
+    barrier = threading.Barrier(len(clubs))
+
+    def _worker(club):
+        barrier.wait()
+        for _ in range(attempts):
+            try:
+                engine.book(club, competition, spots)
+            except BookingError:
+                continue
+            booked.append(spots)
+
+    threads = [threading.Thread(target=_worker, args=(club,)) for club in clubs]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return booked, time.perf_counter() - start
+
+
+@pytest.fixture(params=[False, True], ids=["thread-locks", "file-lock"])
+def engine(request, tmp_path):
+    """A booking engine, with and without the cross-process lock file."""
+    lock_path = str(tmp_path / "bookings.lock") if request.param else None
+    return BookingEngine(lock_path=lock_path)
+
+
+class TestBookingStress:
+    """Multi-threaded stress tests under contention."""
+
+    def test_no_oversell_under_contention(self, engine):
+        """Concurrent bookings should stop exactly at zero spots."""
+        clubs = _clubs(16, points=1000)
+        competition = _competition("Hot Cup", 100)
+
+        booked, elapsed = _hammer(engine, clubs, competition, attempts=20)
+
+        assert sum(booked) == 100
+        assert competition.spots_available == 0
+        debited = sum(1000 - club.points for club in clubs)
+        assert debited == 100
+        print(f"\n{len(booked) / elapsed:.0f} bookings/sec with 16 threads on one competition")
+
+    def test_points_never_negative_under_contention(self, engine):
+        """A club booking from several threads should never overspend."""
+        # Fewer points than the 12 spots a club may hold in one competition
+        club = _clubs(1, points=10)[0]
+        competition = _competition("Big Cup", 1000)
+
+        booked, _ = _hammer(engine, [club] * 8, competition, attempts=10, spots=2)
+
+        assert sum(booked) == 10
+        assert club.points == 0
+        assert competition.spots_available == 990
+
+    def test_unrelated_competitions_do_not_serialize(self, engine):
+        """Holding one competition's lock should not block another competition."""
+        busy_club, other_club = _clubs(2, points=10)
+        busy = _competition("Busy Cup", 10)
+        other = _competition("Other Cup", 10)
+        done = threading.Event()
+
+        with engine.locked(busy_club, [busy]):
+            thread = threading.Thread(
+                target=lambda: (engine.book(other_club, other, 1), done.set())
+            )
+            thread.start()
+            assert done.wait(timeout=2)
+        thread.join()
+        assert other.spots_available == 9
+
+
+class TestBookingRules:
+    """Tests for the validation rules applied by the engine."""
+
+    @pytest.mark.parametrize(
+        "spots, points, available, date, reason",
+        [
+            (0, 10, 10, FUTURE, "invalid_spots"),
+            (1, 10, 10, "2020-01-01 10:00:00", "past_competition"),
+            (13, 50, 50, FUTURE, "too_many_spots"),
+            (5, 2, 10, FUTURE, "not_enough_points"),
+            (5, 10, 3, FUTURE, "not_enough_spots"),
+        ],
+    )
+    def test_rejections(self, engine, spots, points, available, date, reason):
+        """Each rule should reject with its reason and leave data unchanged."""
+        club = _clubs(1, points=points)[0]
+        competition = _competition("Rule Cup", available, date)
+
+        with pytest.raises(BookingError) as excinfo:
+            engine.book(club, competition, spots)
+
+        assert excinfo.value.reason == reason
+        assert club.points == points
+        assert competition.spots_available == available
+
+    def test_limit_is_cumulative(self, engine):
+        """Spots booked earlier count towards the per-competition limit."""
+        club = _clubs(1, points=50)[0]
+        competition = _competition("Rule Cup", 50)
+        engine.book(club, competition, 10)
+
+        with pytest.raises(BookingError) as excinfo:
+            engine.book(club, competition, 3)
+        engine.book(club, competition, 2)
+
+        assert excinfo.value.reason == "too_many_spots"
+        assert club.points == 38
+        assert engine.check_many(club, [(competition, 1)])[0].reason == "too_many_spots"
@@ -21,7 +21,7 @@ def client():
 
 
 @pytest.fixture
-def mock_limit_data(monkeypatch):
+def mock_limit_data(use_data):
     """
     Mock clubs and competitions data for booking limit tests.
     Club has plenty of points (50) and competition has plenty of spots (30).
@@ -41,8 +41,7 @@ def mock_limit_data(monkeypatch):
             },
         ]
 
-    monkeypatch.setattr("server.get_clubs", _mock_get_clubs)
-    monkeypatch.setattr("server.get_competitions", _mock_get_competitions)
+    use_data(clubs=_mock_get_clubs(), competitions=_mock_get_competitions())
 
 
 class TestBookingLimit12Spots:
@@ -51,7 +50,7 @@ class TestBookingLimit12Spots:
     def test_booking_12_spots_succeeds(self, client, mock_limit_data):
         """Booking exactly 12 spots should succeed (boundary case)."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Rich Club", "email": "rich@club.com", "points": "50"}
+            sess["club"] = "rich@club.com"
 
         response = client.post(
             "/book",
@@ -65,7 +64,7 @@ class TestBookingLimit12Spots:
     def test_booking_12_spots_deducts_points(self, client, mock_limit_data):
         """Booking 12 spots should deduct 12 points."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Rich Club", "email": "rich@club.com", "points": "50"}
+            sess["club"] = "rich@club.com"
 
         response = client.post(
             "/book",
@@ -79,7 +78,7 @@ class TestBookingLimit12Spots:
     def test_booking_13_spots_rejected(self, client, mock_limit_data):
         """Booking 13 spots should be rejected (exceeds limit)."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Rich Club", "email": "rich@club.com", "points": "50"}
+            sess["club"] = "rich@club.com"
 
         response = client.post(
             "/book",
@@ -93,7 +92,7 @@ class TestBookingLimit12Spots:
     def test_booking_13_spots_shows_error(self, client, mock_limit_data):
         """Booking 13 spots should show an error message about the limit."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Rich Club", "email": "rich@club.com", "points": "50"}
+            sess["club"] = "rich@club.com"
 
         response = client.post(
             "/book",
@@ -111,7 +110,7 @@ class TestBookingLimit12Spots:
     def test_booking_13_spots_no_point_change(self, client, mock_limit_data):
         """When booking 13 spots fails, club points should NOT change."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Rich Club", "email": "rich@club.com", "points": "50"}
+            sess["club"] = "rich@club.com"
 
         response = client.post(
             "/book",
@@ -125,7 +124,7 @@ class TestBookingLimit12Spots:
     def test_booking_13_spots_no_spots_change(self, client, mock_limit_data):
         """When booking 13 spots fails, competition spotsAvailable should NOT change."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Rich Club", "email": "rich@club.com", "points": "50"}
+            sess["club"] = "rich@club.com"
 
         response = client.post(
             "/book",
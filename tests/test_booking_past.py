@@ -21,7 +21,7 @@ def client():
 
 
 @pytest.fixture
-def mock_past_competition(monkeypatch):
+def mock_past_competition(use_data):
     """Mock competitions data with a PAST competition."""
     def _mock_get_clubs():
         return [
@@ -37,12 +37,11 @@ def mock_past_competition(monkeypatch):
             },
         ]
 
-    monkeypatch.setattr("server.get_clubs", _mock_get_clubs)
-    monkeypatch.setattr("server.get_competitions", _mock_get_competitions)
+    use_data(clubs=_mock_get_clubs(), competitions=_mock_get_competitions())
 
 
 @pytest.fixture
-def mock_future_competition(monkeypatch):
+def mock_future_competition(use_data):
     """Mock competitions data with a FUTURE competition."""
     def _mock_get_clubs():
         return [
@@ -58,8 +57,7 @@ def mock_future_competition(monkeypatch):
             },
         ]
 
-    monkeypatch.setattr("server.get_clubs", _mock_get_clubs)
-    monkeypatch.setattr("server.get_competitions", _mock_get_competitions)
+    use_data(clubs=_mock_get_clubs(), competitions=_mock_get_competitions())
 
 
 class TestPastCompetitionBooking:
@@ -68,7 +66,7 @@ class TestPastCompetitionBooking:
     def test_past_competition_booking_rejected(self, client, mock_past_competition):
         """Booking a past competition should be rejected."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Time Club", "email": "time@club.com", "points": "10"}
+            sess["club"] = "time@club.com"
 
         response = client.post(
             "/book",
@@ -82,7 +80,7 @@ class TestPastCompetitionBooking:
     def test_past_competition_shows_error(self, client, mock_past_competition):
         """Booking a past competition should show an error message."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Time Club", "email": "time@club.com", "points": "10"}
+            sess["club"] = "time@club.com"
 
         response = client.post(
             "/book",
@@ -101,7 +99,7 @@ class TestPastCompetitionBooking:
     def test_past_competition_no_point_change(self, client, mock_past_competition):
         """When booking past competition fails, club points should NOT change."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Time Club", "email": "time@club.com", "points": "10"}
+            sess["club"] = "time@club.com"
 
         response = client.post(
             "/book",
@@ -115,7 +113,7 @@ class TestPastCompetitionBooking:
     def test_past_competition_no_spots_change(self, client, mock_past_competition):
         """When booking past competition fails, spotsAvailable should NOT change."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Time Club", "email": "time@club.com", "points": "10"}
+            sess["club"] = "time@club.com"
 
         response = client.post(
             "/book",
@@ -133,7 +131,7 @@ class TestFutureCompetitionBooking:
     def test_future_competition_booking_allowed(self, client, mock_future_competition):
         """Booking a future competition should succeed."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Future Club", "email": "future@club.com", "points": "10"}
+            sess["club"] = "future@club.com"
 
         response = client.post(
             "/book",
@@ -147,7 +145,7 @@ class TestFutureCompetitionBooking:
     def test_future_competition_deducts_points(self, client, mock_future_competition):
         """Booking a future competition should deduct points."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Future Club", "email": "future@club.com", "points": "10"}
+            sess["club"] = "future@club.com"
 
         response = client.post(
             "/book",
@@ -161,7 +159,7 @@ class TestFutureCompetitionBooking:
     def test_future_competition_reduces_spots(self, client, mock_future_competition):
         """Booking a future competition should reduce spotsAvailable."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Future Club", "email": "future@club.com", "points": "10"}
+            sess["club"] = "future@club.com"
 
         response = client.post(
             "/book",
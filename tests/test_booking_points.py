@@ -22,7 +22,7 @@ def client():
 
 
 @pytest.fixture
-def mock_booking_data(monkeypatch):
+def mock_booking_data(use_data):
     """
     Mock clubs and competitions data for booking tests.
     Uses a FUTURE date to avoid past-competition issues.
@@ -42,8 +42,7 @@ def mock_booking_data(monkeypatch):
             },
         ]
 
-    monkeypatch.setattr("server.get_clubs", _mock_get_clubs)
-    monkeypatch.setattr("server.get_competitions", _mock_get_competitions)
+    use_data(clubs=_mock_get_clubs(), competitions=_mock_get_competitions())
 
 
 class TestSuccessfulBooking:
@@ -52,7 +51,7 @@ class TestSuccessfulBooking:
     def test_successful_booking_returns_200(self, client, mock_booking_data):
         """A successful booking should return HTTP 200."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Test Club", "email": "test@club.com", "points": "10"}
+            sess["club"] = "test@club.com"
 
         response = client.post(
             "/book",
@@ -64,7 +63,7 @@ class TestSuccessfulBooking:
     def test_successful_booking_shows_confirmation(self, client, mock_booking_data):
         """A successful booking should display a confirmation message."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Test Club", "email": "test@club.com", "points": "10"}
+            sess["club"] = "test@club.com"
 
         response = client.post(
             "/book",
@@ -76,7 +75,7 @@ class TestSuccessfulBooking:
     def test_successful_booking_deducts_points(self, client, mock_booking_data):
         """After booking N spots, club points should decrease by N."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Test Club", "email": "test@club.com", "points": "10"}
+            sess["club"] = "test@club.com"
 
         response = client.post(
             "/book",
@@ -90,7 +89,7 @@ class TestSuccessfulBooking:
     def test_successful_booking_reduces_spots(self, client, mock_booking_data):
         """After booking N spots, competition spotsAvailable should decrease by N."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Test Club", "email": "test@club.com", "points": "10"}
+            sess["club"] = "test@club.com"
 
         response = client.post(
             "/book",
@@ -108,7 +107,7 @@ class TestInsufficientPoints:
     def test_insufficient_points_rejected(self, client, mock_booking_data):
         """Booking more spots than available points should be rejected."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Poor Club", "email": "poor@club.com", "points": "2"}
+            sess["club"] = "poor@club.com"
 
         response = client.post(
             "/book",
@@ -122,7 +121,7 @@ class TestInsufficientPoints:
     def test_insufficient_points_shows_error(self, client, mock_booking_data):
         """Booking with insufficient points should show an error message."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Poor Club", "email": "poor@club.com", "points": "2"}
+            sess["club"] = "poor@club.com"
 
         response = client.post(
             "/book",
@@ -140,7 +139,7 @@ class TestInsufficientPoints:
     def test_insufficient_points_no_point_change(self, client, mock_booking_data):
         """When booking fails due to insufficient points, club points should NOT change."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Poor Club", "email": "poor@club.com", "points": "2"}
+            sess["club"] = "poor@club.com"
 
         response = client.post(
             "/book",
@@ -154,7 +153,7 @@ class TestInsufficientPoints:
     def test_insufficient_points_no_spots_change(self, client, mock_booking_data):
         """When booking fails, competition spotsAvailable should NOT change."""
         with client.session_transaction() as sess:
-            sess["club"] = {"name": "Poor Club", "email": "poor@club.com", "points": "2"}
+            sess["club"] = "poor@club.com"
 
         response = client.post(
             "/book",
@@ -0,0 +1,247 @@
+"""
+Tests for the bulk import and export commands
+
+'flask import-data' replaces the clubs or competitions by the rows of a
+CSV or NDJSON file; 'flask export-data' writes them back out.
+
+These tests verify:
+- Valid CSV and NDJSON files replace the data file, in chunks of any size
+- Invalid and duplicate rows are reported by line and cancel the import,
+  unless --skip-invalid is given
+- Journaled bookings do not override imported values, and other workers
+  are told to reload and keep journaling their bookings
+- Imports replace the records of the SQLite backend too, which other
+  workers pick up; the memory backend refuses them
+- Exports stream the current values and can be imported back
+"""
+
+import json
+import multiprocessing
+
+import pytest
+
+import provider
+from backends import SqliteBackend
+from records import Club
+from server import app
+
+FUTURE = "2030-01-01 10:00:00"
+
+
+@pytest.fixture
+def folder_data():
+    """One club and one future competition."""
+    return (
+        [{"name": "Old Club", "email": "old@club.com", "points": "30"}],
+        [{"name": "Old Cup", "date": FUTURE, "spotsAvailable": "20"}],
+    )
+
+
+def _run(*args):
+    return app.test_cli_runner().invoke(args=[str(arg) for arg in args])
+
+
+def _book_around_import(ready, imported):
+    """Book with the journal open, let the parent import, then book again"""
+    club = provider.find_club_by_email("old@club.com")
+    assert provider.record_booking(club, provider.find_competition_by_name("Old Cup"), 1)
+    ready.set()
+    assert imported.wait(10)
+    club = provider.find_club_by_email("old@club.com")
+    assert provider.record_booking(club, provider.find_competition_by_name("Old Cup"), 2)
+
+
+@pytest.fixture
+def sqlite_data(data_folder, monkeypatch):
+    """A SQLite backend seeded from the data folder, made the active one."""
+    backend = SqliteBackend(data_folder / "gudlft.sqlite3")
+    backend.load(provider.get_clubs(), provider.get_competitions())
+    monkeypatch.setattr(provider, "_backend", backend)
+    yield backend
+    backend.close()
+
+
+def _clubs(folder):
+    return json.loads((folder / "clubs.json").read_text())["clubs"]
+
+
+class TestImport:
+    """Tests for flask import-data."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 10_000])
+    def test_csv_replaces_clubs(self, data_folder, tmp_path, chunk_size):
+        source = tmp_path / "clubs.csv"
+        source.write_text("name,email,points\nNew Club,new@club.com,12\nOther,o@club.com, 7\n")
+
+        result = _run("import-data", "clubs", source, "--chunk-size", chunk_size)
+
+        assert result.exit_code == 0, result.output
+        assert "Imported clubs 2 in" in result.output
+        assert "rows/s" in result.output
+        assert _clubs(data_folder) == [
+            {"name": "New Club", "email": "new@club.com", "points": "12"},
+            {"name": "Other", "email": "o@club.com", "points": "7"},
+        ]
+        assert provider.find_club_by_email("NEW@club.com").points == 12
+        assert provider.find_club_by_email("old@club.com") is None
+
+    def test_invalid_rows_cancel(self, data_folder, tmp_path):
+        source = tmp_path / "competitions.ndjson"
+        source.write_text("\n".join([
+            json.dumps({"name": "Cup", "date": FUTURE, "spotsAvailable": 5}),
+            "{not json",
+            json.dumps({"name": "Late", "date": "tomorrow", "spotsAvailable": "5"}),
+            json.dumps({"name": "Cup", "date": FUTURE, "spotsAvailable": "x"}),
+            json.dumps({"name": "Cup", "date": FUTURE, "spotsAvailable": 1}),
+        ]) + "\n")
+        before = (data_folder / "competitions.json").read_text()
+
+        result = _run("import-data", "competitions", source, "--errors", tmp_path / "e.csv")
+
+        assert result.exit_code == 1
+        assert "Nothing imported: 4 invalid rows" in result.output
+        assert (data_folder / "competitions.json").read_text() == before
+        assert (tmp_path / "e.csv").read_text().splitlines() == [
+            "line,error",
+            "2,not a JSON object",
+            "3,date is not YYYY-MM-DD HH:MM:SS: 'tomorrow'",
+            "4,spotsAvailable is not a whole number: 'x'",
+            "5,duplicate of line 1",
+        ]
+        assert not list(data_folder.glob("*.tmp"))
+
+    def test_skip_invalid(self, data_folder, tmp_path):
+        source = tmp_path / "clubs.csv"
+        source.write_text("name,email,points\nGood,g@club.com,3\n,nameless@club.com,3\n")
+
+        result = _run("import-data", "clubs", source, "--skip-invalid")
+
+        assert result.exit_code == 0
+        assert "line 3: name is missing" in result.output
+        assert "1 invalid rows skipped" in result.output
+        assert [club["email"] for club in _clubs(data_folder)] == ["g@club.com"]
+
+    def test_empty_file_refused(self, data_folder, tmp_path):
+        (tmp_path / "clubs.csv").write_text("name,email,points\n")
+
+        result = _run("import-data", "clubs", tmp_path / "clubs.csv")
+
+        assert result.exit_code == 1
+        assert "no rows to import" in result.output
+        assert _clubs(data_folder)[0]["email"] == "old@club.com"
+
+    def test_journal_folded_first(self, data_folder, tmp_path):
+        """A booking journaled before the import does not override imported points."""
+        provider.record_booking(provider.get_clubs()[0], provider.get_competitions()[0], 2)
+        version = provider._shared_versions().get("clubs")
+        source = tmp_path / "clubs.csv"
+        source.write_text("name,email,points\nOld Club,old@club.com,100\n")
+
+        assert _run("import-data", "clubs", source).exit_code == 0
+        provider.close_journal()
+        provider.invalidate_cache()
+
+        assert provider.find_club_by_email("old@club.com").points == 100
+        assert provider.find_competition_by_name("Old Cup").spots_available == 18
+        assert provider._shared_versions().get("clubs") == version + 1
+
+    @pytest.mark.skipif(
+        "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork()"
+    )
+    def test_other_worker_keeps_journaling(self, data_folder, tmp_path):
+        source = tmp_path / "competitions.ndjson"
+        source.write_text(json.dumps({"name": "Old Cup", "date": FUTURE, "spotsAvailable": 50}))
+        context = multiprocessing.get_context("fork")
+        ready, imported = context.Event(), context.Event()
+        worker = context.Process(target=_book_around_import, args=(ready, imported))
+        worker.start()
+        try:
+            assert ready.wait(10)
+            assert _run("import-data", "competitions", source).exit_code == 0
+        finally:
+            imported.set()
+            worker.join()
+        provider.close_journal()
+        provider.invalidate_cache()
+
+        assert worker.exitcode == 0
+        club = provider.find_club_by_email("old@club.com")
+        competition = provider.find_competition_by_name("Old Cup")
+        assert club.points == 27
+        assert competition.spots_available == 48
+        assert provider.booked_spots(club, competition) == 3
+
+
+class TestImportBackends:
+    """Tests for imports into the other backends."""
+
+    def test_sqlite_import_is_served(self, sqlite_data, tmp_path):
+        other = SqliteBackend(sqlite_data.path)
+        try:
+            assert other.get_leaderboard().top(0, 1)[0]["name"] == "Old Club"
+            source = tmp_path / "clubs.csv"
+            source.write_text("name,email,points\nNew Club,new@club.com,12\n")
+
+            assert _run("import-data", "clubs", source).exit_code == 0
+
+            result = _run("export-data", "clubs")
+            assert [json.loads(line)["email"] for line in result.stdout.splitlines()] == [
+                "new@club.com"
+            ]
+            assert other.sync() is True
+            assert other.get_leaderboard().top(0, 2) == [
+                {"name": "New Club", "points": 12, "rank": 1}
+            ]
+        finally:
+            other.close()
+
+    def test_cancelled_sqlite_import_changes_nothing(self, sqlite_data, tmp_path):
+        source = tmp_path / "clubs.csv"
+        source.write_text("name,email,points\nNew Club,new@club.com,12\nBad,bad,1\n")
+        version = sqlite_data.stored_version()
+
+        assert _run("import-data", "clubs", source).exit_code != 0
+
+        assert [club.email for club in provider.get_clubs()] == ["old@club.com"]
+        assert sqlite_data.stored_version() == version
+
+    def test_memory_backend_refuses(self, tmp_path):
+        source = tmp_path / "clubs.csv"
+        source.write_text("name,email,points\nNew Club,new@club.com,12\n")
+
+        result = _run("import-data", "clubs", source)
+
+        assert result.exit_code != 0
+        assert "Nothing imported: MemoryBackend cannot replace its data" in result.output
+        assert provider.find_club_by_email("new@club.com") is None
+
+
+class TestExport:
+    """Tests for flask export-data."""
+
+    def test_ndjson_to_stdout(self, data_folder):
+        provider.record_booking(provider.get_clubs()[0], provider.get_competitions()[0], 3)
+
+        result = _run("export-data", "clubs")
+
+        assert result.exit_code == 0
+        assert json.loads(result.stdout.splitlines()[0]) == {
+            "name": "Old Club", "email": "old@club.com", "points": "27",
+        }
+        assert "Exported clubs 1 in" in result.stderr
+
+    def test_round_trip(self, data_folder, tmp_path):
+        clubs = [Club(f"Club {i}", f"c{i}@club.com", i) for i in range(25)]
+        provider.replace_dataset("clubs", clubs)
+        exported = tmp_path / "clubs.csv"
+
+        assert _run("export-data", "clubs", exported, "--chunk-size", 7).exit_code == 0
+        assert _run("import-data", "clubs", exported).exit_code == 0
+
+        assert provider.get_clubs() == clubs
+
+    def test_unknown_format(self, data_folder, tmp_path):
+        result = _run("export-data", "clubs", tmp_path / "clubs.txt")
+
+        assert result.exit_code == 2
+        assert "pass --format" in result.output
@@ -0,0 +1,125 @@
+"""
+Tests for the date-indexed competition catalogue
+
+Competition dates are parsed once into a sorted index answering upcoming,
+past and date-range queries; /summary pages through it upcoming first.
+
+These tests verify:
+- Upcoming/past partitions and date ranges are correct and ordered
+- Listings resume after a given competition
+- Pages list upcoming competitions first, then past ones
+- /summary is paginated with ?page=
+"""
+
+from datetime import datetime
+
+import pytest
+
+from catalogue import Catalogue
+from records import Competition
+from server import app
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+COMPETITIONS = [
+    {"name": "Past B", "date": "2024-05-01 10:00:00", "spotsAvailable": "5"},
+    {"name": "Future B", "date": "2026-02-01 10:00:00", "spotsAvailable": "5"},
+    {"name": "Past A", "date": "2023-01-01 10:00:00", "spotsAvailable": "5"},
+    {"name": "Future A", "date": "2025-07-01 10:00:00", "spotsAvailable": "5"},
+    {"name": "Future C", "date": "2027-03-01 10:00:00", "spotsAvailable": "5"},
+]
+
+
+@pytest.fixture
+def catalogue():
+    return Catalogue([Competition.from_dict(competition) for competition in COMPETITIONS])
+
+
+@pytest.fixture
+def client():
+    """Create a test client for the Flask app."""
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+
+class TestCatalogue:
+    """Tests for the Catalogue queries."""
+
+    def test_upcoming_soonest_first(self, catalogue):
+        assert catalogue.upcoming(NOW) == ["Future A", "Future B", "Future C"]
+        assert catalogue.count_upcoming(NOW) == 3
+
+    def test_past_most_recent_first(self, catalogue):
+        assert catalogue.past(NOW) == ["Past B", "Past A"]
+
+    def test_between(self, catalogue):
+        """Date ranges should include the start and exclude the end."""
+        names = catalogue.between(datetime(2024, 5, 1, 10), datetime(2026, 2, 1, 10))
+        assert names == ["Past B", "Future A"]
+
+    def test_seek_resumes_after_a_competition(self, catalogue):
+        position = catalogue.seek(datetime(2025, 7, 1, 10), "Future A")
+
+        assert catalogue.names_from(position, 2) == ["Future B", "Future C"]
+        assert catalogue.first_upcoming(NOW) == 2
+
+    def test_date_of(self, catalogue):
+        assert catalogue.date_of("Future C") == datetime(2027, 3, 1, 10)
+        assert catalogue.date_of("Unknown") is None
+
+    @pytest.mark.parametrize(
+        "number, expected",
+        [
+            (1, ["Future A", "Future B"]),
+            (2, ["Future C", "Past B"]),
+            (3, ["Past A"]),
+            (4, []),
+        ],
+    )
+    def test_pages_upcoming_then_past(self, catalogue, number, expected):
+        assert catalogue.page(number, 2, NOW) == expected
+
+    def test_page_count(self, catalogue):
+        assert catalogue.page_count(2) == 3
+        assert Catalogue([]).page_count(2) == 1
+
+
+class TestSummaryPagination:
+    """Tests for the paginated /summary page."""
+
+    @pytest.fixture(autouse=True)
+    def many_competitions(self, use_data, monkeypatch):
+        competitions = [
+            {"name": f"Cup {i:02}", "date": f"20{30 + i}-01-01 10:00:00", "spotsAvailable": "5"}
+            for i in range(5)
+        ]
+        competitions.append(
+            {"name": "Old Cup", "date": "2020-01-01 10:00:00", "spotsAvailable": "5"}
+        )
+        use_data(competitions=competitions)
+        monkeypatch.setitem(app.config, "SUMMARY_PAGE_SIZE", 4)
+
+    def _login(self, client):
+        with client.session_transaction() as sess:
+            sess["club"] = "john@simplylift.co"
+
+    def test_first_page_lists_upcoming(self, client):
+        self._login(client)
+        data = client.get("/summary").data.decode()
+
+        assert "Cup 00" in data and "Cup 03" in data
+        assert "Cup 04" not in data and "Old Cup" not in data
+        assert data.find("Cup 00") < data.find("Cup 03")
+        assert "Page 1 of 2" in data
+
+    def test_second_page_ends_with_past(self, client):
+        self._login(client)
+        data = client.get("/summary?page=2").data.decode()
+
+        assert "Cup 04" in data and "Old Cup" in data
+        assert "Cup 00" not in data
+
+    def test_out_of_range_page_is_clamped(self, client):
+        self._login(client)
+        assert "Page 2 of 2" in client.get("/summary?page=99").data.decode()
@@ -0,0 +1,191 @@
+"""
+Tests for conditional GET on /points and /summary
+
+Both pages carry an ETag derived from the version of the stored data,
+shared by every worker and kept across restarts, and /points also
+a Last-Modified date; matching If-None-Match/If-Modified-Since headers get
+a 304 without any template rendering.
+
+These tests verify:
+- Validators and Cache-Control are set (public for /points, private for /summary)
+- A matching validator returns an empty 304 without rendering
+- A booking changes the validators
+- An ETag handed out before a restart or by another process does not match
+  data that changed since
+- Last-Modified is only sent on /points, once the second of the change is over
+- Pending flash messages always get a full page
+"""
+
+import pytest
+
+import caching
+import provider
+import server
+from server import app
+
+CLUB = {"name": "Simply Lift", "email": "john@simplylift.co", "points": "13"}
+
+
+@pytest.fixture
+def client(use_data):
+    """Create a test client for the Flask app, with one future competition."""
+    use_data(competitions=[
+        {"name": "Future Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": "20"},
+    ])
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def forbid_rendering(monkeypatch):
+    """Return a function making any later template rendering fail the test."""
+    def _fail(*args, **kwargs):
+        raise AssertionError("template rendered for a 304")
+
+    return lambda: monkeypatch.setattr(server, "render_template", _fail)
+
+
+@pytest.fixture
+def settled(monkeypatch):
+    """Move the last data change a second back, so its second is over."""
+    version, changed_at = provider.data_version()
+    monkeypatch.setattr(provider, "_data_version", (version, changed_at - 1))
+
+
+def _login(client, club=CLUB):
+    with client.session_transaction() as sess:
+        sess["club"] = club["email"]
+
+
+class TestPointsConditionalGet:
+    """Tests for the public points board."""
+
+    def test_validators_and_public_cache_control(self, client, settled):
+        response = client.get("/points")
+
+        assert response.status_code == 200
+        assert response.headers["ETag"]
+        assert response.headers["Last-Modified"]
+        assert response.cache_control.public
+        assert response.cache_control.no_cache
+
+    def test_matching_etag_returns_304(self, client, forbid_rendering):
+        etag = client.get("/points").headers["ETag"]
+        forbid_rendering()
+
+        response = client.get("/points", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.data == b""
+
+    def test_matching_last_modified_returns_304(self, client, settled, forbid_rendering):
+        last_modified = client.get("/points").headers["Last-Modified"]
+        forbid_rendering()
+
+        response = client.get("/points", headers={"If-Modified-Since": last_modified})
+
+        assert response.status_code == 304
+
+    def test_change_in_same_second_not_dated(self, client, monkeypatch):
+        """A change within the current second could follow the page: no date yet."""
+        _, changed_at = provider.data_version()
+        monkeypatch.setattr(caching.time, "time", lambda: changed_at)
+
+        response = client.get("/points")
+
+        assert response.status_code == 200
+        assert "Last-Modified" not in response.headers
+
+    def test_booking_changes_last_modified(self, client, settled, monkeypatch):
+        last_modified = client.get("/points").headers["Last-Modified"]
+        _login(client)
+        client.post("/book", data={"competition": "Future Cup", "spots": "2"})
+        _, changed_at = provider.data_version()
+        monkeypatch.setattr(caching.time, "time", lambda: changed_at + 1)
+
+        response = client.get("/points", headers={"If-Modified-Since": last_modified})
+
+        assert response.status_code == 200
+        assert response.headers["Last-Modified"] != last_modified
+
+    def test_other_page_has_other_etag(self, client):
+        assert client.get("/points").headers["ETag"] != client.get(
+            "/points?limit=1"
+        ).headers["ETag"]
+
+    def test_booking_changes_etag(self, client):
+        etag = client.get("/points").headers["ETag"]
+        _login(client)
+        client.post("/book", data={"competition": "Future Cup", "spots": "2"})
+
+        response = client.get("/points", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
+class TestSummaryConditionalGet:
+    """Tests for the logged-in summary page."""
+
+    def test_private_cache_control(self, client):
+        _login(client)
+        response = client.get("/summary")
+
+        assert response.cache_control.private
+        assert "Last-Modified" not in response.headers
+        assert not response.cache_control.public
+
+    def test_matching_etag_returns_304(self, client, forbid_rendering):
+        _login(client)
+        etag = client.get("/summary").headers["ETag"]
+        forbid_rendering()
+
+        response = client.get("/summary", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+
+    def test_etag_depends_on_club(self, client):
+        _login(client)
+        etag = client.get("/summary").headers["ETag"]
+        _login(client, {"name": "Iron Temple", "email": "admin@irontemple.com", "points": "4"})
+
+        assert client.get("/summary").headers["ETag"] != etag
+
+    def test_flash_messages_bypass_304(self, client):
+        _login(client)
+        etag = client.get("/summary").headers["ETag"]
+        with client.session_transaction() as sess:
+            sess["_flashes"] = [("message", "Hello again")]
+
+        response = client.get("/summary", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert b"Hello again" in response.data
+
+
+class TestStoredVersion:
+    """Tests for ETags across processes."""
+
+    def test_json_etag_outlives_process_counter(self, data_folder, monkeypatch):
+        """A process whose own counter is back where it was must not answer 304."""
+        app.config["TESTING"] = True
+        client = app.test_client()
+        etag = client.get("/points").headers["ETag"]
+        counted = provider.data_version()
+        club = provider.find_club_by_email("folder@club.com")
+        provider.record_booking(club, provider.find_competition_by_name("Folder Cup"), 2)
+
+        # As in a restarted or other worker, whose counter reached the same number
+        monkeypatch.setattr(provider, "_data_version", counted)
+        app.extensions["fragment_cache"].clear()
+        response = client.get("/points", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert "28" in response.data.decode()
+
+    def test_memory_backend_tells_processes_apart(self, monkeypatch):
+        version = provider.get_backend().stored_version()
+        monkeypatch.setattr(provider, "_BOOT_ID", "restarted")
+
+        assert provider.get_backend().stored_version() != version
@@ -0,0 +1,156 @@
+"""
+Tests for live spot availability over server-sent events
+
+Bookings and holds publish the spots left of the competitions they change
+to every client streaming /events; the summary page applies them in place.
+
+These tests verify:
+- Events are fanned out to every subscriber
+- A subscriber whose queue is full is dropped and its stream ends
+- Streams send keepalives and end after their idle timeout
+- Only changed spot counts are published
+- Bookings and holds push the new spots left to /events, which needs a login
+- Live spots are off by default: no /events stream and no listener on the
+  summary page
+"""
+
+import json
+
+import pytest
+
+import server
+from events import AvailabilityFeed, Broadcaster, format_event
+
+FUTURE = "2030-01-01 10:00:00"
+
+
+def _text(chunk):
+    return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+
+def _spots(chunk):
+    """{competition: spots left} of a "spots" event"""
+    event, data = _text(chunk).strip().split("\n")
+    assert event == "event: spots"
+    return json.loads(data[len("data: "):])
+
+
+@pytest.fixture
+def live_app(use_data):
+    """An app with fast keepalives and two logged-in clients."""
+    app = server.create_app({
+        "TESTING": True,
+        "LIVE_SPOTS": True,
+        "EVENTS_HEARTBEAT_SECONDS": 0.05,
+        "EVENTS_STREAM_SECONDS": 5,
+    })
+    use_data(
+        clubs=[
+            {"name": "Watcher Club", "email": "watcher@club.com", "points": "20"},
+            {"name": "Booker Club", "email": "booker@club.com", "points": "20"},
+        ],
+        competitions=[{"name": "Live Cup", "date": FUTURE, "spotsAvailable": "10"}],
+    )
+    clients = []
+    for email in ("watcher@club.com", "booker@club.com"):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["club"] = email
+        clients.append(client)
+    return app, clients
+
+
+class TestBroadcaster:
+    """Tests for the fan-out of events."""
+
+    def test_fan_out(self):
+        broadcaster = Broadcaster()
+        first, second = broadcaster.subscribe(), broadcaster.subscribe()
+
+        assert broadcaster.publish("hello") == 2
+        assert first.queue.get_nowait() == second.queue.get_nowait() == "hello"
+
+    def test_slow_subscriber_dropped(self):
+        broadcaster = Broadcaster(queue_size=2)
+        slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+        stream = broadcaster.stream(slow, heartbeat=0.01)
+        next(stream)
+        broadcaster.publish("a")
+        fast.queue.get_nowait()
+        broadcaster.publish("b")
+        fast.queue.get_nowait()
+
+        assert broadcaster.publish("c") == 1
+        assert slow.dropped
+        assert broadcaster.dropped == 1
+        assert "c" not in list(stream)
+        assert len(broadcaster) == 1
+
+    def test_keepalive_and_timeout(self):
+        broadcaster = Broadcaster()
+        stream = broadcaster.stream(broadcaster.subscribe(), heartbeat=0.01, timeout=0.02)
+
+        assert list(stream) == ["retry: 5000\n\n", ": keepalive\n\n", ": keepalive\n\n"]
+        assert len(broadcaster) == 0
+
+
+class TestAvailabilityFeed:
+    """Tests for publishing spot counts."""
+
+    def test_only_changes_published(self):
+        broadcaster = Broadcaster()
+        subscription = broadcaster.subscribe()
+        feed = AvailabilityFeed(broadcaster)
+
+        assert feed.publish({"Cup": 3, "Open": 5}) == {"Cup": 3, "Open": 5}
+        assert feed.publish({"Cup": 3, "Open": 4}) == {"Open": 4}
+        assert feed.publish({"Cup": 3}) == {}
+        assert subscription.queue.get_nowait() == format_event("spots", {"Cup": 3, "Open": 5})
+        assert _spots(subscription.queue.get_nowait()) == {"Open": 4}
+        assert subscription.queue.empty()
+
+
+class TestEventsRoute:
+    """Tests for GET /events."""
+
+    def test_requires_login(self, live_app):
+        app, _ = live_app
+
+        assert app.test_client().get("/events").status_code == 401
+
+    def test_bookings_and_holds_pushed(self, live_app):
+        app, (watcher, booker) = live_app
+        response = watcher.get("/events", buffered=False)
+        chunks = iter(response.response)
+
+        assert response.mimetype == "text/event-stream"
+        assert _text(next(chunks)).startswith("retry:")
+        booker.get("/book/Live Cup?spots=3")
+        assert _spots(next(chunks)) == {"Live Cup": 7}
+        booker.post("/book", data={"competition": "Live Cup", "spots": "2"})
+        assert _spots(next(chunks)) == {"Live Cup": 8}
+
+        response.close()
+        assert len(app.extensions["availability_feed"].broadcaster) == 0
+
+    def test_summary_page_listens(self, live_app):
+        _, (watcher, _) = live_app
+        page = watcher.get("/summary").data.decode()
+
+        assert 'new EventSource("/events")' in page
+        assert '<li data-competition="Live Cup">' in page
+
+    def test_off_by_default(self, use_data):
+        app = server.create_app({"TESTING": True})
+        use_data(
+            clubs=[{"name": "Watcher Club", "email": "watcher@club.com", "points": "20"}],
+            competitions=[{"name": "Live Cup", "date": FUTURE, "spotsAvailable": "10"}],
+        )
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["club"] = "watcher@club.com"
+
+        assert client.get("/events").status_code == 404
+        page = client.get("/summary").data.decode()
+        assert "EventSource" not in page
+        assert '<li data-competition="Live Cup">' in page
@@ -0,0 +1,106 @@
+"""
+Tests for the rendered-fragment cache
+
+The competition list and points table are rendered once per data version
+and page, then shared by every request.
+
+These tests verify:
+- The cache is a size-bounded LRU
+- A data version change (e.g. a booking) empties the cache, and a
+  fragment's own version (e.g. of the holds) re-renders just that fragment
+- /summary reuses the competition list across clubs
+- A booking shows fresh spots on the next page render
+"""
+
+import pytest
+
+import provider
+from caching import FragmentCache
+from server import app
+
+
+@pytest.fixture
+def client(use_data):
+    """Create a test client for the Flask app, with one future competition."""
+    use_data(competitions=[
+        {"name": "Future Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": "20"},
+    ])
+    app.extensions["fragment_cache"].clear()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+
+def _login(client, email):
+    with client.session_transaction() as sess:
+        sess["club"] = email
+
+
+class TestFragmentCache:
+    """Tests for the FragmentCache structure."""
+
+    def test_lru_eviction(self):
+        cache = FragmentCache(max_entries=2)
+        cache.get_or_render("a", lambda: "A")
+        cache.get_or_render("b", lambda: "B")
+        cache.get_or_render("a", lambda: "A")
+        cache.get_or_render("c", lambda: "C")
+
+        assert cache.get_or_render("a", lambda: "stale") == "A"
+        assert cache.get_or_render("b", lambda: "B again") == "B again"
+        assert cache.info()["size"] == 2
+
+    def test_version_change_empties_cache(self):
+        cache = FragmentCache()
+        cache.get_or_render("a", lambda: "old")
+
+        provider.bump_data_version()
+
+        assert cache.get_or_render("a", lambda: "new") == "new"
+        assert cache.info() == {"hits": 0, "misses": 2, "size": 1}
+
+    def test_own_version_change_renders_again(self):
+        cache = FragmentCache()
+        cache.get_or_render("a", lambda: "A", version=1)
+        cache.get_or_render("b", lambda: "B")
+
+        assert cache.get_or_render("a", lambda: "A2", version=2) == "A2"
+        assert cache.get_or_render("a", lambda: "stale", version=2) == "A2"
+        assert cache.get_or_render("b", lambda: "stale") == "B"
+        assert cache.info() == {"hits": 2, "misses": 3, "size": 2}
+
+    def test_fragments_are_markup(self):
+        cache = FragmentCache()
+        assert cache.get_or_render("a", lambda: "<li>x</li>").__html__() == "<li>x</li>"
+
+
+class TestFragmentRoutes:
+    """Tests for the cached fragments in the pages."""
+
+    def test_competition_list_shared_between_clubs(self, client):
+        _login(client, "john@simplylift.co")
+        client.get("/summary")
+        _login(client, "kate@shelifts.co.uk")
+        hits = app.extensions["fragment_cache"].info()["hits"]
+
+        response = client.get("/summary")
+
+        assert b"kate@shelifts.co.uk" in response.data
+        assert b"Future Cup" in response.data
+        assert app.extensions["fragment_cache"].info()["hits"] == hits + 1
+
+    def test_points_table_cached(self, client):
+        first = client.get("/points").data
+        hits = app.extensions["fragment_cache"].info()["hits"]
+        second = client.get("/points").data
+
+        assert first == second
+        assert app.extensions["fragment_cache"].info()["hits"] == hits + 1
+
+    def test_booking_refreshes_competition_list(self, client):
+        _login(client, "john@simplylift.co")
+        client.get("/summary")
+
+        response = client.post("/book", data={"competition": "Future Cup", "spots": "3"})
+
+        assert b"Number of spots available: 17" in response.data
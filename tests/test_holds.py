@@ -0,0 +1,186 @@
+"""
+Tests for temporary spot holds
+
+Opening a booking page holds spots for the club until it books or the
+hold expires; held spots are not available to other clubs.
+
+These tests verify:
+- Holds are totalled per competition, replaced per club and released
+- Expiry pops due holds off the heap and skips replaced ones
+- Holds are capped by what the club could book, over all its holds
+- Other clubs see and can book only the spots nobody holds
+- Booking consumes the hold; an expired hold frees its spots
+- Holds refresh the pages showing spots left, not the points board
+"""
+
+import time
+
+import pytest
+
+import provider
+from booking import BookingEngine, BookingError
+from holds import SpotHolds
+from records import Club, Competition, parse_date
+from server import app
+
+FUTURE = "2030-01-01 10:00:00"
+
+
+@pytest.fixture
+def holds():
+    """Holds lasting 60 seconds, recording the competitions they change."""
+    changes = []
+    holds = SpotHolds(60, on_change=changes.append)
+    holds.changes = changes
+    return holds
+
+
+@pytest.fixture
+def two_clubs(use_data):
+    """Two logged-in clients and a competition with 3 spots left."""
+    use_data(
+        clubs=[
+            {"name": "First Club", "email": "first@club.com", "points": "20"},
+            {"name": "Second Club", "email": "second@club.com", "points": "20"},
+        ],
+        competitions=[{"name": "Tight Cup", "date": FUTURE, "spotsAvailable": "3"}],
+    )
+    app.config["TESTING"] = True
+    clients = []
+    for email in ("first@club.com", "second@club.com"):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["club"] = email
+        clients.append(client)
+    return clients
+
+
+class TestSpotHolds:
+    """Tests for the hold registry."""
+
+    def test_totals_replace_and_release(self, holds):
+        holds.hold("a", "Cup", 2, now=0)
+        holds.hold("b", "Cup", 1, now=0)
+        holds.hold("a", "Cup", 3, now=0)
+
+        assert holds.held("Cup") == 4
+        assert holds.held_by_others("a", "Cup") == 1
+        assert holds.release("a", "Cup") == 3
+        assert holds.release("a", "Cup") == 0
+        assert holds.held("Cup") == 1
+        assert holds.held_by_club("a") == 0
+        assert holds.changes == [{"Cup"}] * 4
+        assert holds.version == 5
+
+    def test_expiry(self, holds):
+        holds.hold("a", "Cup", 2, now=0)
+        holds.hold("b", "Cup", 1, now=30)
+
+        assert holds.expire(now=59) == 0
+        assert holds.expire(now=60) == 1
+        assert holds.changes[-1] == {"Cup"}
+        assert holds.held("Cup") == 1
+        assert holds.expire(now=90) == 1
+        assert len(holds) == 0
+
+    def test_replaced_hold_not_expired_early(self, holds):
+        holds.hold("a", "Cup", 2, now=0)
+        holds.hold("a", "Cup", 2, now=50)
+
+        assert holds.expire(now=60) == 0
+        assert holds.held("Cup") == 2
+        assert holds.expire(now=110) == 1
+
+
+class TestEngineHolds:
+    """Tests for holds in the booking engine."""
+
+    def test_hold_is_capped(self, holds):
+        engine = BookingEngine(holds=holds)
+        club = Club("Club", "club@test.com", 4)
+        other = Club("Other", "other@test.com", 50)
+        competition = Competition("Cup", parse_date(FUTURE), 10)
+
+        assert engine.hold(club, competition, 12) == 4
+        assert engine.hold(other, competition, 12) == 6
+        with pytest.raises(BookingError) as excinfo:
+            engine.book(Club("Third", "third@test.com", 50), competition, 1)
+
+        assert excinfo.value.reason == "not_enough_spots"
+
+    def test_hold_is_capped_by_other_holds(self, holds):
+        engine = BookingEngine(holds=holds)
+        club = Club("Club", "club@test.com", 12)
+        cup = Competition("Cup", parse_date(FUTURE), 10)
+        open_ = Competition("Open", parse_date(FUTURE), 10)
+
+        assert engine.hold(club, cup, 8) == 8
+        assert engine.hold(club, open_, 8) == 4
+        assert engine.hold(club, cup, 10) == 8
+        assert holds.held_by_club("club@test.com") == 12
+
+    def test_booking_consumes_hold(self, holds):
+        engine = BookingEngine(holds=holds)
+        club = Club("Club", "club@test.com", 10)
+        competition = Competition("Cup", parse_date(FUTURE), 2)
+        engine.hold(club, competition, 2)
+
+        engine.book(club, competition, 2)
+
+        assert holds.held("Cup") == 0
+        assert competition.spots_available == 0
+
+    def test_no_hold_on_past_competition(self, holds):
+        engine = BookingEngine(holds=holds)
+        competition = Competition("Cup", parse_date("2020-01-01 10:00:00"), 5)
+
+        assert engine.hold(Club("Club", "club@test.com", 10), competition, 1) == 0
+        assert len(holds) == 0
+
+
+class TestHoldRoutes:
+    """Tests for holds made by the booking page."""
+
+    def test_held_spots_hidden_from_others(self, two_clubs):
+        first, second = two_clubs
+        page = first.get("/book/Tight Cup?spots=3").data.decode()
+
+        assert "3 spots are held for you for the next 2 minutes" in page
+        assert "Number of spots available: 0" in second.get("/summary").data.decode()
+        assert "Spots available: 0" in second.get("/book/Tight Cup").data.decode()
+        response = second.post("/book", data={"competition": "Tight Cup", "spots": "1"})
+        assert "Not enough spots left" in response.data.decode()
+        listing = second.get("/api/competitions").get_json()
+        assert listing["items"][0]["spotsAvailable"] == 0
+
+    def test_holder_books_held_spots(self, two_clubs):
+        first, _ = two_clubs
+        first.get("/book/Tight Cup?spots=2")
+
+        response = first.post("/book", data={"competition": "Tight Cup", "spots": "2"})
+
+        assert "Great-booking complete!" in response.data.decode()
+        assert provider.find_competition_by_name("Tight Cup").spots_available == 1
+        assert app.extensions["spot_holds"].held("Tight Cup") == 0
+
+    def test_expired_hold_frees_spots(self, two_clubs):
+        first, second = two_clubs
+        first.get("/book/Tight Cup?spots=3")
+
+        app.extensions["spot_holds"].expire(time.monotonic() + app.config["SPOT_HOLD_SECONDS"])
+
+        assert "Number of spots available: 3" in second.get("/summary").data.decode()
+
+    def test_points_board_not_refreshed(self, two_clubs):
+        first, second = two_clubs
+        points = first.get("/points")
+        summary = first.get("/summary")
+
+        second.get("/book/Tight Cup?spots=2")
+
+        assert first.get(
+            "/points", headers={"If-None-Match": points.headers["ETag"]}
+        ).status_code == 304
+        response = first.get("/summary", headers={"If-None-Match": summary.headers["ETag"]})
+        assert response.status_code == 200
+        assert "Number of spots available: 1" in response.data.decode()
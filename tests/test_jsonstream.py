@@ -0,0 +1,120 @@
+"""
+Tests for the streaming JSON loader
+
+jsonstream.iter_array yields the records of one top-level array without
+parsing the whole document; the provider builds its cache and indexes
+from it in one pass and exposes iter_clubs()/iter_competitions().
+
+These tests verify:
+- Records come out identical to json.load, whatever the chunk size
+- Other keys, nested brackets in strings and numbers split across chunks
+- Memory use stays flat on a large file
+- iter_clubs() streams with the journal applied and does not fill the cache
+- A load fills the lookup index in the same pass
+"""
+
+import io
+import json
+import tracemalloc
+
+import pytest
+
+import provider
+from jsonstream import iter_array
+
+DOCUMENT = {
+    "meta": {"note": "a ] tricky } value [", "list": [1, 2, [3]]},
+    "clubs": [
+        {"name": "Simply Lift", "email": "john@simplylift.co", "points": "13"},
+        {"name": "Quote \" Club ]", "email": "q@club.com", "points": 123456789},
+        {"name": "Unicode été", "email": "u@club.com", "points": "4", "tags": []},
+    ],
+    "after": 3.25,
+}
+
+
+class TestIterArray:
+    """Tests for jsonstream.iter_array."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1 << 16])
+    def test_same_records_as_json_load(self, chunk_size):
+        text = json.dumps(DOCUMENT, indent=2)
+
+        assert list(iter_array(io.StringIO(text), "clubs", chunk_size)) == DOCUMENT["clubs"]
+
+    def test_array_of_numbers(self):
+        text = '{"values": [1, 22, 333, 4444.5]}'
+
+        assert list(iter_array(io.StringIO(text), "values", 2)) == [1, 22, 333, 4444.5]
+
+    def test_missing_key_and_empty_array(self):
+        assert list(iter_array(io.StringIO('{"other": []}'), "clubs")) == []
+        assert list(iter_array(io.StringIO('{"clubs": [ ]}'), "clubs")) == []
+        assert list(iter_array(io.StringIO("{}"), "clubs")) == []
+
+    def test_malformed_document(self):
+        with pytest.raises(ValueError):
+            list(iter_array(io.StringIO('{"clubs": [{"name": "A"} {"name": "B"}]}'), "clubs"))
+        with pytest.raises(ValueError):
+            list(iter_array(io.StringIO('{"clubs": [{"name": "A"'), "clubs"))
+
+    def test_memory_stays_flat(self, tmp_path):
+        path = tmp_path / "clubs.json"
+        clubs = [
+            {"name": f"Club {n}", "email": f"club{n}@test.com", "points": str(n % 50)}
+            for n in range(50_000)
+        ]
+        path.write_text(json.dumps({"clubs": clubs}))
+        del clubs
+
+        tracemalloc.start()
+        try:
+            with open(path) as fp:
+                count = sum(1 for _ in iter_array(fp, "clubs"))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert count == 50_000
+        assert peak < 1_000_000
+
+
+class TestProviderStreaming:
+    """Tests for the provider's streaming access to the JSON files."""
+
+    @pytest.fixture
+    def json_backend(self, isolated_data_folder, monkeypatch):
+        monkeypatch.setattr(provider, "_backend", provider.JsonBackend())
+        return isolated_data_folder
+
+    def test_iter_clubs_streams_without_caching(self, json_backend):
+        clubs = list(provider.iter_clubs())
+
+        assert [club.email for club in clubs] == [
+            club["email"] for club in json.loads((json_backend / "clubs.json").read_text())["clubs"]
+        ]
+        assert provider.cache_info()["size"] == 0
+
+    def test_iter_clubs_applies_journal(self, json_backend):
+        club = provider.find_club_by_email("john@simplylift.co")
+        competition = provider.get_competitions()[0]
+        provider.record_booking(club, competition, 2)
+        provider.invalidate_cache()
+
+        streamed = {club.email: club.points for club in provider.iter_clubs()}
+        names = {c.name: c.spots_available for c in provider.iter_competitions()}
+
+        assert streamed["john@simplylift.co"] == club.points
+        assert names[competition.name] == competition.spots_available
+
+    def test_iter_uses_loaded_records(self, json_backend):
+        clubs = provider.get_clubs()
+
+        assert next(provider.iter_clubs()) is clubs[0]
+
+    def test_load_builds_index_in_the_same_pass(self, json_backend):
+        clubs = provider.get_clubs()
+
+        indexed, index = provider._indexes["email"]
+        assert indexed is clubs
+        assert index["john@simplylift.co"] is clubs[0]
@@ -0,0 +1,112 @@
+"""
+Tests for the incrementally maintained points leaderboard
+
+These tests verify:
+- Clubs are ordered by points, ties share a rank
+- A points change moves a single club without a rebuild
+- Listings resume after a club and stop below a points threshold
+- Bad point values rank as zero instead of breaking the order
+- /points supports ?page= and ?limit= and follows bookings
+"""
+
+import pytest
+
+import provider
+from leaderboard import Leaderboard
+from records import Club
+from server import app
+
+CLUBS = [
+    {"name": "Alpha", "email": "a@alpha.com", "points": "5"},
+    {"name": "Beta", "email": "b@beta.com", "points": "12"},
+    {"name": "Gamma", "email": "g@gamma.com", "points": "12"},
+    {"name": "Delta", "email": "d@delta.com", "points": "oops"},
+]
+RECORDS = [Club.from_dict(club) for club in CLUBS]
+
+
+@pytest.fixture
+def client():
+    """Create a test client for the Flask app."""
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+
+class TestLeaderboard:
+    """Tests for the Leaderboard structure."""
+
+    def test_ordering_and_ranks(self):
+        rows = Leaderboard(RECORDS).top(0, 10)
+
+        assert [row["name"] for row in rows] == ["Beta", "Gamma", "Alpha", "Delta"]
+        assert [row["rank"] for row in rows] == [1, 1, 3, 4]
+        assert rows[-1]["points"] == 0
+
+    def test_rank_query(self):
+        leaderboard = Leaderboard(RECORDS)
+
+        assert leaderboard.rank("g@gamma.com") == 1
+        assert leaderboard.rank("a@alpha.com") == 3
+        assert leaderboard.rank("nobody@test.com") is None
+
+    def test_update_moves_one_club(self):
+        leaderboard = Leaderboard(RECORDS)
+
+        leaderboard.update(Club("Beta", "b@beta.com", 1))
+
+        assert [row["name"] for row in leaderboard.top(0, 10)] == [
+            "Gamma", "Alpha", "Beta", "Delta"
+        ]
+        assert leaderboard.rank("b@beta.com") == 3
+        assert len(leaderboard) == 4
+
+    def test_top_pages(self):
+        leaderboard = Leaderboard(RECORDS)
+
+        assert [row["name"] for row in leaderboard.top(2, 2)] == ["Alpha", "Delta"]
+        assert leaderboard.top(4, 2) == []
+
+    def test_seek_and_count(self):
+        leaderboard = Leaderboard(RECORDS)
+
+        assert leaderboard.seek(12, "Beta") == 1
+        assert leaderboard.seek(12, "Beta", 0) == 0
+        assert leaderboard.count_at_least(5) == 3
+        assert leaderboard.count_at_least(13) == 0
+
+
+class TestPointsRoute:
+    """Tests for the paginated /points page."""
+
+    @pytest.fixture(autouse=True)
+    def board_data(self, use_data):
+        use_data(clubs=CLUBS, competitions=[
+            {"name": "Future Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": "20"},
+        ])
+
+    def test_limit_and_page(self, client):
+        data = client.get("/points?limit=2&page=2").data.decode()
+
+        assert "Alpha" in data and "Delta" in data
+        assert "Beta" not in data
+        assert "Page 2 of 2" in data
+
+    def test_booking_updates_board(self, client):
+        """A booking should reorder the board through an incremental update."""
+        client.get("/points")
+        leaderboard = provider.get_leaderboard()
+        with client.session_transaction() as sess:
+            sess["club"] = CLUBS[1]["email"]
+
+        client.post("/book", data={"competition": "Future Cup", "spots": "10"})
+
+        assert provider.get_leaderboard() is leaderboard
+        data = client.get("/points").data.decode()
+        assert data.find("Gamma") < data.find("Alpha") < data.find("Beta")
+
+    def test_summary_shows_rank(self, client):
+        with client.session_transaction() as sess:
+            sess["club"] = CLUBS[0]["email"]
+
+        assert b"points board</a>: 3" in client.get("/summary").data
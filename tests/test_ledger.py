@@ -0,0 +1,169 @@
+"""
+Tests for the booking ledger
+
+Every booking is recorded per club, with running totals per (club,
+competition) so the 12-spot limit covers all of a club's bookings.
+
+These tests verify:
+- Totals and histories are kept up to date, duplicates are skipped by id
+- The ledger survives a restart and a compaction without double counting
+- The booking form and the JSON API enforce the cumulative limit
+- A club's booking history is served at GET /api/bookings
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+import provider
+from ledger import Ledger
+from records import Booking
+from server import app
+
+FUTURE = "2030-01-01 10:00:00"
+
+
+def _booking(club, competition, spots, id=None):
+    return Booking(club, competition, spots, datetime(2030, 1, 1), id)
+
+
+@pytest.fixture
+def folder_data():
+    """One club and one future competition."""
+    return (
+        [{"name": "Ledger Club", "email": "ledger@club.com", "points": "100"}],
+        [{"name": "Ledger Cup", "date": FUTURE, "spotsAvailable": "200"}],
+    )
+
+
+@pytest.fixture
+def client(use_data):
+    """A client logged in as a club with plenty of points."""
+    use_data(
+        clubs=[{"name": "Ledger Club", "email": "ledger@club.com", "points": "100"}],
+        competitions=[{"name": "Ledger Cup", "date": FUTURE, "spotsAvailable": "200"}],
+    )
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["club"] = "ledger@club.com"
+        yield client
+
+
+def _book(spots):
+    club = provider.get_clubs()[0]
+    provider.record_booking(club, provider.get_competitions()[0], spots)
+    return club
+
+
+def _reload():
+    provider.close_journal()
+    provider.invalidate_cache()
+
+
+class TestLedger:
+    """Tests for the in-memory ledger."""
+
+    def test_totals_and_history(self):
+        ledger = Ledger([_booking("a", "Cup", 2), _booking("b", "Cup", 5)])
+        ledger.add(_booking("a", "Cup", 3))
+        ledger.add(_booking("a", "Open", 1))
+
+        assert ledger.booked("a", "Cup") == 5
+        assert ledger.booked("a", "Trophy") == 0
+        assert [b.spots for b in ledger.history("a")] == [2, 3, 1]
+        assert len(ledger) == 4
+
+    def test_duplicate_ids_skipped(self):
+        ledger = Ledger()
+
+        assert ledger.add(_booking("a", "Cup", 2, id="x")) is True
+        assert ledger.add(_booking("a", "Cup", 2, id="x")) is False
+        assert ledger.booked("a", "Cup") == 2
+
+    def test_remove(self):
+        booking = _booking("a", "Cup", 2, id="x")
+        ledger = Ledger([booking])
+        ledger.remove(booking)
+
+        assert ledger.booked("a", "Cup") == 0
+        assert ledger.history("a") == []
+        assert ledger.add(booking) is True
+
+
+class TestLedgerPersistence:
+    """Tests for the JSON backend's ledger on disk."""
+
+    def test_survives_restart(self, data_folder):
+        _book(2)
+        _book(3)
+        _reload()
+
+        club = provider.get_clubs()[0]
+        assert provider.booked_spots(club, provider.get_competitions()[0]) == 5
+        assert [b.spots for b in provider.club_bookings(club)] == [2, 3]
+
+    def test_survives_compaction(self, data_folder):
+        _book(2)
+        assert provider.compact_journal() is True
+        _book(1)
+        _reload()
+
+        club = provider.get_clubs()[0]
+        snapshot = json.loads((data_folder / provider.LEDGER_FILE).read_text())
+        assert [entry["spots"] for entry in snapshot["bookings"]] == [2]
+        assert provider.booked_spots(club, provider.get_competitions()[0]) == 3
+
+    def test_interrupted_compaction_not_counted_twice(self, data_folder):
+        """Bookings in both the snapshot and a leftover journal are counted once."""
+        _book(2)
+        journal = data_folder / provider.JOURNAL_FILE
+        leftover = journal.read_bytes()
+        assert provider.compact_journal() is True
+        # As if the compaction died before deleting the rotated journal
+        (data_folder / (provider.JOURNAL_FILE + ".compacting")).write_bytes(leftover)
+        _reload()
+
+        club = provider.get_clubs()[0]
+        assert provider.booked_spots(club, provider.get_competitions()[0]) == 2
+
+
+class TestCumulativeLimit:
+    """Tests for the limit across several bookings."""
+
+    def test_form_rejects_thirteenth_spot(self, client):
+        client.post("/book", data={"competition": "Ledger Cup", "spots": "12"})
+        response = client.post("/book", data={"competition": "Ledger Cup", "spots": "1"})
+
+        assert "more than 12 spots" in response.data.decode()
+        assert provider.get_clubs()[0].points == 88
+
+    def test_api_counts_earlier_bookings(self, client):
+        client.post("/book", data={"competition": "Ledger Cup", "spots": "10"})
+        response = client.post("/api/bookings", json=[{"competition": "Ledger Cup", "spots": 3}])
+
+        assert response.status_code == 422
+        assert response.get_json()["results"][0]["reason"] == "too_many_spots"
+
+    def test_booking_page_shows_booked_spots(self, client):
+        client.post("/book", data={"competition": "Ledger Cup", "spots": "4"})
+
+        assert "You have booked 4 of the 12 spots" in client.get("/book/Ledger Cup").data.decode()
+
+
+class TestHistoryApi:
+    """Tests for GET /api/bookings."""
+
+    def test_history(self, client):
+        client.post("/book", data={"competition": "Ledger Cup", "spots": "2"})
+        client.post("/api/bookings", json=[{"competition": "Ledger Cup", "spots": 3}])
+
+        payload = client.get("/api/bookings").get_json()
+
+        assert [item["spots"] for item in payload["items"]] == [2, 3]
+        assert payload["totals"] == {"Ledger Cup": 5}
+
+    def test_requires_login(self):
+        with app.test_client() as client:
+            assert client.get("/api/bookings").status_code == 401
@@ -0,0 +1,65 @@
+"""
+Tests for the load-testing harness
+
+These tests verify:
+- The generator writes valid data files of the requested sizes
+- The driver exercises every route and reports throughput and percentiles
+- Reports are written as JSON and text
+"""
+
+import json
+
+import pytest
+
+import loadtest
+import provider
+
+
+@pytest.fixture
+def generated(tmp_path, monkeypatch):
+    """A small generated dataset served by the JSON backend."""
+    monkeypatch.setattr(provider, "_backend", provider.JsonBackend())
+    monkeypatch.setattr(provider, "DATA_FOLDER", provider.DATA_FOLDER)
+    return loadtest.generate(tmp_path / "data", clubs=200, competitions=30, seed=1)
+
+
+class TestGenerator:
+    """Tests for the synthetic data generator."""
+
+    def test_sizes_and_unique_keys(self, generated):
+        clubs = json.loads((generated / "clubs.json").read_text())["clubs"]
+        competitions = json.loads((generated / "competitions.json").read_text())["competitions"]
+
+        assert len(clubs) == 200
+        assert len({club["email"] for club in clubs}) == 200
+        assert len({competition["name"] for competition in competitions}) == 30
+
+    def test_same_seed_same_data(self, tmp_path, generated):
+        again = loadtest.generate(tmp_path / "again", clubs=200, competitions=30, seed=1)
+
+        assert (again / "clubs.json").read_text() == (generated / "clubs.json").read_text()
+
+
+class TestDriver:
+    """Tests for the load driver and its report."""
+
+    def test_run_reports_every_route(self, generated, tmp_path):
+        report = loadtest.run(generated, workers=2, duration=30, max_requests=40)
+
+        assert report["clubs"] == 200
+        assert set(report["routes"]) == {"login", "summary", "book", "points"}
+        assert sum(row["count"] for row in report["routes"].values()) == 80
+        for row in report["routes"].values():
+            assert row["errors"] == 0
+            assert row["p50"] <= row["p95"] <= row["p99"]
+
+        json_path, text_path = loadtest.write_report(report, tmp_path / "outputs")
+        assert json.loads(json_path.read_text()) == report
+        assert "p99 ms" in text_path.read_text()
+
+    def test_percentile_nearest_rank(self):
+        ordered = list(range(1, 101))
+
+        assert loadtest._percentile(ordered, 0.50) == 50
+        assert loadtest._percentile(ordered, 0.99) == 99
+        assert loadtest._percentile([7], 0.95) == 7
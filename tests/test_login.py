@@ -19,13 +19,13 @@ def client():
 
 
 @pytest.fixture
-def mock_clubs_data(monkeypatch):
+def mock_clubs_data(use_data):
     """Mock the get_clubs function to return a small fixture list."""
     def _mock_get_clubs():
         return [
             {"name": "Test Club", "email": "valid@test.com", "points": "10"},
         ]
-    monkeypatch.setattr("server.get_clubs", _mock_get_clubs)
+    use_data(clubs=_mock_get_clubs())
 
 
 class TestLoginValidEmail:
@@ -0,0 +1,111 @@
+"""
+Tests for the club-by-email and competition-by-name indexes
+
+These tests verify:
+- Email lookups are case-insensitive and ignore surrounding spaces
+- Lookups return None on a miss instead of raising
+- The index is reused while the provider hands out the same list
+- Routes answer cleanly for unknown competitions
+"""
+
+import pytest
+
+import provider
+from records import Club
+from server import app
+
+
+@pytest.fixture
+def client():
+    """Create a test client for the Flask app."""
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+
+CLUBS = [
+    {"name": "Simply Lift", "email": "john@simplylift.co", "points": "13"},
+    {"name": "Iron Temple", "email": "admin@irontemple.com", "points": "4"},
+]
+
+COMPETITIONS = [
+    {"name": "Spring Festival", "date": "2030-03-27 10:00:00", "spotsAvailable": "25"},
+]
+
+
+@pytest.fixture
+def lookup_data(use_data):
+    """Serve the lookup fixtures from an in-memory backend."""
+    return use_data(clubs=CLUBS, competitions=COMPETITIONS)
+
+
+class TestIndexLookups:
+    """Tests for the provider lookup functions."""
+
+    def test_email_lookup_is_normalized(self, lookup_data):
+        """Case and surrounding whitespace should not matter."""
+        club = provider.find_club_by_email("  John@SimplyLift.CO ")
+        assert club.name == "Simply Lift"
+
+    def test_email_lookup_miss_returns_none(self, lookup_data):
+        """An unknown email should return None."""
+        assert provider.find_club_by_email("nobody@nowhere.com") is None
+
+    def test_competition_lookup(self, lookup_data):
+        """A competition should be found by its exact name."""
+        assert provider.find_competition_by_name("Spring Festival").spots_available == 25
+
+    def test_competition_lookup_miss_returns_none(self, lookup_data):
+        """An unknown competition should return None."""
+        assert provider.find_competition_by_name("Winter Cup") is None
+
+    def test_index_reused_for_same_list(self):
+        """The JSON store index should only be built once per list object."""
+        clubs = [Club.from_dict(club) for club in CLUBS]
+        first = provider._index_for(clubs, "email", provider.normalize_email)
+        second = provider._index_for(clubs, "email", provider.normalize_email)
+        assert first is second
+
+    def test_index_rebuilt_for_new_list(self):
+        """A new list (e.g. after a reload) should get a fresh index."""
+        provider._index_for([Club.from_dict(club) for club in CLUBS], "email",
+                            provider.normalize_email)
+        reloaded = [Club.from_dict(CLUBS[1])]
+        index = provider._index_for(reloaded, "email", provider.normalize_email)
+        assert index == {"admin@irontemple.com": reloaded[0]}
+
+
+class TestRouteLookups:
+    """Tests for routes using the indexes."""
+
+    def test_login_with_mixed_case_email(self, client, lookup_data):
+        """Login should accept the email whatever its case."""
+        response = client.post(
+            "/login",
+            data={"email": "JOHN@simplylift.co"},
+            follow_redirects=True
+        )
+        assert response.status_code == 200
+        assert b"john@simplylift.co" in response.data
+
+    def test_book_unknown_competition_redirects(self, client):
+        """Opening the booking page of an unknown competition should not crash."""
+        with client.session_transaction() as sess:
+            sess["club"] = CLUBS[0]["email"]
+
+        response = client.get("/book/Unknown%20Cup")
+
+        assert response.status_code == 302
+
+    def test_book_spots_unknown_competition_returns_404(self, client):
+        """Booking an unknown competition should return 404 with an error."""
+        with client.session_transaction() as sess:
+            sess["club"] = CLUBS[0]["email"]
+
+        response = client.post(
+            "/book",
+            data={"competition": "Unknown Cup", "spots": "1"},
+        )
+
+        assert response.status_code == 404
+        assert b"not found" in response.data.lower()
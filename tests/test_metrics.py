@@ -0,0 +1,126 @@
+"""
+Tests for the /metrics endpoint and request instrumentation
+
+These tests verify:
+- Counters and histograms render in the Prometheus text format
+- Requests are timed per endpoint and counted by status
+- Template rendering, data loading and lookups have their own timers
+- Booking outcomes are counted for the form and the JSON API
+"""
+
+import pytest
+
+import metrics
+import provider
+from metrics import Registry
+from server import app
+
+
+@pytest.fixture
+def client(use_data):
+    """Create a logged-in test client with one future competition."""
+    use_data(competitions=[
+        {"name": "Future Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": "20"},
+        {"name": "Past Cup", "date": "2020-01-01 10:00:00", "spotsAvailable": "20"},
+    ])
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["club"] = "john@simplylift.co"
+        yield client
+
+
+def _sample(text, line_start):
+    """Value of the first sample line of 'text' starting with 'line_start'."""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+class TestRegistry:
+    """Tests for the text format."""
+
+    def test_counter_and_histogram_format(self):
+        registry = Registry()
+        counter = registry.counter("hits_total", "Hits", ("path",))
+        histogram = registry.histogram("wait_seconds", "Waits", buckets=(0.1, 1.0))
+        counter.inc('/a"b')
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        assert registry.render().splitlines() == [
+            "# HELP hits_total Hits",
+            "# TYPE hits_total counter",
+            'hits_total{path="/a\\"b"} 1',
+            "# HELP wait_seconds Waits",
+            "# TYPE wait_seconds histogram",
+            'wait_seconds_bucket{le="0.1"} 1',
+            'wait_seconds_bucket{le="1.0"} 2',
+            'wait_seconds_bucket{le="+Inf"} 3',
+            "wait_seconds_sum 5.55",
+            "wait_seconds_count 3",
+        ]
+
+    def test_collectors_run_at_scrape_time(self):
+        registry = Registry()
+        values = [1]
+        registry.collector(lambda: [("size", "gauge", "Size", [({}, values[0])])])
+        values[0] = 7
+
+        assert "size 7" in registry.render()
+
+
+class TestInstrumentation:
+    """Tests for the metrics recorded by the app."""
+
+    def test_requests_counted_by_status(self, client):
+        before = metrics.requests_total.value("summary", "GET", "200")
+        client.get("/summary")
+        client.get("/summary")
+
+        text = client.get("/metrics").data.decode()
+
+        assert metrics.requests_total.value("summary", "GET", "200") == before + 2
+        assert 'gudlft_request_duration_seconds_count{endpoint="summary"}' in text
+
+    def test_metrics_content_type(self, client):
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.mimetype == "text/plain"
+
+    def test_render_and_lookup_timers(self, client):
+        welcome = metrics.render_duration.count("welcome.html")
+        lookups = metrics.lookup_duration.count("club")
+
+        client.get("/summary")
+
+        assert metrics.render_duration.count("welcome.html") == welcome + 1
+        assert metrics.lookup_duration.count("club") > lookups
+
+    def test_data_load_timer(self, isolated_data_folder, monkeypatch):
+        monkeypatch.setattr(provider, "_backend", provider.JsonBackend())
+        loads = metrics.data_load_duration.count("clubs")
+
+        provider.get_clubs()
+        provider.get_clubs()
+
+        assert metrics.data_load_duration.count("clubs") == loads + 1
+
+    def test_booking_outcomes(self, client):
+        outcomes = ("booked", "past_competition", "too_many_spots", "unknown_competition")
+        before = {outcome: metrics.bookings_total.value(outcome) for outcome in outcomes}
+
+        client.post("/book", data={"competition": "Future Cup", "spots": "1"})
+        client.post("/book", data={"competition": "Past Cup", "spots": "1"})
+        client.post("/book", data={"competition": "Nowhere", "spots": "1"})
+        client.post("/api/bookings", json=[{"competition": "Future Cup", "spots": 13}])
+
+        after = {outcome: metrics.bookings_total.value(outcome) for outcome in outcomes}
+        assert {outcome: after[outcome] - before[outcome] for outcome in outcomes} == {
+            "booked": 1, "past_competition": 1, "too_many_spots": 1, "unknown_competition": 1,
+        }
+        text = client.get("/metrics").data.decode()
+        assert _sample(text, 'gudlft_bookings_total{outcome="booked"}') >= 1
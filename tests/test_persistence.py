@@ -0,0 +1,129 @@
+"""
+Tests for durable booking persistence
+
+Bookings are appended to an fsync'd journal, replayed on top of the JSON
+snapshots when data is loaded, and compacted into new snapshots.
+
+These tests verify:
+- A booking survives a reload of the data, a batch as a single entry
+- Concurrent bookings share fsync calls (group commit)
+- Compaction rewrites the snapshots and empties the journal
+- A torn trailing journal line is ignored, and cut off before the next booking
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+import provider
+
+
+@pytest.fixture
+def folder_data():
+    """A rich club and a future competition."""
+    return (
+        [{"name": "Journal Club", "email": "journal@club.com", "points": "100"}],
+        [{"name": "Journal Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": "200"}],
+    )
+
+
+def _book(spots):
+    """Book 'spots' for the only club in the only competition."""
+    club = provider.get_clubs()[0]
+    competition = provider.get_competitions()[0]
+    provider.record_booking(club, competition, spots)
+
+
+def _reload():
+    """Forget everything in memory, as after a restart."""
+    provider.close_journal()
+    provider.invalidate_cache()
+
+
+class TestJournal:
+    """Tests for the booking journal."""
+
+    def test_booking_survives_reload(self, data_folder):
+        """A booking should be replayed from the journal after a restart."""
+        _book(3)
+        _reload()
+
+        assert provider.get_clubs()[0].points == 97
+        assert provider.get_competitions()[0].spots_available == 197
+
+    def test_batch_survives_reload(self, data_folder):
+        """A batch of bookings should be journaled as one entry and replayed."""
+        club = provider.get_clubs()[0]
+        competition = provider.get_competitions()[0]
+        provider.record_bookings(club, [(competition, 2), (competition, 5)])
+        _reload()
+
+        assert provider.get_clubs()[0].points == 93
+        assert provider.get_competitions()[0].spots_available == 193
+        journal = (data_folder / provider.JOURNAL_FILE).read_text().splitlines()
+        assert len(journal) == 1
+
+    def test_concurrent_bookings_share_fsync(self, data_folder, monkeypatch):
+        """Concurrent bookings should be committed with fewer fsyncs than bookings."""
+        real_fsync = provider.os.fsync
+        calls = []
+
+        def _slow_fsync(fd):
+            calls.append(fd)
+            time.sleep(0.01)
+            real_fsync(fd)
+
+        monkeypatch.setattr(provider.os, "fsync", _slow_fsync)
+        threads = [threading.Thread(target=_book, args=(1,)) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) < 20
+        _reload()
+        assert provider.get_clubs()[0].points == 80
+        assert provider.get_competitions()[0].spots_available == 180
+
+    def test_compaction_rewrites_snapshots(self, data_folder):
+        """Compaction should fold the journal into the JSON snapshots."""
+        _book(2)
+        _book(5)
+
+        assert provider.compact_journal() is True
+
+        snapshot = json.loads((data_folder / "clubs.json").read_text())
+        assert snapshot["clubs"][0]["points"] == "93"
+        assert (data_folder / provider.JOURNAL_FILE).stat().st_size == 0
+        assert not (data_folder / (provider.JOURNAL_FILE + ".compacting")).exists()
+        _reload()
+        assert provider.get_competitions()[0].spots_available == 193
+
+    def test_compaction_without_bookings_is_a_noop(self, data_folder):
+        """Nothing should be rewritten when the journal is empty."""
+        assert provider.compact_journal() is False
+
+    def test_torn_trailing_line_is_ignored(self, data_folder):
+        """A partially written last entry should not break loading."""
+        _book(4)
+        with open(data_folder / provider.JOURNAL_FILE, "a") as fp:
+            fp.write('{"club": "journal@club.com", "poi')
+        _reload()
+
+        assert provider.get_clubs()[0].points == 96
+
+    def test_torn_trailing_line_is_cut_before_appending(self, data_folder):
+        """A booking made after a torn line should not be appended to it."""
+        _book(4)
+        _reload()
+        with open(data_folder / provider.JOURNAL_FILE, "a") as fp:
+            fp.write('{"club": "journal@club.com", "poi')
+        _book(1)
+        _reload()
+
+        assert provider.get_clubs()[0].points == 95
+        lines = (data_folder / provider.JOURNAL_FILE).read_text().splitlines()
+        assert len(lines) == 2
+        assert all(json.loads(line) for line in lines)
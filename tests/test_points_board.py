@@ -23,7 +23,7 @@ def client():
 
 
 @pytest.fixture
-def mock_clubs_for_board(monkeypatch):
+def mock_clubs_for_board(use_data):
     """Mock clubs data for points board tests."""
     def _mock_get_clubs():
         return [
@@ -31,7 +31,7 @@ def mock_clubs_for_board(monkeypatch):
             {"name": "Beta", "email": "b@beta.com", "points": "12"},
         ]
 
-    monkeypatch.setattr("server.get_clubs", _mock_get_clubs)
+    use_data(clubs=_mock_get_clubs())
 
 
 class TestPointsBoard:
@@ -0,0 +1,116 @@
+"""
+Tests for request profiling and the slow-request log
+
+These tests verify:
+- The middleware does nothing until it is configured
+- Sampled requests are saved as cProfile files
+- Slow requests are logged with their route, arguments and stage timings
+- Slow-only profiling keeps the profiles of slow requests only
+- Old profiles are pruned beyond the configured count
+"""
+
+import json
+import pstats
+
+import pytest
+
+import metrics
+from profiling import SLOW_LOG_NAME, prune_profiles
+from server import app
+
+SETTINGS = ("PROFILE_SAMPLE_RATE", "SLOW_REQUEST_SECONDS", "PROFILE_SLOW_REQUESTS",
+            "PROFILE_FOLDER", "PROFILE_MAX_FILES")
+
+
+@pytest.fixture
+def profiled(use_data, tmp_path):
+    """A logged-in client with profiling writing to a temporary folder."""
+    use_data(competitions=[
+        {"name": "Future Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": "20"},
+    ])
+    saved = {name: app.config[name] for name in SETTINGS}
+    app.config.update(TESTING=True, PROFILE_FOLDER=str(tmp_path / "profiling"))
+    with app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess["club"] = "john@simplylift.co"
+        yield client, tmp_path / "profiling"
+    app.config.update(saved)
+
+
+def _log(folder):
+    return [json.loads(line) for line in (folder / SLOW_LOG_NAME).read_text().splitlines()]
+
+
+class TestProfiling:
+    """Tests for the profiling middleware."""
+
+    def test_idle_by_default(self, profiled):
+        client, folder = profiled
+
+        assert client.get("/summary").status_code == 200
+        assert not folder.exists()
+
+    def test_sampled_request_is_profiled(self, profiled):
+        client, folder = profiled
+        app.config["PROFILE_SAMPLE_RATE"] = 1.0
+
+        client.get("/summary")
+
+        (profile,) = folder.glob("*.prof")
+        assert "summary" in profile.name
+        assert pstats.Stats(str(profile)).total_calls > 0
+        assert not (folder / SLOW_LOG_NAME).exists()
+
+    def test_slow_request_logged_with_stages(self, profiled):
+        client, folder = profiled
+        app.config["SLOW_REQUEST_SECONDS"] = 0
+
+        client.get("/summary?page=1")
+        client.get("/nowhere")
+
+        summary, unmatched = _log(folder)
+        assert summary["endpoint"] == "summary"
+        assert summary["args"] == {"page": "1"}
+        assert summary["status"] == 200
+        assert summary["profile"] is None
+        assert {"lookup", "render"} <= set(summary["stages"])
+        assert unmatched["endpoint"] == "unmatched"
+        assert unmatched["status"] == 404
+
+    def test_slow_only_profiles(self, profiled):
+        client, folder = profiled
+        app.config.update(PROFILE_SLOW_REQUESTS=True, SLOW_REQUEST_SECONDS=60)
+
+        client.get("/summary")
+        assert not folder.exists()
+
+        app.config["SLOW_REQUEST_SECONDS"] = 0
+        client.get("/summary")
+        (record,) = _log(folder)
+        assert (folder / record["profile"]).exists()
+
+    def test_profiles_are_pruned(self, profiled):
+        client, folder = profiled
+        app.config.update(PROFILE_SAMPLE_RATE=1.0, PROFILE_MAX_FILES=2)
+
+        for _ in range(4):
+            client.get("/summary")
+
+        assert len(list(folder.glob("*.prof"))) == 2
+
+
+class TestStages:
+    """Tests for per-thread stage timings."""
+
+    def test_track_stages(self):
+        with metrics.track_stages() as stages:
+            with metrics.lookup_duration.time("club"):
+                pass
+            metrics.render_duration.observe(0.5, "page.html")
+        metrics.render_duration.observe(0.5, "page.html")
+
+        assert set(stages) == {"lookup", "render"}
+        assert stages["render"] == 0.5
+
+    def test_prune_missing_folder(self, tmp_path):
+        assert prune_profiles(tmp_path / "missing", 1) == 0
@@ -0,0 +1,101 @@
+"""
+Tests for the data provider cache
+
+The provider keeps parsed JSON data in memory and only re-reads a file
+when its mtime/size stamp changes.
+
+These tests verify:
+- Repeated loads are served from the cache (no file re-read)
+- A modified file is picked up on revalidation
+- Explicit invalidation forces a reload
+- The cache counters, refreshes included, can be reset
+"""
+
+import json
+import os
+
+import pytest
+
+import provider
+
+
+@pytest.fixture
+def folder_data():
+    """One club and one future competition."""
+    return (
+        [{"name": "Cache Club", "email": "cache@club.com", "points": "10"}],
+        [{"name": "Cache Cup", "date": "2030-01-01 10:00:00", "spotsAvailable": "5"}],
+    )
+
+
+def _rewrite_clubs(folder, clubs):
+    """Rewrite clubs.json and move its mtime forward so the stamp changes."""
+    path = folder / "clubs.json"
+    path.write_text(json.dumps({"clubs": clubs}))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+class TestProviderCache:
+    """Tests for the process-level data cache."""
+
+    def test_second_load_is_a_cache_hit(self, data_folder):
+        """Loading the same dataset twice should parse the file only once."""
+        first = provider.get_clubs()
+        second = provider.get_clubs()
+
+        assert first is second
+        info = provider.cache_info()
+        assert info["misses"] == 1
+        assert info["hits"] == 1
+
+    def test_steady_state_does_not_touch_disk(self, data_folder, monkeypatch):
+        """Within the revalidation window no file access should happen."""
+        provider.get_clubs()
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("disk access on a cache hit")
+
+        monkeypatch.setattr(provider.os, "stat", _fail)
+        monkeypatch.setattr("builtins.open", _fail)
+
+        assert provider.get_clubs()[0].name == "Cache Club"
+
+    def test_modified_file_is_reloaded(self, data_folder, monkeypatch):
+        """A changed mtime/size stamp should trigger a reload."""
+        provider.get_clubs()
+        _rewrite_clubs(data_folder, [
+            {"name": "New Club", "email": "new@club.com", "points": "3"},
+        ])
+        monkeypatch.setattr(provider, "CACHE_REVALIDATE_SECONDS", 0)
+
+        clubs = provider.get_clubs()
+
+        assert clubs[0].name == "New Club"
+        assert provider.cache_info()["misses"] == 2
+
+    def test_unmodified_file_is_revalidated_without_reload(self, data_folder, monkeypatch):
+        """An unchanged stamp should keep serving the cached data."""
+        first = provider.get_clubs()
+        monkeypatch.setattr(provider, "CACHE_REVALIDATE_SECONDS", 0)
+
+        assert provider.get_clubs() is first
+        assert provider.cache_info()["misses"] == 1
+
+    def test_reset_cache_stats(self, data_folder):
+        provider.get_clubs()
+        provider.get_clubs()
+        provider.reset_cache_stats()
+
+        assert provider.cache_info() == {"hits": 0, "misses": 0, "refreshes": 0, "size": 1}
+
+    def test_invalidate_forces_reload(self, data_folder):
+        """invalidate_cache() should drop the cached copy of a file."""
+        provider.get_clubs()
+        provider.get_competitions()
+
+        provider.invalidate_cache("clubs.json")
+
+        assert provider.cache_info()["size"] == 1
+        provider.get_clubs()
+        assert provider.cache_info()["misses"] == 3
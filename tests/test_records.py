@@ -0,0 +1,69 @@
+"""
+Tests for the Club and Competition record types
+
+Records are built once at load time, with numbers as ints and the
+competition date parsed, and written back in the JSON files' shape.
+
+These tests verify:
+- Records round-trip through their JSON shape
+- Invalid point values load as zero
+- Records are slotted (no per-instance dict)
+- Snapshots written by a compaction keep the original string format
+"""
+
+import json
+import sys
+from datetime import datetime
+
+import provider
+from records import Booking, Club, Competition
+
+CLUB = {"name": "Simply Lift", "email": "john@simplylift.co", "points": "13"}
+COMPETITION = {"name": "Spring Festival", "date": "2030-03-27 10:00:00", "spotsAvailable": "25"}
+
+
+class TestRecords:
+    """Tests for building and serializing records."""
+
+    def test_parsed_once(self):
+        club = Club.from_dict(CLUB)
+        competition = Competition.from_dict(COMPETITION)
+
+        assert club.points == 13
+        assert competition.date == datetime(2030, 3, 27, 10)
+        assert competition.spots_available == 25
+
+    def test_round_trip(self):
+        assert Club.from_dict(CLUB).to_dict() == CLUB
+        assert Competition.from_dict(COMPETITION).to_dict() == COMPETITION
+
+    def test_booking_round_trip(self):
+        booking = Booking.new("john@simplylift.co", "Spring Festival", 2)
+
+        assert Booking.from_dict(booking.to_dict()) == booking
+        assert booking.id != Booking.new("john@simplylift.co", "Spring Festival", 2).id
+
+    def test_invalid_points_load_as_zero(self):
+        assert Club.from_dict({**CLUB, "points": "oops"}).points == 0
+
+    def test_slotted(self):
+        club = Club.from_dict(CLUB)
+
+        assert not hasattr(club, "__dict__")
+        assert sys.getsizeof(club) < sys.getsizeof(dict(CLUB))
+
+
+class TestSnapshotFormat:
+    """Tests for what is written back to the data files."""
+
+    def test_compaction_writes_json_shape(self, isolated_data_folder, monkeypatch):
+        monkeypatch.setattr(provider, "_backend", provider.JsonBackend())
+        club = provider.find_club_by_email("john@simplylift.co")
+        competition = provider.get_competitions()[0]
+        provider.record_booking(club, competition, 1)
+
+        assert provider.compact_journal() is True
+
+        snapshot = json.loads((isolated_data_folder / "clubs.json").read_text())
+        written = next(c for c in snapshot["clubs"] if c["email"] == "john@simplylift.co")
+        assert written["points"] == str(club.points)
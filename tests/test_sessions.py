@@ -0,0 +1,156 @@
+"""
+Tests for server-side sessions
+
+The cookie only carries a signed session id; the session itself (the
+club's key and flash messages) lives in a server-side store.
+
+These tests verify:
+- The cookie holds no club data and is not re-sent on every response
+- Pages show the club's live points, not a copy taken at login
+- A tampered cookie starts a fresh, logged-out session
+- Logging in moves the session to a new id and deletes the old one
+- The memory store expires idle sessions and evicts the least recently used
+- The SQLite store shares sessions between workers
+"""
+
+import pytest
+
+import provider
+import sessions
+from server import app
+from sessions import MemorySessionStore, SqliteSessionStore
+
+
+@pytest.fixture
+def client():
+    """Create a test client for the Flask app."""
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+
+def _session_cookie(client):
+    return client.get_cookie(app.config["SESSION_COOKIE_NAME"])
+
+
+class TestSessionCookie:
+    """Tests for what travels in the cookie."""
+
+    def test_cookie_holds_only_signed_id(self, client):
+        client.post("/login", data={"email": "john@simplylift.co"})
+        cookie = _session_cookie(client)
+
+        assert cookie is not None
+        assert "simplylift" not in cookie.value
+        assert len(cookie.value) < 100
+
+    def test_cookie_not_resent(self, client):
+        response = client.post("/login", data={"email": "john@simplylift.co"})
+        assert "Set-Cookie" in response.headers
+
+        response = client.get("/summary")
+
+        assert response.status_code == 200
+        assert "Set-Cookie" not in response.headers
+
+    def test_tampered_cookie_is_logged_out(self, client):
+        client.post("/login", data={"email": "john@simplylift.co"})
+        cookie = _session_cookie(client)
+        client.set_cookie(cookie.key, cookie.value[:-2] + "xx")
+
+        response = client.get("/summary")
+
+        assert response.status_code == 302
+
+    def test_login_replaces_session_id(self, client):
+        """An id set before login (session fixation) should not be logged in."""
+        client.get("/")
+        with client.session_transaction() as sess:
+            sess["_flashes"] = [("message", "Hi")]
+        planted = _session_cookie(client).value
+        store = app.session_interface.store
+        old_sid = app.session_interface._signer(app).unsign(planted).decode()
+
+        response = client.post("/login", data={"email": "john@simplylift.co"})
+
+        assert "Set-Cookie" in response.headers
+        assert _session_cookie(client).value != planted
+        assert store.get(old_sid) is None
+        client.set_cookie(app.config["SESSION_COOKIE_NAME"], planted)
+        assert client.get("/summary").status_code == 302
+
+    def test_logout_forgets_club(self, client):
+        client.post("/login", data={"email": "john@simplylift.co"})
+        client.get("/logout")
+
+        assert client.get("/summary").status_code == 302
+
+
+class TestLiveClub:
+    """Tests for resolving the club through the provider."""
+
+    def test_points_are_live(self, client):
+        client.post("/login", data={"email": "john@simplylift.co"})
+        provider.find_club_by_email("john@simplylift.co").points = 3
+
+        response = client.get("/summary")
+
+        assert b"Points available: 3" in response.data
+
+    def test_session_stores_club_key(self, client):
+        client.post("/login", data={"email": " John@SimplyLift.co"})
+
+        with client.session_transaction() as sess:
+            assert sess["club"] == "john@simplylift.co"
+
+
+class TestMemorySessionStore:
+    """Tests for the in-memory store."""
+
+    def test_idle_sessions_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(sessions.time, "monotonic", lambda: now[0])
+        store = MemorySessionStore(ttl=60)
+        store.set("a", {"club": "a@test.com"})
+
+        now[0] += 30
+        assert store.get("a") == {"club": "a@test.com"}
+        now[0] += 59
+        assert store.get("a") is not None
+        now[0] += 61
+        assert store.get("a") is None
+        assert len(store) == 0
+
+    def test_least_recently_used_evicted(self):
+        store = MemorySessionStore(ttl=60, max_entries=2)
+        store.set("a", {"n": 1})
+        store.set("b", {"n": 2})
+        store.get("a")
+        store.set("c", {"n": 3})
+
+        assert store.get("b") is None
+        assert store.get("a") == {"n": 1}
+        assert store.get("c") == {"n": 3}
+
+
+class TestSqliteSessionStore:
+    """Tests for the SQLite store."""
+
+    def test_shared_between_workers(self, tmp_path):
+        path = tmp_path / "sessions.sqlite3"
+        worker_a = SqliteSessionStore(path, ttl=60)
+        worker_b = SqliteSessionStore(path, ttl=60)
+
+        worker_a.set("sid", {"club": "a@test.com", "_flashes": [("message", "Hi")]})
+
+        assert worker_b.get("sid") == {"club": "a@test.com", "_flashes": [("message", "Hi")]}
+        worker_b.delete("sid")
+        assert worker_a.get("sid") is None
+
+    def test_expired_session_ignored(self, tmp_path, monkeypatch):
+        store = SqliteSessionStore(tmp_path / "sessions.sqlite3", ttl=60)
+        store.set("sid", {"club": "a@test.com"})
+        later = sessions.time.time() + 120
+        monkeypatch.setattr(sessions.time, "time", lambda: later)
+
+        assert store.get("sid") is None
@@ -0,0 +1,126 @@
+"""
+Tests for login throttling
+
+Login attempts take tokens from a per-IP and a per-email bucket; an empty
+bucket gets a plain 429 before any lookup or rendering.
+
+These tests verify:
+- Buckets allow a burst, then refill at their rate
+- Full buckets are purged and the memory store stays bounded
+- The SQLite store shares buckets between workers
+- Throttled logins get a cheap 429 with Retry-After, per IP and per email
+"""
+
+import pytest
+
+import metrics
+import server
+import throttle
+from throttle import MemoryBucketStore, SqliteBucketStore, create_login_throttle
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.monotonic()/time.time() for the bucket stores."""
+    now = [1000.0]
+    monkeypatch.setattr(throttle.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(throttle.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def strict_app():
+    """An app allowing 2 attempts per IP and 1 per email, then one a minute."""
+    app = server.create_app({
+        "TESTING": True,
+        "LOGIN_IP_BURST": 2,
+        "LOGIN_IP_PER_MINUTE": 1,
+        "LOGIN_EMAIL_BURST": 1,
+        "LOGIN_EMAIL_PER_MINUTE": 1,
+    })
+    return app
+
+
+def _login(app, email, ip="10.0.0.1"):
+    with app.test_client() as client:
+        return client.post("/login", data={"email": email}, environ_base={"REMOTE_ADDR": ip})
+
+
+class TestBuckets:
+    """Tests for the bucket stores."""
+
+    @pytest.mark.parametrize("kind", ["memory", "sqlite"])
+    def test_burst_then_refill(self, kind, clock, tmp_path):
+        store = MemoryBucketStore() if kind == "memory" else SqliteBucketStore(tmp_path / "t.db")
+
+        assert [store.take("k", 3, 0.5) for _ in range(3)] == [0, 0, 0]
+        assert store.take("k", 3, 0.5) == pytest.approx(2.0)
+        clock[0] += 2
+        assert store.take("k", 3, 0.5) == 0
+        assert store.take("k", 3, 0.5) > 0
+
+    def test_full_buckets_purged(self, clock, monkeypatch):
+        monkeypatch.setattr(MemoryBucketStore, "PURGE_EVERY", 3)
+        store = MemoryBucketStore()
+        store.take("a", 2, 1.0)
+        store.take("b", 2, 1.0)
+        clock[0] += 10
+        store.take("c", 2, 1.0)
+
+        assert len(store) == 1
+
+    def test_memory_store_bounded(self):
+        store = MemoryBucketStore(max_keys=2)
+        for key in "abc":
+            store.take(key, 5, 1.0)
+
+        assert len(store) == 2
+
+    def test_sqlite_store_shared(self, tmp_path, clock):
+        first = SqliteBucketStore(tmp_path / "t.db")
+        second = SqliteBucketStore(tmp_path / "t.db")
+
+        first.take("k", 1, 0.1)
+
+        assert second.take("k", 1, 0.1) > 0
+
+    def test_selection(self):
+        assert create_login_throttle({"LOGIN_THROTTLE": "off"}) is None
+        with pytest.raises(ValueError):
+            create_login_throttle({"LOGIN_THROTTLE": "redis"})
+
+
+class TestLoginThrottle:
+    """Tests for throttled logins."""
+
+    def test_ip_limit(self, strict_app, monkeypatch):
+        _login(strict_app, "a@test.com")
+        _login(strict_app, "b@test.com")
+        before = metrics.login_throttled_total.value("ip")
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("throttled login reached the provider or a template")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(server, "find_club_by_email", _fail)
+            patch.setattr(server, "render_template", _fail)
+            response = _login(strict_app, "c@test.com")
+
+        assert response.status_code == 429
+        assert response.mimetype == "text/plain"
+        assert int(response.headers["Retry-After"]) == 60
+        assert metrics.login_throttled_total.value("ip") == before + 1
+        # Other clients are not affected
+        assert _login(strict_app, "c@test.com", ip="10.0.0.2").status_code == 401
+
+    def test_email_limit_across_ips(self, strict_app):
+        assert _login(strict_app, "john@simplylift.co", ip="10.0.0.1").status_code == 302
+
+        response = _login(strict_app, " JOHN@simplylift.co", ip="10.0.0.2")
+
+        assert response.status_code == 429
+
+    def test_off(self):
+        app = server.create_app({"TESTING": True, "LOGIN_THROTTLE": "off", "LOGIN_IP_BURST": 1})
+
+        assert [_login(app, "x@test.com").status_code for _ in range(3)] == [401, 401, 401]
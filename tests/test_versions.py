@@ -0,0 +1,189 @@
+"""
+Tests for cache coherence between worker processes
+
+Workers share per-dataset version counters in a memory-mapped file: a
+booking bumps them, and the other workers reload their cached data when
+they see a counter move.
+
+These tests verify:
+- Counters are shared by every mapping of the file and increments are never lost
+- Bookings made by another process are applied from the journal entries
+  appended since, without re-reading the data files
+- A worker's own bookings do not make it reload
+- Booking records that another process made stale is refused as a conflict
+- A worker keeps journaling bookings after another one compacted, and only
+  one worker compacts at a time
+"""
+
+import multiprocessing
+
+import pytest
+
+import provider
+from versions import SharedVersions
+
+FUTURE = "2030-01-01 10:00:00"
+
+fork = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork()"
+)
+
+
+@pytest.fixture
+def folder_data():
+    """One club and one future competition."""
+    return (
+        [{"name": "Shared Club", "email": "shared@club.com", "points": "30"}],
+        [{"name": "Shared Cup", "date": FUTURE, "spotsAvailable": "20"}],
+    )
+
+
+def _book(spots):
+    club = provider.find_club_by_email("shared@club.com")
+    competition = provider.find_competition_by_name("Shared Cup")
+    return provider.record_booking(club, competition, spots)
+
+
+def _in_other_worker(target, *args):
+    """Run 'target' in a forked process, as another worker would"""
+    process = multiprocessing.get_context("fork").Process(target=target, args=args)
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+
+
+def _book_around_compaction(ready, compacted):
+    """Book with the journal open, let the parent compact, then book again"""
+    assert _book(2) is True
+    ready.set()
+    assert compacted.wait(10)
+    assert _book(3) is True
+
+
+def _hold_compaction_lock(ready, done):
+    with provider._locked(provider._COMPACTION_LOCK):
+        ready.set()
+        assert done.wait(10)
+
+
+def _while_in_other_worker(target, during):
+    """Run target(ready, go) in a forked process, and during() once it sets 'ready'"""
+    context = multiprocessing.get_context("fork")
+    ready, go = context.Event(), context.Event()
+    process = context.Process(target=target, args=(ready, go))
+    process.start()
+    try:
+        assert ready.wait(10)
+        during()
+    finally:
+        go.set()
+        process.join()
+    assert process.exitcode == 0
+
+
+def _bump_many(path, times):
+    versions = SharedVersions(path)
+    for _ in range(times):
+        versions.bump("clubs")
+
+
+class TestSharedVersions:
+    """Tests for the memory-mapped counters."""
+
+    def test_shared_between_mappings(self, tmp_path):
+        first = SharedVersions(tmp_path / "v.bin")
+        second = SharedVersions(tmp_path / "v.bin")
+
+        assert first.bump("clubs", "bookings") == [1, 1]
+        assert second.get("clubs") == 1
+        assert second.get("competitions") == 0
+        assert second.bump("clubs") == [2]
+        assert first.get("clubs") == 2
+
+    @fork
+    def test_no_increment_lost(self, tmp_path):
+        path = tmp_path / "v.bin"
+        processes = [
+            multiprocessing.get_context("fork").Process(target=_bump_many, args=(path, 200))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        _bump_many(path, 200)
+        for process in processes:
+            process.join()
+
+        assert SharedVersions(path).get("clubs") == 1000
+
+
+class TestCoherence:
+    """Tests for the JSON backend's caches across workers."""
+
+    @fork
+    def test_other_worker_booking_seen(self, data_folder):
+        provider.get_clubs()
+        provider.get_competitions()
+        provider.get_leaderboard()
+        info = provider.cache_info()
+
+        _in_other_worker(_book, 4)
+
+        club = provider.find_club_by_email("shared@club.com")
+        competition = provider.find_competition_by_name("Shared Cup")
+        assert club.points == 26
+        assert competition.spots_available == 16
+        assert provider.booked_spots(club, competition) == 4
+        assert provider.get_leaderboard().top(0, 1)[0]["points"] == 26
+        # Only the journal entries appended since were read
+        assert provider.cache_info()["misses"] == info["misses"]
+        assert provider.cache_info()["refreshes"] == info["refreshes"] + 2
+
+    def test_unchanged_data_not_reloaded(self, data_folder):
+        provider.get_clubs()
+        provider.get_competitions()
+        misses = provider.cache_info()["misses"]
+
+        assert _book(2) is True
+        provider.get_clubs()
+        provider.get_competitions()
+
+        assert provider.cache_info()["misses"] == misses
+        assert provider.find_club_by_email("shared@club.com").points == 28
+
+    @fork
+    def test_stale_records_refused(self, data_folder):
+        club = provider.find_club_by_email("shared@club.com")
+        competition = provider.find_competition_by_name("Shared Cup")
+
+        _in_other_worker(_book, 5)
+
+        assert provider.record_booking(club, competition, 1) is False
+        assert _book(1) is True
+        assert provider.find_competition_by_name("Shared Cup").spots_available == 14
+
+    @fork
+    def test_booking_after_other_worker_compacted(self, data_folder):
+        compacted = []
+        _while_in_other_worker(
+            _book_around_compaction, lambda: compacted.append(provider.compact_journal())
+        )
+        provider.close_journal()
+        provider.invalidate_cache()
+
+        assert compacted == [True]
+        club = provider.find_club_by_email("shared@club.com")
+        competition = provider.find_competition_by_name("Shared Cup")
+        assert club.points == 25
+        assert competition.spots_available == 15
+        assert provider.booked_spots(club, competition) == 5
+
+    @fork
+    def test_one_compaction_at_a_time(self, data_folder):
+        assert _book(1) is True
+        compacted = []
+        _while_in_other_worker(
+            _hold_compaction_lock, lambda: compacted.append(provider.compact_journal())
+        )
+
+        assert compacted == [False]
+        assert provider.compact_journal() is True
@@ -0,0 +1,180 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from provider import _data_path, normalize_email
+
+DEFAULT_SQLITE_FILE = "throttle.sqlite3"
+
+
+class MemoryBucketStore:
+    """Token buckets in process memory, bounded and purged periodically
+
+    A bucket that has refilled completely behaves exactly like a missing
+    one, so buckets are dropped once full; at most 'max_keys' are kept,
+    the least recently used going first.
+    """
+
+    # Full buckets are dropped once every PURGE_EVERY takes
+    PURGE_EVERY = 1000
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> (tokens, updated, full_at)
+        self._buckets = OrderedDict()
+        self._takes = 0
+
+    def take(self, key, capacity, rate):
+        """Take a token from bucket 'key'; return 0, or the seconds until one is back
+
+        Buckets start with 'capacity' tokens and regain 'rate' per second.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._takes += 1
+            if self._takes % self.PURGE_EVERY == 0:
+                self._purge(now)
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens < 1:
+                return (1 - tokens) / rate
+            tokens -= 1
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0
+
+    def _purge(self, now):
+        """Drop full buckets (called with the lock held)"""
+        for key in [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def close(self):
+        """Nothing to release, buckets stay in memory"""
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SqliteBucketStore:
+    """Token buckets in a SQLite database shared by several worker processes"""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._takes = 0
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL,
+                full_at REAL NOT NULL
+            ) WITHOUT ROWID;
+        """)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, rate):
+        # Wall-clock time, the only clock shared by every worker
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(now - updated, 0) * rate)
+            if tokens < 1:
+                wait = (1 - tokens) / rate
+            else:
+                wait = 0
+                tokens -= 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated, full_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, tokens, now, now + (capacity - tokens) / rate),
+                )
+            self._takes += 1
+            if self._takes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return wait
+
+    def clear(self):
+        self._connection().execute("DELETE FROM buckets")
+
+    def close(self):
+        """Close the calling thread's connection; the next call opens a new one"""
+        conn = self._local.__dict__.pop("conn", None)
+        if conn is not None:
+            conn.close()
+
+
+class LoginThrottle:
+    """Per-IP and per-email token buckets for login attempts
+
+    Limits are (burst, attempts per minute). The IP bucket is checked
+    first, so a throttled client does not drain the buckets of the emails
+    it tries.
+    """
+
+    def __init__(self, store, ip_limit=(20, 20), email_limit=(5, 5)):
+        self.store = store
+        self.ip_limit = ip_limit
+        self.email_limit = email_limit
+
+    def check(self, ip, email):
+        """Return None if the attempt may go ahead, else ("ip" or "email", retry after)"""
+        burst, per_minute = self.ip_limit
+        wait = self.store.take(f"ip:{ip}", burst, per_minute / 60)
+        if wait:
+            return "ip", wait
+        if email:
+            burst, per_minute = self.email_limit
+            wait = self.store.take(f"email:{normalize_email(email)}", burst, per_minute / 60)
+            if wait:
+                return "email", wait
+        return None
+
+
+def create_login_throttle(config):
+    """Login throttle for config["LOGIN_THROTTLE"]: "memory" (default), "sqlite" or "off"
+
+    Returns None when throttling is off.
+    """
+    name = config.get("LOGIN_THROTTLE") or "memory"
+    if name == "off":
+        return None
+    if name == "memory":
+        store = MemoryBucketStore(config.get("LOGIN_THROTTLE_MAX_KEYS") or 100_000)
+    elif name == "sqlite":
+        path = config.get("LOGIN_THROTTLE_SQLITE_DATABASE") or _data_path(DEFAULT_SQLITE_FILE)
+        store = SqliteBucketStore(path)
+    else:
+        raise ValueError(f"Unknown login throttle: {name!r}")
+    return LoginThrottle(
+        store,
+        (config["LOGIN_IP_BURST"], config["LOGIN_IP_PER_MINUTE"]),
+        (config["LOGIN_EMAIL_BURST"], config["LOGIN_EMAIL_PER_MINUTE"]),
+    )
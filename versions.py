@@ -0,0 +1,61 @@
+import mmap
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+# One unsigned 64-bit counter per dataset, in this order
+DATASETS = ("clubs", "competitions", "bookings")
+_COUNTER = struct.Struct("=Q")
+
+
+class SharedVersions:
+    """Per-dataset version counters in a memory-mapped file shared by workers
+
+    Every worker process maps the same small file, so reading a counter
+    is a load from shared memory: no system call, no file read, no IPC.
+    Writers bump counters under lockf() on the file (plus an in-process
+    lock), so concurrent increments from several workers are never lost.
+    A reader that finds a counter different from the one its copy was
+    loaded at knows another worker changed that dataset.
+    """
+
+    def __init__(self, path, datasets=DATASETS):
+        self.path = str(path)
+        self._offsets = {name: i * _COUNTER.size for i, name in enumerate(datasets)}
+        size = len(datasets) * _COUNTER.size
+        self._lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        # New bytes read as zero; a file that is already large enough is left alone
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+        self._size = size
+
+    def get(self, dataset):
+        """Current version of 'dataset'"""
+        return _COUNTER.unpack_from(self._map, self._offsets[dataset])[0]
+
+    def bump(self, *datasets):
+        """Increment the versions of 'datasets' together; return the new values"""
+        with self._lock:
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, self._size, 0)
+            try:
+                values = []
+                for dataset in datasets:
+                    value = self.get(dataset) + 1
+                    _COUNTER.pack_into(self._map, self._offsets[dataset], value)
+                    values.append(value)
+                return values
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, self._size, 0)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)